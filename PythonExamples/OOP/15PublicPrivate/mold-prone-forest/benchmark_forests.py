@@ -0,0 +1,211 @@
+"""
+Benchmark the forest models
+---------------------------
+
+Time Forest, SlowBurnForest, InstantBurnForest and MoldProneForest on grids
+of growing size and report, for each model and size,
+
+    steps_per_second    whole advance_one_step() calls per second
+    phases              time spent in grow_trees, start_fires, burn_trees
+                        and mold growth, in total and per step
+    peak_memory_bytes   the most memory the model allocated while stepping,
+                        as seen by tracemalloc (numpy reports its arrays)
+    state_bytes         the memory held by the model's grids
+
+Results are written as JSON, so runs of two releases can be compared.  The
+forests use forest_engine, from PythonExamples/OOP, so run from this
+directory with that on the path:
+
+    PYTHONPATH=../.. python benchmark_forests.py --output new.json
+    PYTHONPATH=../.. python benchmark_forests.py --compare old.json new.json
+
+Each forest starts with a random ``--tree-density`` of trees, so the fire
+models have something to burn from the first step, and the global numpy
+random state is seeded so that every run steps through the same forests.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from forest import Forest, InstantBurnForest, SlowBurnForest
+from mold_prone_forest_solution import MoldProneForest
+
+MODELS = {
+    "Forest": Forest,
+    "SlowBurnForest": SlowBurnForest,
+    "InstantBurnForest": InstantBurnForest,
+    "MoldProneForest": MoldProneForest,
+}
+PHASES = ("grow_trees", "start_fires", "burn_trees",
+          "_grow_mold_and_kill_trees")
+DEFAULT_SIZES = (150, 512, 1024, 2048, 4096, 8192)
+
+
+class PhaseTimer(object):
+    """Time the phase methods of a forest while it steps.
+
+    The phases are wrapped by instance attributes, which shadow the class
+    methods that advance_one_step() would otherwise call, so the models
+    themselves need no changes.
+    """
+    def __init__(self, forest):
+        self.seconds = {}
+        for name in PHASES:
+            method = getattr(forest, name, None)
+            if method is not None:
+                self.seconds[name] = 0.0
+                setattr(forest, name, self._timed(name, method))
+
+    def reset(self):
+        for name in self.seconds:
+            self.seconds[name] = 0.0
+
+    def _timed(self, name, method):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.seconds[name] += time.perf_counter() - start
+        return timed
+
+
+def make_forest(model, size, tree_density, seed):
+    np.random.seed(seed)
+    forest = MODELS[model](size=(size, size))
+    forest.trees[...] = np.random.uniform(size=forest.trees.shape) < tree_density
+    return forest
+
+
+def state_bytes(forest):
+    return sum(value.nbytes for value in vars(forest).values()
+               if isinstance(value, np.ndarray))
+
+
+def benchmark(model, size, tree_density=0.4, min_time=1.0, max_steps=200,
+              seed=0):
+    """Time one model on one grid size and return a result dict."""
+    forest = make_forest(model, size, tree_density, seed)
+    phases = PhaseTimer(forest)
+
+    # one untimed step, so first-call costs are not counted
+    forest.advance_one_step()
+    phases.reset()
+
+    steps = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while steps < max_steps and (steps == 0 or elapsed < min_time):
+        forest.advance_one_step()
+        steps += 1
+        elapsed = time.perf_counter() - start
+
+    # memory is measured on a separate run, as tracing slows the steps down
+    forest = make_forest(model, size, tree_density, seed)
+    forest.advance_one_step()
+    tracemalloc.start()
+    try:
+        for i in range(min(steps, 5)):
+            forest.advance_one_step()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "model": model,
+        "size": [size, size],
+        "steps": steps,
+        "seconds": elapsed,
+        "steps_per_second": steps / elapsed,
+        "peak_memory_bytes": peak,
+        "state_bytes": state_bytes(forest),
+        "phases": dict((name, {"seconds": seconds,
+                               "per_step": seconds / steps})
+                       for name, seconds in phases.seconds.items()),
+    }
+
+
+def run(models, sizes, **kwargs):
+    """Benchmark every model on every size, printing progress to stderr."""
+    results = []
+    for size in sizes:
+        for model in models:
+            result = benchmark(model, size, **kwargs)
+            sys.stderr.write("{:>18} {:>5}^2 {:>10.2f} steps/s {:>8.1f} MB\n"
+                             .format(model, size, result["steps_per_second"],
+                                     result["peak_memory_bytes"] / 1.e6))
+            results.append(result)
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "settings": kwargs,
+        "results": results,
+    }
+
+
+def compare(old, new):
+    """Print the change in steps/s and peak memory between two reports."""
+    def key(result):
+        return result["model"], tuple(result["size"])
+
+    old_results = dict((key(result), result) for result in old["results"])
+    print("{:>18} {:>11} {:>12} {:>12} {:>8} {:>8}".format(
+        "model", "size", "old steps/s", "new steps/s", "speedup", "memory"))
+    for result in new["results"]:
+        before = old_results.get(key(result))
+        if before is None:
+            continue
+        print("{:>18} {:>11} {:>12.2f} {:>12.2f} {:>7.2f}x {:>7.2f}x".format(
+            result["model"], "{}x{}".format(*result["size"]),
+            before["steps_per_second"], result["steps_per_second"],
+            result["steps_per_second"] / before["steps_per_second"],
+            result["peak_memory_bytes"] /
+            float(max(before["peak_memory_bytes"], 1))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS),
+                        default=list(MODELS))
+    parser.add_argument("--sizes", nargs="+", type=int,
+                        default=list(DEFAULT_SIZES))
+    parser.add_argument("--tree-density", type=float, default=0.4)
+    parser.add_argument("--min-time", type=float, default=1.0,
+                        help="seconds to time each model and size for")
+    parser.add_argument("--max-steps", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two JSON reports instead of running")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path) as report:
+                reports.append(json.load(report))
+        compare(*reports)
+        return
+
+    report = run(args.models, args.sizes, tree_density=args.tree_density,
+                 min_time=args.min_time, max_steps=args.max_steps,
+                 seed=args.seed)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=1, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=1, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import numpy as np
+from scipy.ndimage.measurements import label
+
+# forest_engine lives in PythonExamples/OOP: put that directory on the path,
+# for example run ``PYTHONPATH=../.. python mold_prone_forest_solution.py``
+from forest_engine import NeighbourCounter
+
+
+class Forest(object):
+    """Forest can grow trees which eventually die."""
+    def __init__(self, size=(150, 150), p_sapling=0.0025):
+        self.size = size
+        self.trees = np.zeros(self.size, dtype=bool)
+        self.p_sapling = p_sapling
+
+    def __repr__(self):
+        my_repr = "{}(size={})".format(self.__class__.__name__, self.size)
+        return my_repr
+
+    def __str__(self):
+        return self.__class__.__name__
+
+    @property
+    def losses(self):
+        "generic property describing losses in the forest."
+        return np.zeros(self.size)
+
+    @property
+    def num_cells(self):
+        """Number of cells available for growing trees."""
+        # assuming 2D forest
+        return self.size[0] * self.size[1]
+
+    @property
+    def tree_fraction(self):
+        num_trees = self.trees.sum()
+        return float(num_trees) / self.num_cells
+
+    def _rand_bool(self, p):
+        return np.random.uniform(size=self.size) < p
+
+    def grow_trees(self):
+        growth_sites = self._rand_bool(self.p_sapling)
+        self.trees[growth_sites] = True
+
+    def advance_one_step(self):
+        self.grow_trees()
+
+
+class BurnableForest(Forest):
+    """BurnableForest supports fires
+    """
+    def __init__(self, p_lightning=5.0e-6, **kwargs):
+        self.p_lightning = p_lightning
+        super(BurnableForest, self).__init__(**kwargs)
+        self.fires = np.zeros(self.size, dtype=bool)
+
+    @property
+    def losses(self):
+        return self.fires
+
+    @property
+    def fire_fraction(self):
+        num_fires = self.fires.sum()
+        return float(num_fires) / self.num_cells
+
+    def advance_one_step(self):
+        super(BurnableForest, self).advance_one_step()
+        self.start_fires()
+        self.burn_trees()
+
+    def start_fires(self):
+        lightning_strikes = self._rand_bool(self.p_lightning) & self.trees
+        self.fires[lightning_strikes] = True
+
+    def burn_trees(self):
+        pass
+
+
+class SlowBurnForest(BurnableForest):
+    """SlowBurnForest spreads each fire one cell a step
+
+    The fires of each step are written into a spare buffer, and the two
+    buffers then change places: an array taken from fires is overwritten
+    two steps later, so copy it to keep it.
+    """
+    def __init__(self, **kwargs):
+        super(SlowBurnForest, self).__init__(**kwargs)
+        self._neighbours = NeighbourCounter(self.size)
+        self._spare_fires = np.zeros(self.size, dtype=bool)
+
+    def burn_trees(self):
+        new_fires = self._neighbours.touching(self.fires,
+                                              out=self._spare_fires)
+        new_fires &= self.trees
+        self.trees[self.fires] = False
+        self.fires, self._spare_fires = new_fires, self.fires
+
+
+class InstantBurnForest(BurnableForest):
+    def burn_trees(self):
+        # treat self.fires as lightning strikes
+        strikes = self.fires
+        groves, num_groves = label(self.trees)
+        fires = set(groves[strikes])
+        self.fires.fill(False)
+        for fire in fires:
+            self.fires[groves == fire] = True
+        self.trees[self.fires] = False
+        self.fires.fill(False)
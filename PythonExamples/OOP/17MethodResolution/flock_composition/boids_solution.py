@@ -0,0 +1,587 @@
+"""
+Inheritance vs. Composition
+===========================
+
+This exercise uses Flock classes from the multiple inheritance exercise.
+
+In the exercise from the multiple inhertance lecture (particularly if you did
+the bonus question) you may have noticed that as we broke up the classes to
+isolate different behaviors into subclasses, we gained flexibility, but at
+the expense of large numbers of classes.  You can pick and choose the rules
+which govern movement, you have to create a new class to encapsulate those
+choices.
+
+In many cases this is fine, but it has the downside that it's not easy to
+change the behaviors at run-time (for example, if you wanted a user to be
+able to choose between different rules that they want to experiment with).
+One way to overcome this limitation is to use "composition" rather than
+inheritance to build the desired set of behaviors: the Flock has a
+list of behaviors it follows, rather than inheriting it intrinsically.
+
+This disitinction is sometimes referred to as "has a" relationships vs. "is a"
+relations: a BoidsFlock "has a" Separation behavior rather than a BoidsFlock
+"is a" SeparationFlock.
+
+Question
+--------
+
+Add a new base class Behavior which has the following interface:
+
+    class Behavior(object):
+
+        def acceleration(self, flock):
+            '''Return the contribution to acceleration from the behavior'''
+            raise NotImplementedError
+
+Modify the Flock classes in this module to create a new ComposedFlock class,
+and a collection of Behavior subclasses for each of the "random",
+"separation", "alignment", "cohesion" and "wall avoidance" behaviors.
+
+If you run this code in canopy, a matplotlib animation will be created for the
+simulation and you can watch the flocking behavior live.  To run the
+animation outside of Canopy from the command prompt, use:
+
+    ipython --gui=qt4 boids_solution.py
+
+The solution uses the flock_engine package in PythonExamples/OOP, so that
+directory must be on the path; from this directory:
+
+    PYTHONPATH=../.. ipython --gui=qt4 boids_solution.py
+
+Bonus
+-----
+
+There are many other behaviors that you can implement:
+
+* "seek" is a behavior which adds an acceleration component which moves the
+  boids towards a specified target point:
+
+    target_delta = target_position - position
+    desired_velocity = normalize(target_delta) * max_speed
+    acceleration = (desired_velocity - velocity) * weight
+
+* "flee" is a behavior which adds an acceleration component which moves the
+  boids away from a specified target point: the behavior is the same as "seek"
+  but the desired velocity is the negative of the seek velocity.
+
+* "pursuit" is similar to "seek," but the target is moving, so the target
+  position is a projected future position for the target.
+
+* "evasion" is similar to "flee" but with a moving target.  As with "pursuit"
+  the target position is a projected future position for the target.
+
+* "arrival" is similar to "seek", but the desired velocity is adjusted so that
+  the boid slows down as it approaches the target point.
+
+* "wander" is an alternative to random movement where the acceleration applied
+  each step is remembered and adjusted slightly left or right, but constrained
+  to lie on a circle ahead of the boid.
+
+* "obstacle avoidance" is a behavior similar to wall avoidance that allows
+  boids to fly around trees or other non-wall obstacles.  Objects ahead of the
+  boid are projected perpendicular to the direction of motion and intersections
+  of the projections with the location of the boid indicate potential future
+  collisions.  The behavior generates an acceleration based on moving away
+  from the center of the closest (ie. most dangerous) obstacle.
+
+Many more possibilties are discussed at http://www.red3d.com/cwr/steer/gdc99/
+
+As a concrete goal, you might add a food source that the boids "seek" and a
+hawk to the forest which the boids want to "evade."  Initially you might just
+move the hawk on a pre-determined path (such as a circle) that passes near the
+food source, but you could also potentially give the hawk the "random",
+"wander" or "pursuit" behaviors if you have written your behavior classes
+well.
+
+References
+----------
+
+Reynolds, C. W. (1987) Flocks, Herds, and Schools: A Distributed Behavioral
+    Model, in Computer Graphics, 21(4) (SIGGRAPH '87 Conference Proceedings)
+    pages 25-34.
+
+Reynolds, C. W. (1999) Steering Behaviors For Autonomous Characters, in the
+    proceedings of Game Developers Conference 1999 held in San Jose,
+    California. Miller Freeman Game Group, San Francisco, California.
+    Pages 763-782. (http://www.red3d.com/cwr/papers/1999/gdc99steer.html)
+
+"""
+
+import numpy
+from numpy import (array, ascontiguousarray, bincount, clip, float64, newaxis,
+                   prod, zeros, zeros_like)
+from numpy.linalg import norm
+from numpy.random import normal, uniform
+
+from flock_engine import (NEIGHBOR_INDEXES, FusedAccelerations,
+                          sum_over_neighbors)
+
+
+class Flock(object):
+    """ A base class for a similated flock of birds
+
+    neighbor_index picks how neighbors are found: "kdtree" or "cells" (a
+    uniform grid of cell_size wide cells, best for dense flocks).  See
+    flock_engine.neighbors.
+
+    dtype is the type of the positions and velocities; float32 halves the
+    memory a step reads and writes.  With soa=True they are stored as a
+    structure of arrays, one contiguous array per axis, in position_axes
+    and velocity_axes of shape (n_dim, size); positions and velocities are
+    then (size, n_dim) views of those, so behaviors work unchanged.
+    """
+
+    def __init__(self, size=100, forest_size=(150, 150),
+                 neighbor_index="kdtree", cell_size=None, dtype=float64,
+                 soa=False):
+        """ Initialize the flock """
+        if neighbor_index not in NEIGHBOR_INDEXES:
+            raise ValueError("unknown neighbor index {!r}, expected one of "
+                             "{}".format(neighbor_index,
+                                         sorted(NEIGHBOR_INDEXES)))
+        self.size = size
+        self.forest_size = array(forest_size)
+        self.n_dim = len(forest_size)
+
+        self.dtype = numpy.dtype(dtype)
+        self.soa = soa
+
+        positions = uniform(size=(self.size, self.n_dim))*self.forest_size
+        if soa:
+            self.position_axes = ascontiguousarray(positions.T, self.dtype)
+            self.velocity_axes = zeros((self.n_dim, size), self.dtype)
+            self.positions = self.position_axes.T
+            self.velocities = self.velocity_axes.T
+        else:
+            self.positions = positions.astype(self.dtype, copy=False)
+            self.velocities = zeros((size, self.n_dim), self.dtype)
+
+        self.max_speed = 5.0
+        self.eps = 0.0
+        self.neighbor_index = neighbor_index
+        self.cell_size = cell_size
+
+        self._neighbors = None
+        self._neighbor_cache = None
+        self._radius_cache = {}
+        self._upper = self.forest_size.astype(self.dtype)
+        self._clipped = zeros((size, self.n_dim), self.dtype)
+
+    def accelerate(self):
+        """ Accelerate the boids randomly """
+        self.velocities += self._compute_acceleration()
+        self._clip_velocity()
+
+    def move(self):
+        """ Update the positions of the boids """
+        self.positions += self.velocities
+        self._clip_position()
+
+    def do_one_step(self):
+        """ Perform one step of the simulation """
+        # a KDTree or cell list allows us to find nearest neighbors more
+        # quickly
+        index = NEIGHBOR_INDEXES[self.neighbor_index]
+        self._neighbors = index(self.positions, self.forest_size,
+                                self._cell_size())
+        self._neighbor_cache = None
+        self._radius_cache = {}
+        self.accelerate()
+        self.move()
+
+    def nearest_neighbors(self, count):
+        """ Utility function to find n nearest neighbors.
+
+        By default this uses SciPy's cKDTree object, which is documented here:
+        http://docs.scipy.org/doc/scipy/reference/generated/scipy.spatial.cKDTree.html
+
+        The index is only queried once a step, for the largest count asked
+        for; the neighbors come back nearest first, so a smaller count is
+        just the first columns of that.
+
+        """
+        # If you don't know anything about the kd-tree data structure, that's fine
+        # for the purposes of the exercise: just treat this as a black box which
+        # finds the n nearest boids to an array of positions, and also computes
+        # the distances to the boids from each point in the array.
+
+        if (self._neighbor_cache is None or
+                self._neighbor_cache[0].shape[1] < count):
+            distances, neighbors = self._neighbors.nearest(count, self.eps)
+            self._neighbor_cache = (distances.astype(self.dtype, copy=False),
+                                    neighbors)
+
+        distances, neighbors = self._neighbor_cache
+        return distances[:, :count], neighbors[:, :count]
+
+    def neighbors_within(self, radius):
+        """ Utility function to find the neighbors closer than radius.
+
+        Returns (owners, neighbors, distances) arrays with one entry for
+        each boid and neighbor pair, sorted by boid and then by distance.
+        """
+        if radius not in self._radius_cache:
+            self._radius_cache[radius] = self._neighbors.within(radius)
+        return self._radius_cache[radius]
+
+    def _cell_size(self):
+        """ The width of the cells of the neighbor index """
+        if self.cell_size is not None:
+            return self.cell_size
+        # about ten boids to a cell, so the block of cells around a boid
+        # holds plenty of neighbors
+        return (10.0 * prod(self.forest_size) / self.size) ** (1.0/self.n_dim)
+
+    def _compute_acceleration(self):
+        """ Compute the acceleration at a step """
+        accel = zeros(shape=(self.size, self.n_dim), dtype=self.dtype)
+        return accel
+
+    def _clip_velocity(self):
+        """ Ensure no boid is going faster than the max speed """
+        speeds = norm(self.velocities, axis=-1)
+        too_fast = (speeds >= self.max_speed)[:, newaxis]
+        # the clipped velocities are worked out in a buffer kept between
+        # steps, only for the boids going too fast, and copied back over
+        # theirs; no rows are gathered or scattered
+        clipped = self._clipped
+        numpy.divide(self.velocities, speeds[:, newaxis], out=clipped,
+                     where=too_fast)
+        numpy.multiply(clipped, self.max_speed, out=clipped, where=too_fast)
+        numpy.copyto(self.velocities, clipped, where=too_fast)
+
+    def _clip_position(self):
+        """ If beyond a wall, move back to wall location """
+        clip(self.positions, 0, self._upper, out=self.positions)
+
+
+class ComposedFlock(Flock):
+    """ A Flock subclass with a list of behaviors it follows
+
+    With fused=True the behaviors' accelerations are added up in place, and
+    the nearest neighbor behaviors are worked out together, gathering the
+    neighbors once a step (see flock_engine.accelerations).  compiled picks
+    whether that uses the compiled kernel; by default it does if it was
+    built.
+    """
+
+    def __init__(self, size=100, forest_size=(150, 150),
+                 neighbor_index="kdtree", cell_size=None, dtype=float64,
+                 soa=False, fused=False, compiled=None):
+        super(ComposedFlock, self).__init__(size, forest_size,
+                                            neighbor_index, cell_size, dtype,
+                                            soa)
+
+        self.behaviors = []
+        self.fused = fused
+        self._fused = None
+        if fused:
+            self._fused = FusedAccelerations(size, self.n_dim, compiled,
+                                             self.dtype)
+
+    @property
+    def neighbor_count(self):
+        """ The most nearest neighbors any of the behaviors looks at """
+        return max([behavior.neighbor_count for behavior in self.behaviors
+                    if getattr(behavior, 'neighbor_radius', 0) is None] + [0])
+
+    @property
+    def neighbor_radius(self):
+        """ The largest radius any of the behaviors looks within """
+        return max([getattr(behavior, 'neighbor_radius', None) or 0
+                    for behavior in self.behaviors] + [0])
+
+    def _cell_size(self):
+        if self.cell_size is not None:
+            return self.cell_size
+        if self.neighbor_radius > 0:
+            # radius queries then only look at the cells next to a boid's
+            return self.neighbor_radius
+        # about a tenth of neighbor_count boids to a cell, so in a 2D
+        # forest most boids find their nearest neighbors in the 5 x 5
+        # block of cells around them
+        count = max(self.neighbor_count, 10)
+        return (0.1 * count * prod(self.forest_size) /
+                self.size) ** (1.0/self.n_dim)
+
+    def _compute_acceleration(self):
+        if self.fused:
+            return self._compute_fused_acceleration()
+        accel = super(ComposedFlock, self)._compute_acceleration()
+        # find the nearest neighbors for all the behaviors in one query
+        if self.neighbor_count > 0:
+            self.nearest_neighbors(self.neighbor_count)
+        for behavior in self.behaviors:
+            accel += behavior.acceleration(self)
+        return accel
+
+    def _compute_fused_acceleration(self):
+        """ Add up the accelerations of the behaviors in one buffer """
+        accel = self._fused.start()
+        terms = []
+        for behavior in self.behaviors:
+            if getattr(behavior, 'fused_term', None) is not None:
+                terms.append((behavior.fused_term, behavior.neighbor_count,
+                              behavior.weight))
+            else:
+                behavior.add_acceleration(self, accel)
+        if terms:
+            distances, neighbors = self.nearest_neighbors(self.neighbor_count)
+            self._fused.add_neighbor_terms(self.positions, self.velocities,
+                                           distances, neighbors, terms)
+        return accel
+
+
+# the name the starter code uses
+BehaviorFlock = ComposedFlock
+
+
+class Behavior(object):
+    """ Abstract base class for behaviors """
+
+    def __init__(self, weight=1.0, **kwargs):
+        self.weight = weight
+
+    def accelerate(self, flock):
+        raise NotImplementedError()
+
+    def add_acceleration(self, flock, accel):
+        """ Add the contribution to acceleration to accel, in place """
+        accel += self.acceleration(flock)
+
+
+class RandomMovement(Behavior):
+    """A simulated flock of birds that moves randomly"""
+
+    def acceleration(self, flock):
+        """ Compute the acceleration at a step """
+        accel = normal(0, self.weight, (flock.size, flock.n_dim))
+        return accel
+
+
+class TargetBehavior(Behavior):
+    """Behavior that uses a target as a reference point"""
+
+    def __init__(self, weight=0.1, target=((0.0, 0.0),), **kwargs):
+        """ Initialize the behavior """
+        super(TargetBehavior, self).__init__(weight=weight, **kwargs)
+        self.target = array(target).reshape(-1, 2)
+
+    def acceleration(self, flock):
+        accel = zeros_like(flock.velocities)
+        self.add_acceleration(flock, accel)
+        return accel
+
+    def _steer(self, flock, accel, direction):
+        """ Add the steering towards (direction 1) or away from (-1) the
+        target to accel, working in a single array """
+        desired_velocity = self.target - flock.positions
+        speed = norm(desired_velocity, axis=1)
+        speed /= direction * flock.max_speed
+        desired_velocity /= speed[:, newaxis]
+        desired_velocity -= flock.velocities
+        desired_velocity *= self.weight
+        accel += desired_velocity
+
+
+class Seek(TargetBehavior):
+    """Move towards a target location"""
+
+    def add_acceleration(self, flock, accel):
+        self._steer(flock, accel, 1.0)
+
+
+class Flee(TargetBehavior):
+    """Move away from a target location"""
+
+    def add_acceleration(self, flock, accel):
+        self._steer(flock, accel, -1.0)
+
+
+class Arrival(TargetBehavior):
+    """Move towards a target location, slowing as approaching"""
+
+    def acceleration(self, flock):
+        target_delta = self.target - flock.positions
+        desired_velocity = target_delta
+        accel = (desired_velocity - flock.velocities) * self.weight
+        return accel
+
+
+class WallAvoidance(Behavior):
+
+    def acceleration(self, flock):
+        """ If a wall is ahead, steer away from it """
+        future_position = flock.positions + flock.velocities
+        accel = zeros_like(flock.velocities)
+        for dimension in range(flock.n_dim):
+            # collision possible?
+            collisions = ((future_position[..., dimension] < 0) | \
+                          (future_position[..., dimension] >
+                           flock.forest_size[dimension]))
+            # if so accelerate away from wall
+            accel[collisions, dimension] = -flock.velocities[collisions, dimension]
+        return accel
+
+
+class NeighborBehavior(Behavior):
+    """A Behavior which depends on actions of nearby members of the flock
+
+    The neighbors are the neighbor_count nearest boids, or if neighbor_radius
+    is given, all the boids closer than that.
+
+    Subclasses whose nearest neighbor acceleration is one of the terms of
+    flock_engine.FusedAccelerations name it in term.
+    """
+
+    term = None
+
+    def __init__(self, weight=1.0, neighbor_count=10, neighbor_radius=None):
+        """ Initialize the behavior """
+        super(NeighborBehavior, self).__init__(weight)
+        self.neighbor_count = neighbor_count
+        self.neighbor_radius = neighbor_radius
+
+    @property
+    def fused_term(self):
+        """ The term a fused flock adds up for this behavior, if any """
+        if self.neighbor_radius is None:
+            return self.term
+        return None
+
+
+class Separation(NeighborBehavior):
+    """A flock where boids avoid their neighbors"""
+
+    term = "separation"
+
+    def acceleration(self, flock):
+        """Avoid nearby boids, repulsion is inversely proportional to distance"""
+        if self.neighbor_radius is not None:
+            owners, neighbors, distances = flock.neighbors_within(
+                self.neighbor_radius)
+            deltas = flock.positions[neighbors] - flock.positions[owners]
+            deltas /= distances.clip(0.1)[:, newaxis]**2
+            accel = sum_over_neighbors(owners, deltas, flock.size)
+            return accel * self.weight
+        distances, neighbors = flock.nearest_neighbors(self.neighbor_count)
+        distances = distances.clip(0.1)
+        neighbor_positions = flock.positions[neighbors]
+        deltas = neighbor_positions - flock.positions[:, newaxis, :]
+        accel = (deltas/distances[:, :, newaxis]**2).sum(axis=1)
+        return accel * self.weight
+
+
+class Alignment(NeighborBehavior):
+    """A flock where boids keep avoid their neighbors"""
+
+    term = "alignment"
+
+    def __init__(self, weight=0.02, neighbor_count=10, neighbor_radius=None):
+        """ Initialize the behavior """
+        super(Alignment, self).__init__(weight, neighbor_count,
+                                        neighbor_radius)
+
+    def acceleration(self, flock):
+        """ Tend towards average heading of neighbors """
+        if self.neighbor_radius is not None:
+            owners, neighbors, distances = flock.neighbors_within(
+                self.neighbor_radius)
+            counts = bincount(owners, minlength=flock.size)
+            total_velocities = sum_over_neighbors(
+                owners, flock.velocities[neighbors], flock.size)
+            # boids with no neighbors keep their heading
+            avg_delta = (total_velocities - counts[:, newaxis] *
+                         flock.velocities) / counts.clip(1)[:, newaxis]
+            return avg_delta * self.weight
+        distances, neighbors = flock.nearest_neighbors(self.neighbor_count)
+        avg_neighbor_velocities = flock.velocities[neighbors].mean(axis=1)
+        avg_delta = avg_neighbor_velocities - flock.velocities
+        return avg_delta * self.weight
+
+
+class Cohesion(NeighborBehavior, Arrival):
+    """A flock where boids move toward the centroid of their neigbors"""
+
+    term = "cohesion"
+
+    def __init__(self, weight=0.02, neighbor_count=51, **kwargs):
+        """ Initialize the behavior """
+        super(Cohesion, self).__init__(
+            weight=weight, neighbor_count=neighbor_count, **kwargs)
+
+    def acceleration(self, flock):
+        """ Tend towards average position of neighbors """
+        if self.neighbor_radius is not None:
+            owners, neighbors, distances = flock.neighbors_within(
+                self.neighbor_radius)
+            counts = bincount(owners, minlength=flock.size)
+            total_positions = sum_over_neighbors(
+                owners, flock.positions[neighbors], flock.size)
+            self.target = total_positions / counts.clip(1)[:, newaxis]
+            accel = super(Cohesion, self).acceleration(flock)
+            # boids with no neighbors have nothing to move towards
+            accel[counts == 0] = 0
+            return accel
+        distances, neighbors = flock.nearest_neighbors(self.neighbor_count)
+        self.target = flock.positions[neighbors].mean(axis=1)
+        accel = super(Cohesion, self).acceleration(flock)
+        return accel
+
+
+if __name__ == '__main__':
+    import argparse
+
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+    from flock_engine import Trajectory, animate_trajectory, record_flock
+
+    parser = argparse.ArgumentParser(
+        description="Animate a flock live, or record it headless to a "
+                    "trajectory and replay that")
+    parser.add_argument('--record', metavar='PATH',
+                        help="run the flock without drawing, saving the "
+                             "trajectory to PATH, then replay it")
+    parser.add_argument('--replay', metavar='PATH',
+                        help="replay a recorded trajectory")
+    parser.add_argument('--steps', type=int, default=1000,
+                        help="number of steps to record")
+    parser.add_argument('--fps', type=float, default=30,
+                        help="frames a second of the replay")
+    parser.add_argument('--stride', type=int, default=1,
+                        help="replay every STRIDE-th frame")
+    args = parser.parse_args()
+
+    # create flock
+    flock = ComposedFlock()
+    flock.behaviors = [Separation(), Alignment(), Cohesion(), WallAvoidance()]
+
+    if args.record or args.replay:
+        if args.record:
+            trajectory = record_flock(flock, args.record, args.steps)
+        else:
+            trajectory = Trajectory(args.replay)
+        ani = animate_trajectory(trajectory, args.fps, args.stride,
+                                 color='b', ms=6)
+    else:
+        # create a matplotlib animation of the flock
+        fig = plt.figure()
+        ax = fig.add_subplot(111, aspect='equal', autoscale_on=False,
+                             xlim=(0, 150), ylim=(0,150))
+
+        flock_plot, = ax.plot([], [], 'bo', ms=6)
+
+        def init():
+            flock_plot.set_data([], [])
+            return flock_plot,
+
+        def animate(i):
+            global flock_plot, flock
+
+            flock.do_one_step()
+            flock_plot.set_data(flock.positions[:, 0], flock.positions[:, 1])
+            return flock_plot,
+
+        ani = animation.FuncAnimation(fig, animate, frames=100,
+                                      interval=1, blit=True, init_func=init)
+    plt.show()
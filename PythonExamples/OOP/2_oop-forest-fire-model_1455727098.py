@@ -24,23 +24,93 @@ get_ipython().magic(u'matplotlib inline')
 import matplotlib.pyplot as plt
 import numpy as np
 
+from forest_engine import (BitGrid, Checkpoint, FireStatistics, HistoryRecorder,
+                           NeighbourCounter, TiledForestEngine, burn_frontier, make_rng,
+                           random_cells, slow_burn_step, write_checkpoint)
+
 
 # Rather than importing from a file, let's define our Forest class directly in this notebook:
 
 # In[ ]:
 
 class Forest(object):
-    def __init__(self, size=(150, 150), p_sapling=0.0025, p_lightning=5.e-6, name=None):
+    # with frontier="auto", fires are spread cell by cell while less than
+    # this fraction of the forest is burning, and by whole-grid shifts above it;
+    # a forest stepping with the compiled kernel uses the kernel instead
+    sparse_threshold = 0.005
+    # the statistics run() can record
+    run_statistics = ("tree_fraction", "fire_fraction")
+
+    def __init__(self, size=(150, 150), p_sapling=0.0025, p_lightning=5.e-6, name=None,
+                 grid="dense", n_workers=None, frontier="auto", rng=None, compiled=None):
         self.size = size
-        self.trees = np.zeros(self.size, dtype=bool)
-        self.forest_fires = np.zeros(self.size, dtype=bool)
+        self.grid = grid
+        # a numpy.random.Generator, or a seed to make one from
+        self.rng = make_rng(rng)
+        # the fires of each step are written into the spare buffer, and the
+        # two buffers then change places, so an array taken from
+        # forest_fires is overwritten two steps later; copy it to keep it
+        if grid == "dense":
+            # a tiled forest keeps its grids in the tiles instead
+            if n_workers is None:
+                self._use_dense_grids(np.zeros(self.size, dtype=bool),
+                                      np.zeros(self.size, dtype=bool))
+        elif grid == "packed":
+            # 64 cells to a word; see forest_engine/bitgrid.py
+            self.trees = BitGrid(self.size)
+            self.forest_fires = BitGrid(self.size)
+            self._spare_fires = BitGrid(self.size)
+        else:
+            raise ValueError("grid must be 'dense' or 'packed', not {!r}".format(grid))
+        if frontier not in ("auto", "dense", "sparse"):
+            raise ValueError("frontier must be 'auto', 'dense' or 'sparse', not {!r}".format(frontier))
+        if frontier == "sparse" and grid != "dense":
+            raise ValueError("the sparse frontier needs the dense grid")
+        self.frontier = frontier
+        # flat indices of the burning cells while the sparse frontier is in use
+        self._fire_cells = None
+        self._tiles = None
+        if n_workers is not None:
+            if grid != "dense":
+                raise ValueError("a tiled forest must use the dense grid")
+            # row bands advanced in parallel; see forest_engine/tiled.py
+            self._tiles = TiledForestEngine(self.size, n_workers=n_workers)
+            self.trees = self._tiles.trees
+            self.forest_fires = self._tiles.forest_fires
+        # step with the fused compiled kernel when it has been built; see
+        # forest_engine/fused.py
+        if compiled is None:
+            compiled = slow_burn_step is not None
+        elif compiled and slow_burn_step is None:
+            raise ImportError("the forest_engine._fused extension is not built")
+        self.compiled = compiled and grid == "dense" and self._tiles is None
         self.p_sapling = p_sapling
         self.p_lightning = p_lightning
+        self.step_count = 0
+        self.history = None
+        self.fire_statistics = None
         if name is not None:
             self.name = name
         else:
             self.name = self.__class__.__name__
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stop the worker processes of a tiled forest and free its shared memory.
+
+        The forest keeps its trees and fires, and takes any further steps in
+        this process.  Other forests have nothing to free.
+        """
+        if self._tiles is not None:
+            self._use_dense_grids(self._tiles.trees.copy(), self._tiles.forest_fires.copy())
+            self._tiles.close()
+            self._tiles = None
+
     @property
     def num_cells(self):
         return self.size[0] * self.size[1]
@@ -54,36 +124,253 @@ class Forest(object):
         return self.forest_fires.sum() / float(self.num_cells)
 
     def advance_one_step(self):
-        self.grow_trees()
-        self.start_fires()
-        self.burn_trees()
+        self.step_count += 1
+        counts = None
+        if self._tiles is not None:
+            self._advance_tiled()
+        elif self._use_compiled():
+            counts = self._advance_compiled()
+        else:
+            self.grow_trees()
+            self.start_fires()
+            self.burn_trees()
+        if self.fire_statistics is not None:
+            self._spread_fire_statistics()
+        if self.history is not None:
+            if counts is None:
+                counts = _count(self.trees), _count(self.forest_fires)
+            self.history.record(self.step_count, counts[0] / float(self.num_cells),
+                                counts[1] / float(self.num_cells))
+
+    def run(self, n_steps, record=("tree_fraction", "fire_fraction")):
+        """Advance n_steps steps and return the recorded statistics.
+
+        Returns one array of length n_steps for each name in record, in the
+        same order, holding the value after each step.  The tree and fire
+        counts are carried from step to step, so the grids are not summed
+        again unless the step went over the whole grid anyway.
+        """
+        for name in record:
+            if name not in self.run_statistics:
+                raise ValueError("can only record {}, not {!r}".format(self.run_statistics, name))
+        counts = {"tree_fraction": np.empty(n_steps, dtype=np.int64),
+                  "fire_fraction": np.empty(n_steps, dtype=np.int64)}
+        num_trees = _count(self.trees)
+        for i in range(n_steps):
+            num_trees, num_fires = self._counted_step(num_trees)
+            if self.fire_statistics is not None:
+                self._spread_fire_statistics()
+            counts["tree_fraction"][i] = num_trees
+            counts["fire_fraction"][i] = num_fires
+            if self.history is not None:
+                self.history.record(self.step_count, num_trees / float(self.num_cells),
+                                    num_fires / float(self.num_cells))
+        if self.history is not None:
+            # write out the steps still waiting in the ring buffer
+            self.history.flush()
+        return tuple(counts[name] / float(self.num_cells) for name in record)
+
+    def track_history(self, capacity=3000, path=None):
+        """Record the tree and fire fractions after every step.
+
+        The most recent capacity steps are kept in memory, in self.history;
+        if path is given, every step is also appended to that directory.
+        run() writes out all its steps before returning; after stepping with
+        advance_one_step(), call self.history.flush().
+        """
+        self.history = HistoryRecorder(("step", "tree_fraction", "fire_fraction"),
+                                       capacity=capacity, path=path)
+        return self.history
+
+    def track_fires(self, bins_per_decade=10):
+        """Collect the size and duration of every fire from now on.
+
+        The statistics are kept in self.fire_statistics; see
+        forest_engine/firestats.py.  Fires already burning are counted from
+        now on, as if they had just started.
+        """
+        self.fire_statistics = FireStatistics(self.size, bins_per_decade)
+        self.fire_statistics.ignite(np.flatnonzero(np.asarray(self.forest_fires)))
+        return self.fire_statistics
+
+    def save_checkpoint(self, path):
+        """Save the forest and its random generator to the directory path."""
+        settings = {"size": list(self.size), "p_sapling": self.p_sapling,
+                    "p_lightning": self.p_lightning, "name": self.name,
+                    "grid": self.grid, "frontier": self.frontier,
+                    "step_count": self.step_count}
+        grids = {"trees": self.trees, "forest_fires": self.forest_fires}
+        write_checkpoint(path, grids, self.rng, settings)
+
+    @classmethod
+    def from_checkpoint(cls, path, **kwargs):
+        """Resume a forest saved by save_checkpoint().
+
+        Keyword arguments override the saved constructor arguments, for
+        example to resume with n_workers=4.
+        """
+        checkpoint = Checkpoint(path)
+        settings = checkpoint.metadata
+        arguments = {"size": tuple(settings["size"]), "p_sapling": settings["p_sapling"],
+                     "p_lightning": settings["p_lightning"], "name": settings["name"],
+                     "grid": settings["grid"], "frontier": settings["frontier"],
+                     "rng": checkpoint.rng()}
+        arguments.update(kwargs)
+        forest = cls(**arguments)
+        checkpoint.load_grid("trees", out=forest.trees)
+        checkpoint.load_grid("forest_fires", out=forest.forest_fires)
+        forest.step_count = settings["step_count"]
+        return forest
 
     def grow_trees(self):
-        growth_sites = self._rand_bool(self.p_sapling)
-        self.trees[growth_sites] = True
+        """Plant saplings, returning the number of new trees."""
+        growth_sites = self._rand_cells(self.p_sapling)
+        num_new_trees = len(growth_sites) - np.count_nonzero(self.trees.flat[growth_sites])
+        self.trees.flat[growth_sites] = True
+        return num_new_trees
 
     def start_fires(self):
-        lightning_strikes = (self._rand_bool(self.p_lightning) & 
-            self.trees)
-        self.forest_fires[lightning_strikes] = True
+        lightning_strikes = self._rand_cells(self.p_lightning)
+        lightning_strikes = lightning_strikes[self.trees.flat[lightning_strikes]]
+        self.forest_fires.flat[lightning_strikes] = True
+        if self.fire_statistics is not None:
+            self.fire_statistics.ignite(lightning_strikes)
+        if self._fire_cells is not None:
+            self._fire_cells = np.union1d(self._fire_cells, lightning_strikes)
         
     def burn_trees(self):
-        fires = np.zeros((self.size[0] + 2, self.size[1] + 2), dtype=bool)
-        fires[1:-1, 1:-1] = self.forest_fires
-        north = fires[:-2, 1:-1]
-        south = fires[2:, 1:-1]
-        east = fires[1:-1, :-2]
-        west = fires[1:-1, 2:]
-        new_fires = (north | south | east | west) & self.trees
+        if self.grid == "packed":
+            self._burn_packed_trees()
+            return
+        if self._use_sparse_frontier():
+            self._burn_frontier()
+            return
+        self._fire_cells = None
+        new_fires = self._neighbours.touching(self.forest_fires, out=self._spare_fires)
+        new_fires &= self.trees
+        self.trees[self.forest_fires] = False
+        self.forest_fires, self._spare_fires = new_fires, self.forest_fires
+
+    def _advance_tiled(self):
+        # the random draws are made here, in the same order as grow_trees()
+        # and start_fires(), so a tiled forest matches an untiled one
+        growth_sites = self._rand_cells(self.p_sapling)
+        lightning_strikes = self._rand_cells(self.p_lightning)
+        if self.fire_statistics is not None:
+            self.fire_statistics.ignite(self._struck_trees(growth_sites, lightning_strikes))
+        self._tiles.step_slow_burn(growth_sites, lightning_strikes)
+        self.trees = self._tiles.trees
+        self.forest_fires = self._tiles.forest_fires
+
+    def _advance_compiled(self):
+        # the same random draws as grow_trees() and start_fires(), then the
+        # whole step in one pass over the grid
+        growth_sites = self._rand_cells(self.p_sapling)
+        lightning_strikes = self._rand_cells(self.p_lightning)
+        if self.fire_statistics is not None:
+            self.fire_statistics.ignite(self._struck_trees(growth_sites, lightning_strikes))
+        self._fire_cells = None
+        counts = slow_burn_step(self.trees.view(np.uint8), self.forest_fires.view(np.uint8),
+                                self._spare_fires.view(np.uint8), growth_sites,
+                                lightning_strikes)
+        self.forest_fires, self._spare_fires = self._spare_fires, self.forest_fires
+        return counts
+
+    def _counted_step(self, num_trees):
+        # advance_one_step() for run(), given the number of trees before the
+        # step and returning the numbers of trees and fires after it
+        self.step_count += 1
+        if self._tiles is not None:
+            self._advance_tiled()
+        elif self._use_compiled():
+            return self._advance_compiled()
+        else:
+            num_trees += self.grow_trees()
+            self.start_fires()
+            if self.grid == "dense" and self._use_sparse_frontier():
+                # only the cells on the fire front have changed
+                num_trees -= self._burn_frontier()
+                return num_trees, len(self._fire_cells)
+            self.burn_trees()
+        return _count(self.trees), _count(self.forest_fires)
+
+    def _struck_trees(self, growth_sites, lightning_strikes):
+        # the strikes that will find a tree, once the saplings have grown
+        has_tree = (self.trees.flat[lightning_strikes] |
+                    np.isin(lightning_strikes, growth_sites, assume_unique=True))
+        return lightning_strikes[has_tree]
+
+    def _spread_fire_statistics(self):
+        if self._fire_cells is not None:
+            fire_cells = self._fire_cells
+        else:
+            fire_cells = np.flatnonzero(np.asarray(self.forest_fires))
+        self.fire_statistics.spread(fire_cells)
+
+    def _use_compiled(self):
+        # the compiled kernel takes every step of a forest it is used for,
+        # however few cells are burning, unless frontier="sparse" asks for
+        # the sparse frontier by name; it returns the counts of trees and
+        # fires, so nothing is counted to decide
+        return self.compiled and self.frontier != "sparse"
+
+    def _use_sparse_frontier(self):
+        if self.frontier != "auto":
+            return self.frontier == "sparse"
+        if self._fire_cells is not None:
+            num_fires = len(self._fire_cells)
+        else:
+            num_fires = np.count_nonzero(self.forest_fires)
+        return num_fires < self.sparse_threshold * self.num_cells
+
+    def _burn_frontier(self):
+        # only the burning cells and their neighbours are touched; the list
+        # of burning cells is carried over to the next step
+        if self._fire_cells is None:
+            self._fire_cells = np.flatnonzero(self.forest_fires)
+        num_burnt = np.count_nonzero(self.trees.flat[self._fire_cells])
+        new_fire_cells = burn_frontier(self.trees, self._fire_cells)
+        self.forest_fires.flat[self._fire_cells] = False
+        self.forest_fires.flat[new_fire_cells] = True
+        self._fire_cells = new_fire_cells
+        return num_burnt
+
+    def _burn_packed_trees(self):
+        # same rule as the dense version, but the neighbour test is done
+        # with word shifts into a buffer we keep between steps
+        new_fires = self.forest_fires.neighbours(out=self._spare_fires)
+        new_fires &= self.trees
         self.trees[self.forest_fires] = False
+        self._spare_fires = self.forest_fires
         self.forest_fires = new_fires
 
-    def _rand_bool(self, p):
-        return np.random.uniform(size=self.trees.shape) < p
+    def _use_dense_grids(self, trees, forest_fires):
+        # the grids of a dense forest stepped in this process
+        self.trees = trees
+        self.forest_fires = forest_fires
+        self._spare_fires = np.zeros(self.size, dtype=bool)
+        # counts burning neighbours in buffers made once; see
+        # forest_engine/neighbourhood.py
+        self._neighbours = NeighbourCounter(self.size)
+
+    def _rand_cells(self, p):
+        # flat indices of the cells picked with probability p; the cost
+        # grows with the number of cells picked, not the size of the forest
+        return random_cells(self.num_cells, p, self.rng)
+
+
+def _count(grid):
+    # BitGrid.sum() counts set bits; for boolean arrays count_nonzero is
+    # much faster than sum()
+    if isinstance(grid, BitGrid):
+        return grid.sum()
+    return np.count_nonzero(grid)
 
 
 # Don't worry about how all of this code is put together.  Instead, lets look at how we can use it.
 # 
+# (If you want to run really big forests, `Forest(size=(10000, 10000), grid="packed")` stores the trees and fires 64 cells to a machine word, using an eighth of the memory.  It behaves exactly like the default `grid="dense"` forest, and `np.asarray(forest.trees)` gives you back an ordinary boolean array.  The forest reuses its arrays from step to step rather than making new ones, so to keep the fires of a step, take a copy: `forest.forest_fires.copy()`.  `Forest(rng=42)` draws its random numbers from `np.random.default_rng(42)`, so runs can be repeated.  `Forest(n_workers=4)` splits the forest into bands of rows that are advanced by four processes at once, again with exactly the same results; call `forest.close()` when you are done with it, or use it in a `with` block, to stop the processes.  If you have built the optional compiled kernels, with `python setup_kernels.py build_ext --inplace` in the `forest_engine` directory, dense forests take each step in a single compiled pass, whatever the number of fires; `Forest(compiled=False)` turns that off, and `Forest(frontier="sparse")` spreads the fires cell by cell instead.)
+# 
 # First, let's create ourselves a forest to play with:
 
 # In[ ]:
@@ -158,8 +445,35 @@ ax1 = fig.add_subplot(1,2,2)
 ax1.plot(tree_fractions)
 
 
+# Long runs like this one can be checkpointed, so they can be stopped and picked up again later.  `forest.save_checkpoint("forest.ckpt")` saves the trees, the fires and the state of the random number generator, and `Forest.from_checkpoint("forest.ckpt")` carries on exactly where the saved forest left off.  To save every 500 steps, keeping the two most recent checkpoints, call a `Checkpointer` after each step:
+# 
+#     from forest_engine import Checkpointer
+#     checkpointer = Checkpointer("forest_checkpoints", every=500)
+#     for i in range(5000):
+#         forest.advance_one_step()
+#         checkpointer(forest)
+#     forest = Forest.from_checkpoint(checkpointer.latest())
+# 
+# Loops like this one, that only collect statistics, can also be handed to the forest in one call, which is quicker for long runs because the forest keeps count of its trees and fires as it goes rather than counting them again after every step:
+# 
+#     tree_fractions, fire_fractions = forest.run(5000)
+# 
+# Forest fire models like this one are famous for the sizes of their fires, which follow a power law: there are many small fires and a few huge ones.  `forest.track_fires()` follows every fire from the lightning strike that started it until it burns out, and keeps histograms of fire sizes and durations with logarithmic bins, so that very long runs need no more memory:
+# 
+#     statistics = forest.track_fires()
+#     forest.run(100000)
+#     plt.loglog(*statistics.sizes.density())
+# 
+# Instead of keeping our own list, we could also ask the forest to keep its history for us.  `forest.track_history()` records the tree and fire fractions after every step in a fixed-size buffer, which is the same recorder the GUI version of this model uses for its plots; `forest.history.view("tree_fraction")` then gives the most recent values as an array, ready to plot.
+# 
 # ...and interesting behavior emerges, and you're already thinking, what are the probabilities, and how do I tweak them, and let's run more cycles to see the patterns.
 # 
 # You should feel free to investigate this example further and play around with the parameters some more.
+# 
+# If you want to compare many parameter choices, `forest_engine.ForestEnsemble` runs a whole stack of forests side by side, each with its own `p_sapling` and `p_lightning`:
+# 
+#     from forest_engine import ForestEnsemble
+#     ensemble = ForestEnsemble.sweep([0.001, 0.0025, 0.005], [5.e-6, 5.e-5])
+#     tree_fractions, fire_fractions = ensemble.run(5000)
 
 # Copyright 2008-2016, Enthought, Inc.<br>Use only permitted under license.  Copying, sharing, redistributing or other unauthorized use strictly prohibited.<br>http://www.enthought.com
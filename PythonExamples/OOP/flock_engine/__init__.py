@@ -0,0 +1,15 @@
+"""
+Flock engine
+============
+
+Support code for the boids Flock models in the OOP lectures.  The Flock and
+Behavior classes themselves live in the exercises; this package holds the
+pieces that are shared between them or are too large to define inline.
+"""
+
+from .neighbors import (NEIGHBOR_INDEXES, CellListIndex, KDTreeIndex,
+                        NeighborIndex, sum_over_neighbors)
+from .accelerations import FusedAccelerations
+from .shared import FlockRunner, SharedFlocks
+from .trajectory import (Trajectory, TrajectoryWriter, animate_trajectory,
+                         record_flock)
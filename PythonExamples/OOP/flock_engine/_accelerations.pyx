@@ -0,0 +1,55 @@
+#cython: boundscheck=False, wraparound=False, cdivision=True
+# Compiled accelerations for flock_engine.accelerations
+
+from cython.parallel cimport prange
+
+# the order of accelerations.TERMS
+cdef enum:
+    SEPARATION = 0
+    ALIGNMENT = 1
+    COHESION = 2
+
+cdef double MIN_DISTANCE = 0.1
+
+
+def neighbor_terms(const double[:, ::1] positions,
+                   const double[:, ::1] velocities,
+                   const double[:, ::1] distances,
+                   const Py_ssize_t[:, ::1] neighbors,
+                   const Py_ssize_t[::1] terms, const Py_ssize_t[::1] counts,
+                   const double[::1] weights, double[:, ::1] accel):
+    """ Add the neighbor terms of every boid to accel, in place.
+
+    terms are indices into accelerations.TERMS, with the neighbor count and
+    weight of each in counts and weights.
+    """
+    cdef Py_ssize_t n_boids = positions.shape[0]
+    cdef Py_ssize_t n_dim = positions.shape[1]
+    cdef Py_ssize_t i, t, j, d, term, count, other
+    cdef double weight, total, distance
+
+    # each boid only writes its own row of accel
+    for i in prange(n_boids, nogil=True, schedule='static'):
+        for t in range(terms.shape[0]):
+            term = terms[t]
+            count = counts[t]
+            weight = weights[t]
+            for d in range(n_dim):
+                total = 0.0
+                for j in range(count):
+                    other = neighbors[i, j]
+                    if term == SEPARATION:
+                        distance = distances[i, j]
+                        if distance < MIN_DISTANCE:
+                            distance = MIN_DISTANCE
+                        total = total + ((positions[other, d] -
+                                          positions[i, d]) /
+                                         (distance * distance))
+                    elif term == ALIGNMENT:
+                        total = total + velocities[other, d]
+                    else:
+                        total = total + positions[other, d] - positions[i, d]
+                if term == SEPARATION:
+                    accel[i, d] += weight * total
+                else:
+                    accel[i, d] += weight * (total / count - velocities[i, d])
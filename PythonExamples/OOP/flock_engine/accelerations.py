@@ -0,0 +1,160 @@
+"""
+Fused accelerations
+-------------------
+
+A ComposedFlock adds up the accelerations of its behaviors one at a time,
+and each behavior makes its own arrays to do it: Separation alone gathers a
+(size, k, n_dim) array of the deltas to every boid's neighbors, every step.
+FusedAccelerations works out the neighbor behaviors of a step together:
+
+    - the deltas to the neighbors and their velocities are gathered once,
+      for the largest neighbor count, into buffers kept between steps
+    - each behavior adds its share into one acceleration buffer, working in
+      a single scratch buffer, so a step allocates no (size, n_dim) arrays
+
+The neighbor behaviors are described to it as terms, (term, count, weight):
+
+    separation  sum of delta / distance ** 2 over the neighbors
+    alignment   mean velocity of the neighbors less the boid's own
+    cohesion    mean delta to the neighbors less the boid's velocity
+
+each times the weight, over the count nearest neighbors.  These are the
+accelerations of the Separation, Alignment and Cohesion behaviors.
+
+If the compiled ``_accelerations`` extension has been built with
+
+    python setup_kernels.py build_ext --inplace
+
+all the terms are summed in one pass over the boids instead, with the boids
+split over threads; neighbors are read where they are and nothing is
+gathered.  Both give the same accelerations, up to rounding.  The kernel
+works in float64; float32 flocks use NumPy.
+"""
+
+import numpy as np
+
+try:
+    from . import _accelerations
+except ImportError:
+    _accelerations = None
+
+TERMS = ("separation", "alignment", "cohesion")
+
+# Separation treats closer neighbors as this close
+MIN_DISTANCE = 0.1
+
+
+class FusedAccelerations(object):
+    """Add up the accelerations of a flock's behaviors in place.
+
+    Parameters
+    ==========
+
+        size: int
+            number of boids
+
+        n_dim: int
+            number of dimensions
+
+        compiled: bool
+            use the compiled kernel; by default it is used if it was built
+            and dtype is float64
+
+        dtype: dtype
+            type of the accelerations, and of the flock's arrays
+
+    """
+    def __init__(self, size, n_dim, compiled=None, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        if compiled is None:
+            compiled = (_accelerations is not None and
+                        self.dtype == np.float64)
+        elif compiled and _accelerations is None:
+            raise ImportError("the _accelerations extension is not built")
+        elif compiled and self.dtype != np.float64:
+            raise ValueError("the compiled kernel only works in float64")
+        self.size = size
+        self.n_dim = n_dim
+        self.compiled = compiled
+
+        self.accel = np.zeros((size, n_dim), self.dtype)
+        self._scratch = np.empty((size, n_dim), self.dtype)
+        self._deltas = None
+        self._neighbor_velocities = None
+
+    def __repr__(self):
+        return "{}(size={}, n_dim={}, compiled={})".format(
+            self.__class__.__name__, self.size, self.n_dim, self.compiled)
+
+    def start(self):
+        """Zero the acceleration buffer for a new step and return it."""
+        self.accel.fill(0.0)
+        return self.accel
+
+    def add_neighbor_terms(self, positions, velocities, distances, neighbors,
+                           terms):
+        """Add the neighbor terms to the acceleration buffer.
+
+        distances and neighbors are the (size, k) nearest neighbors of every
+        boid, nearest first, with k at least the largest count of the terms.
+        """
+        for term, count, weight in terms:
+            if term not in TERMS:
+                raise ValueError("unknown term {!r}, expected one of "
+                                 "{}".format(term, TERMS))
+            if count > neighbors.shape[1]:
+                raise ValueError("{} neighbors asked for, {} given".format(
+                    count, neighbors.shape[1]))
+        if not terms:
+            return
+        if self.compiled:
+            _accelerations.neighbor_terms(
+                np.ascontiguousarray(positions),
+                np.ascontiguousarray(velocities),
+                np.ascontiguousarray(distances),
+                np.ascontiguousarray(neighbors, dtype=np.intp),
+                np.array([TERMS.index(term) for term, _, _ in terms],
+                         dtype=np.intp),
+                np.array([count for _, count, _ in terms], dtype=np.intp),
+                np.array([weight for _, _, weight in terms], dtype=float),
+                self.accel)
+            return
+
+        self._gather(positions, velocities,
+                     neighbors[:, :max(count for _, count, _ in terms)])
+        for term, count, weight in terms:
+            getattr(self, '_' + term)(velocities, distances[:, :count],
+                                      count, weight)
+
+    def _gather(self, positions, velocities, neighbors):
+        # the deltas to, and velocities of, the neighbors of every boid
+        shape = neighbors.shape + (self.n_dim,)
+        if self._deltas is None or self._deltas.shape != shape:
+            self._deltas = np.empty(shape, self.dtype)
+            self._neighbor_velocities = np.empty(shape, self.dtype)
+        np.take(positions, neighbors, axis=0, out=self._deltas, mode='clip')
+        self._deltas -= positions[:, np.newaxis, :]
+        np.take(velocities, neighbors, axis=0, out=self._neighbor_velocities,
+                mode='clip')
+
+    def _separation(self, velocities, distances, count, weight):
+        scale = (weight / distances.clip(MIN_DISTANCE)**2).astype(
+            self.dtype, copy=False)
+        np.einsum('ijk,ij->ik', self._deltas[:, :count], scale,
+                  out=self._scratch)
+        self.accel += self._scratch
+
+    def _alignment(self, velocities, distances, count, weight):
+        self._add_mean_less_velocity(self._neighbor_velocities[:, :count],
+                                     velocities, weight)
+
+    def _cohesion(self, velocities, distances, count, weight):
+        self._add_mean_less_velocity(self._deltas[:, :count], velocities,
+                                     weight)
+
+    def _add_mean_less_velocity(self, values, velocities, weight):
+        values.sum(axis=1, out=self._scratch)
+        self._scratch /= values.shape[1]
+        self._scratch -= velocities
+        self._scratch *= weight
+        self.accel += self._scratch
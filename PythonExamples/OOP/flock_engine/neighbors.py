@@ -0,0 +1,257 @@
+"""
+Neighbor indexes
+----------------
+
+The flocking behaviors ask two kinds of question about the boids near each
+boid: "which are the k nearest?" and "which are closer than r?".  A
+NeighborIndex answers both for every boid of a flock at once.  It is built
+from the positions at the start of a step and thrown away at the end.
+
+Two indexes are provided:
+
+    KDTreeIndex     SciPy's cKDTree; good for any spread of boids
+    CellListIndex   a uniform grid of cells over the forest; for dense
+                    flocks, and radius queries, it only ever compares boids
+                    in neighboring cells
+
+Both start by sorting the boids by the key of the grid cell they are in.
+For up to 65536 cells the keys are sorted as uint16, which NumPy does with a
+radix sort, so building is linear in the number of boids.  The cell list
+uses the sorted order as its cell table, and the KD-tree is queried in that
+order, so boids near each other in space are handled together.
+
+Radius queries return pairs, sorted by owner and then by distance:
+
+    owners, neighbors, distances = index.within(radius)
+
+where neighbors[i] is within radius of owners[i].  sum_over_neighbors()
+adds up a per-pair quantity for each owner.
+"""
+
+from itertools import product
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# a stable sort of keys this small is a radix sort in NumPy
+_RADIX_SORT_KEYS = 1 << 16
+
+
+class NeighborIndex(object):
+    """ Interface of the neighbor indexes.
+
+    Parameters
+    ==========
+
+        positions: array
+            (n_boids, n_dim) positions of the boids
+
+        bounds: array
+            size of the forest in each dimension; boids outside it are
+            counted as in the nearest cell
+
+        cell_size: float
+            width of the grid cells
+
+    """
+    def __init__(self, positions, bounds, cell_size):
+        self.positions = positions
+        self.cell_size = float(cell_size)
+        self.shape = tuple(max(1, int(np.ceil(bound / self.cell_size)))
+                           for bound in bounds)
+        self.cells = np.floor(positions / self.cell_size).astype(np.intp)
+        np.clip(self.cells, 0, np.array(self.shape) - 1, out=self.cells)
+        self.keys = np.ravel_multi_index(tuple(self.cells.T), self.shape)
+        self.order = sort_by_key(self.keys, int(np.prod(self.shape)))
+
+    def __repr__(self):
+        return "{}(n_boids={}, cell_size={})".format(
+            self.__class__.__name__, len(self.positions), self.cell_size)
+
+    def nearest(self, count, eps=0.0):
+        """ The count nearest neighbors of every boid, nearest first.
+
+        Returns (distances, neighbors) arrays of shape (n_boids, count);
+        a boid is not its own neighbor.
+        """
+        raise NotImplementedError()
+
+    def within(self, radius):
+        """ All pairs of boids at most radius apart.
+
+        Returns (owners, neighbors, distances) arrays, sorted by owner and
+        then by distance; every pair appears once for each of its boids.
+        """
+        raise NotImplementedError()
+
+
+class KDTreeIndex(NeighborIndex):
+    """ Neighbor queries with SciPy's cKDTree """
+
+    def __init__(self, positions, bounds, cell_size):
+        super(KDTreeIndex, self).__init__(positions, bounds, cell_size)
+        self.tree = cKDTree(positions)
+
+    def nearest(self, count, eps=0.0):
+        # query in cell order, for locality, and put the answers back
+        distances, neighbors = self.tree.query(self.positions[self.order],
+                                               count + 1, eps)
+        result_distances = np.empty((len(self.positions), count))
+        result_neighbors = np.empty((len(self.positions), count),
+                                    dtype=np.intp)
+        # first column is always the boid itself, so ignore
+        result_distances[self.order] = distances[:, 1:]
+        result_neighbors[self.order] = neighbors[:, 1:]
+        return result_distances, result_neighbors
+
+    def within(self, radius):
+        pairs = self.tree.query_pairs(radius, output_type='ndarray')
+        owners = np.concatenate([pairs[:, 0], pairs[:, 1]])
+        neighbors = np.concatenate([pairs[:, 1], pairs[:, 0]])
+        return _sorted_pairs(self.positions, owners, neighbors)
+
+
+class CellListIndex(NeighborIndex):
+    """ Neighbor queries on a uniform grid of cells
+
+    A boid's neighbors closer than reach * cell_size are all in the block of
+    cells reaching ``reach`` cells out from its own, so queries only compare
+    the boids in those blocks.  Nearest neighbor queries widen the block
+    for the boids that did not find enough neighbors close enough.
+
+    The boids are taken chunk_size at a time, in cell order, with a row of
+    candidates each; sorting many short rows is much quicker than sorting
+    all the pairs at once.
+    """
+
+    chunk_size = 4096
+
+    def __init__(self, positions, bounds, cell_size):
+        super(CellListIndex, self).__init__(positions, bounds, cell_size)
+        counts = np.bincount(self.keys, minlength=int(np.prod(self.shape)))
+        # the boids of cell c are order[starts[c]:starts[c + 1]]
+        self.starts = np.concatenate([[0], np.cumsum(counts)])
+
+    def nearest(self, count, eps=0.0):
+        n_boids = len(self.positions)
+        if count >= n_boids:
+            raise ValueError("a flock of {} boids has fewer than {} "
+                             "neighbors".format(n_boids, count))
+        distances = np.empty((n_boids, count))
+        neighbors = np.empty((n_boids, count), dtype=np.intp)
+        whole_forest = max(self.shape)
+        for chunk in self._chunks(self.order):
+            reach = 1
+            while len(chunk) > 0:
+                chunk_distances, chunk_neighbors = self._candidates(
+                    chunk, reach, count + 1)
+                kth = chunk_distances[:, count - 1]
+                if reach < whole_forest:
+                    # only the neighbors this close are sure to be nearest
+                    done = kth <= reach * self.cell_size
+                else:
+                    done = np.isfinite(kth)
+                distances[chunk[done]] = chunk_distances[done, :count]
+                neighbors[chunk[done]] = chunk_neighbors[done, :count]
+                chunk = chunk[~done]
+                reach += 1
+        return distances, neighbors
+
+    def within(self, radius):
+        reach = max(1, int(np.ceil(radius / self.cell_size)))
+        owners = []
+        neighbors = []
+        distances = []
+        # in boid order, so the pairs come out sorted by owner
+        for chunk in self._chunks(np.arange(len(self.positions))):
+            chunk_distances, chunk_neighbors = self._candidates(chunk, reach)
+            close = chunk_distances <= radius
+            owners.append(np.repeat(chunk, close.sum(axis=1)))
+            neighbors.append(chunk_neighbors[close])
+            distances.append(chunk_distances[close])
+        return (np.concatenate(owners), np.concatenate(neighbors),
+                np.concatenate(distances))
+
+    def _chunks(self, boids):
+        for begin in range(0, len(boids), self.chunk_size):
+            yield boids[begin:begin + self.chunk_size]
+
+    def _candidates(self, boids, reach, min_columns=1):
+        # the distances to and indices of the other boids in the block of
+        # cells around each boid, a row for each, nearest first; short rows
+        # are padded with infinite distances
+        shape = np.array(self.shape)
+        blocks = []
+        for offset in product(range(-reach, reach + 1), repeat=len(shape)):
+            cells = self.cells[boids] + offset
+            inside = np.all((cells >= 0) & (cells < shape), axis=1)
+            keys = np.ravel_multi_index(tuple(cells[inside].T), self.shape)
+            n_pairs = np.zeros(len(boids), dtype=np.intp)
+            n_pairs[inside] = self.starts[keys + 1] - self.starts[keys]
+            begin = np.zeros(len(boids), dtype=np.intp)
+            begin[inside] = self.starts[keys]
+            blocks.append((begin, n_pairs))
+
+        row_lengths = sum(n_pairs for begin, n_pairs in blocks)
+        n_columns = max(int(row_lengths.max()), min_columns)
+        neighbors = np.zeros((len(boids), n_columns), dtype=np.intp)
+        filled = np.zeros((len(boids), n_columns), dtype=bool)
+        used = np.zeros(len(boids), dtype=np.intp)
+        rows = np.arange(len(boids))
+        for begin, n_pairs in blocks:
+            total = n_pairs.sum()
+            if total == 0:
+                continue
+            # the runs begin .. begin + n_pairs of the cell table go into
+            # the rows after the candidates found so far
+            run_starts = np.cumsum(n_pairs) - n_pairs
+            within_run = np.arange(total) - np.repeat(run_starts, n_pairs)
+            pair_rows = np.repeat(rows, n_pairs)
+            columns = np.repeat(used, n_pairs) + within_run
+            neighbors[pair_rows, columns] = self.order[
+                np.repeat(begin, n_pairs) + within_run]
+            filled[pair_rows, columns] = True
+            used += n_pairs
+
+        deltas = self.positions[neighbors] - self.positions[boids, np.newaxis]
+        distances = np.sqrt((deltas ** 2).sum(axis=-1))
+        distances[~filled | (neighbors == boids[:, np.newaxis])] = np.inf
+        nearest_first = np.argsort(distances, axis=1)
+        return (np.take_along_axis(distances, nearest_first, axis=1),
+                np.take_along_axis(neighbors, nearest_first, axis=1))
+
+
+NEIGHBOR_INDEXES = {
+    "kdtree": KDTreeIndex,
+    "cells": CellListIndex,
+}
+
+
+def sort_by_key(keys, n_keys):
+    """ Indices that sort integer keys in [0, n_keys), stably. """
+    if n_keys <= _RADIX_SORT_KEYS:
+        keys = keys.astype(np.uint16)
+    return np.argsort(keys, kind='stable')
+
+
+def sum_over_neighbors(owners, values, n_boids):
+    """ Add up per-pair values for each owner.
+
+    values has one row per pair; returns an (n_boids, ...) array of the
+    sums, zero for boids without neighbors.
+    """
+    values = np.asarray(values)
+    if values.ndim == 1:
+        return np.bincount(owners, weights=values, minlength=n_boids)
+    sums = np.empty((n_boids,) + values.shape[1:])
+    for column in range(values.shape[1]):
+        sums[:, column] = np.bincount(owners, weights=values[:, column],
+                                      minlength=n_boids)
+    return sums
+
+
+def _sorted_pairs(positions, owners, neighbors):
+    distances = np.sqrt(((positions[neighbors] - positions[owners]) ** 2)
+                        .sum(axis=1))
+    order = np.lexsort((distances, owners))
+    return owners[order], neighbors[order], distances[order]
@@ -0,0 +1,20 @@
+# Build the optional compiled kernels of flock_engine in place:
+#
+#     python setup_kernels.py build_ext --inplace
+#
+# flock_engine works without them, using NumPy instead.
+
+from distutils.core import setup
+from distutils.extension import Extension
+from Cython.Distutils import build_ext
+
+# the kernels split their loops over threads with OpenMP
+openmp = dict(extra_compile_args=["-O3", "-fopenmp"],
+              extra_link_args=["-fopenmp"])
+
+exts = [Extension("_accelerations", ["_accelerations.pyx"], **openmp)]
+
+setup(
+    cmdclass = {'build_ext': build_ext},
+    ext_modules = exts,
+)
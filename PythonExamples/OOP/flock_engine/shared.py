@@ -0,0 +1,296 @@
+"""
+Shared flocks
+-------------
+
+Studies of flocking run many flocks side by side, with different behavior
+weights, and every flock steps on its own.  FlockRunner steps them in worker
+processes, a share of the flocks to each, so the flocks are advanced on all
+the cores at once.
+
+Every step of every flock is published, its positions and velocities copied
+into one multiprocessing.shared_memory block, a SharedFlocks: no flock is
+ever pickled after the workers start, and any other process can attach to
+the block by name and look at the flocks as they run, without copying them:
+
+    shared = SharedFlocks.attach(runner.name)
+    step, positions, velocities = shared.snapshot(0)
+    ... plot positions ...
+    if not shared.still_valid(0, step):
+        ... the flock moved on while we looked, try again ...
+    shared.close()
+
+Each flock has two buffers for its positions and velocities.  Step s of the
+flock is in buffer s % 2.  A worker steps its own copy of the flock, copies
+the new state into the other buffer and then publishes step s + 1; the
+buffer of step s is only written again for step s + 2.  A snapshot is a
+view of the published buffer, so a reader copies or plots it and then asks
+still_valid() whether the flock is still at that step: if it is, nothing
+was written to the buffer while it was being read.
+
+The buffers have the dtype of the flocks, float64 or float32, which the
+block records in its header.  Snapshots are always (size, n_dim) arrays,
+whatever layout the flocks keep their own state in.
+"""
+
+import multiprocessing
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_INT = np.dtype(np.int64)
+# the dtypes the buffers can have
+FLOAT_TYPES = (np.dtype(np.float64), np.dtype(np.float32))
+# header fields before the sizes and steps of the flocks
+_FIELDS = 3
+
+
+class SharedFlocks(object):
+    """The positions and velocities of several flocks in shared memory.
+
+    Make a new block with SharedFlocks.create(sizes, n_dim), or attach to
+    one made by another process with SharedFlocks.attach(name).
+    """
+    def __init__(self, memory):
+        self.memory = memory
+        n_flocks, n_dim, dtype_char = np.ndarray((_FIELDS,), _INT, memory.buf)
+        n_flocks = int(n_flocks)
+        self.n_dim = int(n_dim)
+        self.dtype = np.dtype(chr(dtype_char))
+        header = np.ndarray((_FIELDS + 2 * n_flocks,), _INT, memory.buf)
+        self.sizes = tuple(int(size)
+                           for size in header[_FIELDS:_FIELDS + n_flocks])
+        # the number of steps each flock has taken
+        self.steps = header[_FIELDS + n_flocks:]
+
+        self._positions = []
+        self._velocities = []
+        offset = header.nbytes
+        for size in self.sizes:
+            shape = (2, size, self.n_dim)
+            self._positions.append(np.ndarray(shape, self.dtype, memory.buf,
+                                              offset))
+            offset += self._positions[-1].nbytes
+            self._velocities.append(np.ndarray(shape, self.dtype, memory.buf,
+                                               offset))
+            offset += self._velocities[-1].nbytes
+
+    def __repr__(self):
+        return "{}(name={!r}, sizes={}, n_dim={}, dtype={})".format(
+            self.__class__.__name__, self.name, self.sizes, self.n_dim,
+            self.dtype)
+
+    @classmethod
+    def create(cls, sizes, n_dim, dtype=np.float64):
+        """Make a zeroed block for flocks of the given sizes."""
+        dtype = np.dtype(dtype)
+        if dtype not in FLOAT_TYPES:
+            raise ValueError("flocks must be float64 or float32, not "
+                             "{}".format(dtype))
+        n_header = _FIELDS + 2 * len(sizes)
+        n_bytes = (n_header * _INT.itemsize +
+                   sum(4 * size * n_dim for size in sizes) * dtype.itemsize)
+        memory = shared_memory.SharedMemory(create=True, size=n_bytes)
+        header = np.ndarray((n_header,), _INT, memory.buf)
+        header[:] = ([len(sizes), n_dim, ord(dtype.char)] + list(sizes) +
+                     [0] * len(sizes))
+        return cls(memory)
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to the block made by another process."""
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    @property
+    def n_flocks(self):
+        return len(self.sizes)
+
+    def snapshot(self, flock):
+        """The last published step of a flock, as (step, positions,
+        velocities), the arrays views of the shared block."""
+        step = int(self.steps[flock])
+        return (step, self._positions[flock][step % 2],
+                self._velocities[flock][step % 2])
+
+    def still_valid(self, flock, step):
+        """Whether the flock is still at step, so a snapshot of it has not
+        been written to since it was taken."""
+        return bool(self.steps[flock] == step)
+
+    def load(self, flock, positions, velocities):
+        """Set the state of a flock, as its current step."""
+        step = int(self.steps[flock])
+        self._positions[flock][step % 2] = positions
+        self._velocities[flock][step % 2] = velocities
+
+    def advance(self, flock, model):
+        """Step model, the Flock stored as flock, and publish the step."""
+        model.do_one_step()
+        self.publish(flock, model.positions, model.velocities)
+
+    def publish(self, flock, positions, velocities):
+        """Copy the state of a flock into the free buffer and make it the
+        next step."""
+        step = int(self.steps[flock])
+        new = (step + 1) % 2
+        self._positions[flock][new] = positions
+        self._velocities[flock][new] = velocities
+        self.steps[flock] = step + 1
+
+    def close(self):
+        """Detach from the block; the arrays can no longer be used."""
+        self.steps = None
+        self._positions = []
+        self._velocities = []
+        self.memory.close()
+
+    def unlink(self):
+        """Free the block, once every process has closed it."""
+        self.memory.unlink()
+
+
+class FlockRunner(object):
+    """Advance several flocks in worker processes.
+
+    Parameters
+    ==========
+
+        flocks: list of Flock
+            the flocks to run, all with the same number of dimensions and
+            the same dtype, float64 or float32
+
+        processes: int
+            number of worker processes; by default one per core, up to one
+            per flock
+
+        seed: int
+            worker w seeds its random numbers with seed + w; by default
+            they are seeded from the operating system
+
+    The flocks are copied into the workers when they start.  The flocks
+    given stay as they were; their state as they run is in shared.  Call
+    close(), or use the runner in a with block, to stop the workers and
+    free the block; a runner that is never closed does so when it is
+    garbage collected.
+    """
+    def __init__(self, flocks, processes=None, seed=None):
+        self.flocks = list(flocks)
+        if not self.flocks:
+            raise ValueError("no flocks to run")
+        n_dims = set(flock.n_dim for flock in self.flocks)
+        if len(n_dims) > 1:
+            raise ValueError("the flocks have different numbers of "
+                             "dimensions: {}".format(sorted(n_dims)))
+        dtypes = set(np.dtype(getattr(flock, 'dtype', np.float64))
+                     for flock in self.flocks)
+        if len(dtypes) > 1:
+            raise ValueError("the flocks have different dtypes: {}".format(
+                sorted(str(dtype) for dtype in dtypes)))
+        if processes is None:
+            processes = min(multiprocessing.cpu_count(), len(self.flocks))
+        self.processes = processes
+
+        self.shared = SharedFlocks.create([flock.size
+                                           for flock in self.flocks],
+                                          n_dims.pop(), dtypes.pop())
+        for index, flock in enumerate(self.flocks):
+            self.shared.load(index, flock.positions, flock.velocities)
+
+        self._connections = []
+        self._workers = []
+        # the lists fill up as the workers start
+        self._finalizer = weakref.finalize(
+            self, _release, self._connections, self._workers, self.shared)
+        for worker in range(processes):
+            flocks = dict((index, self.flocks[index]) for index in
+                          range(worker, len(self.flocks), processes))
+            worker_seed = None if seed is None else seed + worker
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_work, args=(self.shared.name, flocks, worker_seed,
+                                    worker_connection))
+            process.daemon = True
+            process.start()
+            self._connections.append(connection)
+            self._workers.append(process)
+
+    def __repr__(self):
+        return "{}(n_flocks={}, processes={})".format(
+            self.__class__.__name__, len(self.flocks), self.processes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def name(self):
+        """Name of the shared block, for SharedFlocks.attach()."""
+        return self.shared.name
+
+    def start(self, n_steps):
+        """Start every flock taking n_steps steps, without waiting."""
+        for connection in self._connections:
+            connection.send(n_steps)
+
+    def wait(self):
+        """Wait for the steps asked for by start() to finish."""
+        for connection in self._connections:
+            error = connection.recv()
+            if error is not None:
+                raise RuntimeError("a flock worker failed:\n" + error)
+
+    def run(self, n_steps):
+        """Advance every flock by n_steps steps."""
+        self.start(n_steps)
+        self.wait()
+
+    def snapshot(self, flock):
+        """The last published step of a flock; see SharedFlocks.snapshot"""
+        return self.shared.snapshot(flock)
+
+    def close(self):
+        """Stop the workers and free the shared block."""
+        self._finalizer()
+        self.shared = None
+
+
+def _release(connections, workers, shared):
+    for connection in connections:
+        connection.send(None)
+    for process in workers:
+        process.join()
+    try:
+        shared.close()
+    except BufferError:
+        # someone still holds a snapshot; the mapping goes away with the
+        # last view, we only need to remove the name
+        pass
+    shared.unlink()
+
+
+def _work(name, flocks, seed, connection):
+    # a worker process: step its flocks for as long as it is asked to
+    np.random.seed(seed)
+    shared = SharedFlocks.attach(name)
+    try:
+        while True:
+            n_steps = connection.recv()
+            if n_steps is None:
+                break
+            try:
+                for step in range(n_steps):
+                    for index, flock in flocks.items():
+                        shared.advance(index, flock)
+            except Exception:
+                import traceback
+                connection.send(traceback.format_exc())
+            else:
+                connection.send(None)
+    finally:
+        shared.close()
@@ -0,0 +1,8 @@
+# the Flock classes the tests run are the solution of the composition
+# exercise, which is not a package; make it importable as boids_solution
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, os.pardir, "17MethodResolution",
+                                "flock_composition"))
@@ -0,0 +1,43 @@
+"""
+A fused ComposedFlock accelerates its boids as the plain one does, up to
+rounding.  Run with pytest from PythonExamples/OOP.
+"""
+
+import numpy as np
+import pytest
+
+import boids_solution as boids
+from flock_engine import accelerations
+
+
+def make_flock(**kwargs):
+    np.random.seed(1)
+    flock = boids.ComposedFlock(300, **kwargs)
+    flock.velocities[...] = np.random.normal(0, 2, flock.velocities.shape)
+    flock.behaviors = [boids.Separation(), boids.Alignment(),
+                       boids.Cohesion(), boids.WallAvoidance(),
+                       boids.Seek(target=((70.0, 80.0),))]
+    return flock
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_fused_step_matches_plain_step(compiled):
+    if compiled and accelerations._accelerations is None:
+        pytest.skip("the flock_engine._accelerations extension is not built")
+    flock = make_flock()
+    fused = make_flock(fused=True, compiled=compiled)
+    for step in range(3):
+        flock.do_one_step()
+        fused.do_one_step()
+    np.testing.assert_allclose(fused.positions, flock.positions, rtol=1e-10)
+    np.testing.assert_allclose(fused.velocities, flock.velocities,
+                               rtol=1e-10, atol=1e-12)
+
+
+def test_float32_fused_step_stays_float32():
+    flock = boids.ComposedFlock(200, dtype=np.float32, soa=True, fused=True)
+    flock.behaviors = [boids.Separation(), boids.Alignment(),
+                       boids.Cohesion()]
+    flock.do_one_step()
+    assert flock.positions.dtype == np.float32
+    assert flock._fused.accel.dtype == np.float32
@@ -0,0 +1,56 @@
+"""
+The cell-list and KD-tree neighbor indexes give the same answers.  Run with
+pytest from PythonExamples/OOP.
+"""
+
+import numpy as np
+import pytest
+
+from flock_engine import CellListIndex, KDTreeIndex, sum_over_neighbors
+
+BOUNDS = np.array([150.0, 100.0])
+
+
+def positions(n_boids, seed=0):
+    rng = np.random.default_rng(seed)
+    # a few boids a little outside the forest, as between clips
+    return rng.uniform(-0.01, 1.01, (n_boids, 2)) * BOUNDS
+
+
+@pytest.mark.parametrize("cell_size", [3.0, 10.0, 200.0])
+@pytest.mark.parametrize("count", [1, 10, 51])
+def test_nearest_agree(cell_size, count):
+    points = positions(500)
+    kd_distances, kd_neighbors = KDTreeIndex(points, BOUNDS,
+                                             cell_size).nearest(count)
+    distances, neighbors = CellListIndex(points, BOUNDS,
+                                         cell_size).nearest(count)
+    np.testing.assert_allclose(distances, kd_distances)
+    np.testing.assert_array_equal(neighbors, kd_neighbors)
+    # nearest first, and never the boid itself
+    assert np.all(np.diff(distances, axis=1) >= 0)
+    assert not np.any(neighbors == np.arange(len(points))[:, np.newaxis])
+
+
+@pytest.mark.parametrize("cell_size", [3.0, 10.0])
+@pytest.mark.parametrize("radius", [2.0, 10.0, 25.0])
+def test_within_agree(cell_size, radius):
+    points = positions(500, seed=1)
+    kd_owners, kd_neighbors, kd_distances = KDTreeIndex(
+        points, BOUNDS, cell_size).within(radius)
+    owners, neighbors, distances = CellListIndex(
+        points, BOUNDS, cell_size).within(radius)
+    np.testing.assert_array_equal(owners, kd_owners)
+    np.testing.assert_array_equal(neighbors, kd_neighbors)
+    np.testing.assert_allclose(distances, kd_distances)
+    assert np.all(distances <= radius)
+    # every pair is there both ways round
+    assert (sorted(zip(owners.tolist(), neighbors.tolist())) ==
+            sorted(zip(neighbors.tolist(), owners.tolist())))
+
+
+def test_sum_over_neighbors():
+    owners = np.array([0, 0, 2])
+    values = np.array([[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]])
+    np.testing.assert_array_equal(sum_over_neighbors(owners, values, 4),
+                                  [[4, 6], [0, 0], [5, 6], [0, 0]])
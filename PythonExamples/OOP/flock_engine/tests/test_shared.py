@@ -0,0 +1,83 @@
+"""
+Tests of the shared-memory flock runner, with the flocks of the composition
+exercise.  Run with pytest from PythonExamples/OOP.
+"""
+
+import copy
+import gc
+
+import numpy as np
+import pytest
+
+import boids_solution as boids
+from flock_engine import FlockRunner, SharedFlocks
+
+SEED = 10
+
+
+def make_flocks(**kwargs):
+    np.random.seed(0)
+    flocks = []
+    for size in (60, 80):
+        flock = boids.ComposedFlock(size, **kwargs)
+        flock.behaviors = [boids.Separation(), boids.Alignment(),
+                           boids.Cohesion(), boids.WallAvoidance(),
+                           boids.RandomMovement(0.1)]
+        flocks.append(flock)
+    return flocks
+
+
+def step_serially(flock, seed, n_steps):
+    flock = copy.deepcopy(flock)
+    np.random.seed(seed)
+    for step in range(n_steps):
+        flock.do_one_step()
+    return flock
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"dtype": np.float32},
+                                    {"soa": True}])
+def test_runner_matches_serial_steps(kwargs):
+    flocks = make_flocks(**kwargs)
+    # a worker for each flock, so worker i steps flock i with seed SEED + i
+    with FlockRunner(flocks, processes=2, seed=SEED) as runner:
+        runner.run(3)
+        runner.run(2)
+        for index, flock in enumerate(flocks):
+            expected = step_serially(flock, SEED + index, 5)
+            step, positions, velocities = runner.snapshot(index)
+            assert step == 5
+            assert positions.dtype == flock.dtype
+            np.testing.assert_array_equal(positions, expected.positions)
+            np.testing.assert_array_equal(velocities, expected.velocities)
+
+
+def test_snapshot_is_invalid_once_the_flock_moves_on():
+    with FlockRunner(make_flocks(), processes=1, seed=SEED) as runner:
+        shared = SharedFlocks.attach(runner.name)
+        step, positions, velocities = shared.snapshot(0)
+        assert shared.still_valid(0, step)
+        runner.run(1)
+        assert not shared.still_valid(0, step)
+        step, positions, velocities = shared.snapshot(0)
+        assert shared.still_valid(0, step)
+        del positions, velocities
+        shared.close()
+
+
+def test_runner_rejects_mixed_dtypes():
+    flocks = make_flocks()
+    flocks[1] = make_flocks(dtype=np.float32)[1]
+    with pytest.raises(ValueError):
+        FlockRunner(flocks)
+
+
+def test_unclosed_runner_is_freed():
+    runner = FlockRunner(make_flocks(), processes=1, seed=SEED)
+    name = runner.name
+    workers = list(runner._workers)
+    del runner
+    gc.collect()
+    assert not any(process.is_alive() for process in workers)
+    with pytest.raises(FileNotFoundError):
+        SharedFlocks.attach(name)
@@ -0,0 +1,40 @@
+"""
+A recorded trajectory plays back the steps of the flock.  Run with pytest
+from PythonExamples/OOP.
+"""
+
+import copy
+
+import numpy as np
+
+import boids_solution as boids
+from flock_engine import Trajectory, record_flock
+
+
+def test_recorded_frames_are_the_flock_steps(tmp_path):
+    np.random.seed(2)
+    flock = boids.ComposedFlock(80)
+    flock.behaviors = [boids.Separation(), boids.Alignment(),
+                       boids.Cohesion(), boids.WallAvoidance()]
+    expected = [(flock.positions.copy(), flock.velocities.copy())]
+    stepped = copy.deepcopy(flock)
+    for step in range(1, 13):
+        stepped.do_one_step()
+        if step % 3 == 0:
+            expected.append((stepped.positions.copy(),
+                             stepped.velocities.copy()))
+
+    path = str(tmp_path / "flock")
+    trajectory = record_flock(flock, path, 12, every=3, chunk_frames=2)
+    # a trajectory opened afresh, over several chunk files
+    for recorded in (trajectory, Trajectory(path)):
+        assert len(recorded) == len(expected)
+        for (positions, velocities), (want_positions, want_velocities) in \
+                zip(recorded.frames(), expected):
+            assert positions.dtype == np.float32
+            np.testing.assert_array_equal(positions,
+                                          want_positions.astype(np.float32))
+            np.testing.assert_array_equal(velocities,
+                                          want_velocities.astype(np.float32))
+    np.testing.assert_array_equal(trajectory[-1][0],
+                                  expected[-1][0].astype(np.float32))
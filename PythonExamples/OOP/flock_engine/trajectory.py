@@ -0,0 +1,215 @@
+"""
+Trajectories
+------------
+
+Animating a flock live ties the speed of the simulation to the speed of
+drawing it.  record_flock() runs a flock headless instead, writing its
+positions and velocities to a trajectory file as it goes, and
+animate_trajectory() plays the trajectory back later, at whatever frame
+rate and stride suits, as often as wanted.
+
+A trajectory is a directory holding a ``trajectory.json`` header and the
+frames, in chunk files of ``chunk_frames`` frames each.  A chunk is a raw
+little-endian float32 array of shape (chunk_frames, 2, size, n_dim), the
+positions and then the velocities of each frame; float32 halves the files
+and is plenty to draw with.  The chunks are memory-mapped, both when writing
+and when reading, so a 10,000 step run never has to fit in memory and a
+frame read back is a view of the file, not a copy.
+"""
+
+import json
+import os
+
+import numpy as np
+
+HEADER_FILE = "trajectory.json"
+_FRAME_VALUE = np.dtype('<f4')
+
+
+class TrajectoryWriter(object):
+    """Append frames of a flock to a trajectory directory.
+
+    Parameters
+    ==========
+
+        path: str
+            directory of the trajectory, made if need be; an existing
+            trajectory there is replaced
+
+        size: int
+            number of boids
+
+        n_dim: int
+            number of dimensions
+
+        chunk_frames: int
+            number of frames in each chunk file
+
+        forest_size: sequence of float
+            optional size of the forest, kept for the replay
+
+    """
+    def __init__(self, path, size, n_dim, chunk_frames=256, forest_size=None):
+        self.path = path
+        self.size = size
+        self.n_dim = n_dim
+        self.chunk_frames = chunk_frames
+        self.forest_size = (None if forest_size is None else
+                            [float(length) for length in forest_size])
+        self.n_frames = 0
+        self._chunk = None
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        for filename in os.listdir(path):
+            if filename.startswith("chunk-"):
+                os.remove(os.path.join(path, filename))
+        self._write_header()
+
+    def __repr__(self):
+        return "{}(path={!r}, n_frames={})".format(
+            self.__class__.__name__, self.path, self.n_frames)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, positions, velocities):
+        """Write a frame, converting it to float32."""
+        index = self.n_frames % self.chunk_frames
+        if index == 0:
+            self._flush_chunk()
+            self._chunk = np.memmap(
+                _chunk_file(self.path, self.n_frames // self.chunk_frames),
+                dtype=_FRAME_VALUE, mode='w+',
+                shape=(self.chunk_frames, 2, self.size, self.n_dim))
+        self._chunk[index, 0] = positions
+        self._chunk[index, 1] = velocities
+        self.n_frames += 1
+
+    def flush(self):
+        """Make the frames written so far readable by a Trajectory."""
+        if self._chunk is not None:
+            self._chunk.flush()
+        self._write_header()
+
+    def close(self):
+        self._flush_chunk()
+        self._write_header()
+
+    def _flush_chunk(self):
+        if self._chunk is not None:
+            self._chunk.flush()
+            self._chunk = None
+
+    def _write_header(self):
+        header = {"size": self.size, "n_dim": self.n_dim,
+                  "chunk_frames": self.chunk_frames,
+                  "n_frames": self.n_frames, "dtype": _FRAME_VALUE.str,
+                  "forest_size": self.forest_size}
+        with open(os.path.join(self.path, HEADER_FILE), 'w') as header_file:
+            json.dump(header, header_file)
+
+
+class Trajectory(object):
+    """A recorded trajectory, read from its directory.
+
+    trajectory[i] is frame i, as (positions, velocities) float32 views of
+    the memory-mapped chunk files.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, HEADER_FILE)) as header_file:
+            header = json.load(header_file)
+        self.size = header["size"]
+        self.n_dim = header["n_dim"]
+        self.chunk_frames = header["chunk_frames"]
+        self.n_frames = header["n_frames"]
+        self.forest_size = header["forest_size"]
+        self._chunks = {}
+
+    def __repr__(self):
+        return "{}(path={!r}, n_frames={})".format(
+            self.__class__.__name__, self.path, self.n_frames)
+
+    def __len__(self):
+        return self.n_frames
+
+    def __getitem__(self, frame):
+        if frame < 0:
+            frame += self.n_frames
+        if not 0 <= frame < self.n_frames:
+            raise IndexError("frame {} of a {} frame trajectory".format(
+                frame, self.n_frames))
+        chunk, index = divmod(frame, self.chunk_frames)
+        if chunk not in self._chunks:
+            self._chunks[chunk] = np.memmap(
+                _chunk_file(self.path, chunk), dtype=_FRAME_VALUE, mode='r',
+                shape=(self.chunk_frames, 2, self.size, self.n_dim))
+        positions, velocities = self._chunks[chunk][index]
+        return positions, velocities
+
+    def frames(self, start=0, stop=None, stride=1):
+        """Iterate over (positions, velocities) of every stride-th frame."""
+        if stop is None:
+            stop = self.n_frames
+        for frame in range(start, stop, stride):
+            yield self[frame]
+
+
+def record_flock(flock, path, n_steps, every=1, chunk_frames=256):
+    """Run a flock for n_steps steps without drawing it.
+
+    The starting state and every ``every``-th step after it are written to
+    a trajectory at path, which is returned, opened for reading.
+    """
+    with TrajectoryWriter(path, flock.size, flock.n_dim, chunk_frames,
+                          flock.forest_size) as writer:
+        writer.append(flock.positions, flock.velocities)
+        for step in range(1, n_steps + 1):
+            flock.do_one_step()
+            if step % every == 0:
+                writer.append(flock.positions, flock.velocities)
+    return Trajectory(path)
+
+
+def animate_trajectory(trajectory, fps=30, stride=1, ax=None, **plot_args):
+    """A matplotlib animation of a trajectory.
+
+    Every stride-th frame is shown, fps frames a second.  The boids are
+    drawn on ax, or on new axes spanning the forest; plot_args go to plot().
+    """
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+
+    if ax is None:
+        fig = plt.figure()
+        limits = {}
+        if trajectory.forest_size is not None:
+            limits = dict(xlim=(0, trajectory.forest_size[0]),
+                          ylim=(0, trajectory.forest_size[1]))
+        ax = fig.add_subplot(111, aspect='equal', autoscale_on=False,
+                             **limits)
+    plot_args.setdefault('marker', 'o')
+    plot_args.setdefault('linestyle', '')
+    flock_plot, = ax.plot([], [], **plot_args)
+
+    def init():
+        flock_plot.set_data([], [])
+        return flock_plot,
+
+    def animate(frame):
+        positions, velocities = trajectory[frame]
+        flock_plot.set_data(positions[:, 0], positions[:, 1])
+        return flock_plot,
+
+    return animation.FuncAnimation(ax.figure, animate,
+                                   frames=range(0, len(trajectory), stride),
+                                   interval=1000.0 / fps, blit=True,
+                                   init_func=init)
+
+
+def _chunk_file(path, chunk):
+    return os.path.join(path, "chunk-{:05d}.f4".format(chunk))
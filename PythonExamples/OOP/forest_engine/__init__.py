@@ -0,0 +1,21 @@
+"""
+Forest engine
+=============
+
+Support code for the forest fire models in the OOP lectures.  The Forest
+classes themselves live in the lecture notebooks and the GUI example; this
+package holds the pieces that are shared between them or are too large to
+define inline.
+"""
+
+from .bitgrid import BitGrid
+from .ensemble import ForestEnsemble
+from .tiled import TiledForestEngine
+from .groves import GroveIndex
+from .frontier import burn_frontier
+from .sampling import make_rng, random_cells
+from .checkpoint import Checkpoint, Checkpointer, write_checkpoint
+from .history import HistoryRecorder, RunningHistogram, load_history
+from .neighbourhood import NeighbourCounter
+from .fused import slow_burn_step
+from .firestats import FireStatistics, LogHistogram
@@ -0,0 +1,109 @@
+#cython: boundscheck=False, wraparound=False
+# Compiled forest steps for forest_engine.fused
+
+from cython.parallel cimport prange
+
+import numpy as np
+
+
+cdef struct Counts:
+    Py_ssize_t trees
+    Py_ssize_t fires
+
+
+cdef inline Counts _burn_cell(unsigned char *trees,
+                              const unsigned char *fires,
+                              unsigned char *new_fires, unsigned char burning,
+                              Py_ssize_t j, Counts counts) noexcept nogil:
+    # the fires take the trees next to them, and burn out their own
+    cdef unsigned char tree = trees[j]
+    cdef unsigned char fire = burning & tree
+    new_fires[j] = fire
+    tree = tree & (fires[j] ^ 1)
+    trees[j] = tree
+    counts.trees += tree
+    counts.fires += fire
+    return counts
+
+
+cdef Counts _burn_row(unsigned char *trees, const unsigned char *fires,
+                      unsigned char *new_fires, const unsigned char *above,
+                      const unsigned char *below,
+                      Py_ssize_t n_cols) noexcept nogil:
+    # above and below are the fire rows either side, a row of zeros off the
+    # edge of the forest
+    cdef Py_ssize_t j, last = n_cols - 1
+    cdef Counts counts
+    counts.trees = 0
+    counts.fires = 0
+
+    # the cells away from the ends of the row need no boundary checks
+    for j in range(1, last):
+        counts = _burn_cell(trees, fires, new_fires,
+                            fires[j - 1] | fires[j + 1] | above[j] | below[j],
+                            j, counts)
+    if last > 0:
+        counts = _burn_cell(trees, fires, new_fires,
+                            fires[1] | above[0] | below[0], 0, counts)
+        counts = _burn_cell(trees, fires, new_fires,
+                            fires[last - 1] | above[last] | below[last],
+                            last, counts)
+    else:
+        counts = _burn_cell(trees, fires, new_fires, above[0] | below[0], 0,
+                            counts)
+    return counts
+
+
+def slow_burn_step(unsigned char[:, ::1] trees, unsigned char[:, ::1] fires,
+                   unsigned char[:, ::1] new_fires,
+                   const Py_ssize_t[::1] growth_cells,
+                   const Py_ssize_t[::1] strike_cells):
+    """ Grow, ignite and burn one step of the slow-burn forest in place.
+
+    trees and fires are boolean grids viewed as uint8, growth_cells and
+    strike_cells flat cell indices.  The fires of the next step are written
+    to new_fires.  Returns the numbers of trees and fires after the step.
+    """
+    cdef Py_ssize_t n_rows = trees.shape[0]
+    cdef Py_ssize_t n_cols = trees.shape[1]
+    cdef Py_ssize_t i, k, cell, n_trees = 0, n_fires = 0
+    cdef unsigned char *flat_trees
+    cdef unsigned char *flat_fires
+    cdef unsigned char *flat_new_fires
+    cdef const unsigned char *above
+    cdef const unsigned char *below
+    cdef Counts counts
+    cdef unsigned char[::1] edge
+
+    if n_rows == 0 or n_cols == 0:
+        return 0, 0
+    # the rows past the top and bottom of the forest never burn
+    edge = np.zeros(n_cols, dtype=np.uint8)
+    flat_trees = &trees[0, 0]
+    flat_fires = &fires[0, 0]
+    flat_new_fires = &new_fires[0, 0]
+
+    with nogil:
+        # the events touch a few cells each, in the order the models use
+        for k in range(growth_cells.shape[0]):
+            flat_trees[growth_cells[k]] = 1
+        for k in range(strike_cells.shape[0]):
+            cell = strike_cells[k]
+            if flat_trees[cell]:
+                flat_fires[cell] = 1
+
+    # then one pass over the grid spreads the fires and burns the trees;
+    # each row only writes itself, so the rows can go in parallel
+    for i in prange(n_rows, nogil=True, schedule='static'):
+        above = &edge[0]
+        below = &edge[0]
+        if i > 0:
+            above = flat_fires + (i - 1) * n_cols
+        if i < n_rows - 1:
+            below = flat_fires + (i + 1) * n_cols
+        counts = _burn_row(flat_trees + i * n_cols, flat_fires + i * n_cols,
+                           flat_new_fires + i * n_cols, above, below, n_cols)
+        n_trees += counts.trees
+        n_fires += counts.fires
+
+    return n_trees, n_fires
@@ -0,0 +1,86 @@
+#cython: boundscheck=False, wraparound=False, cdivision=True
+# Compiled neighbour counts for forest_engine.neighbourhood
+
+from cython.parallel cimport prange
+
+
+cdef inline unsigned char _cell(const unsigned char[:, ::1] grid,
+                                Py_ssize_t i, Py_ssize_t j) noexcept nogil:
+    # rows and columns of -1 are off the edge of a closed grid
+    if i < 0 or j < 0:
+        return 0
+    return grid[i, j]
+
+
+cdef inline unsigned char _count(const unsigned char[:, ::1] grid,
+                                 Py_ssize_t north, Py_ssize_t i,
+                                 Py_ssize_t south, Py_ssize_t east,
+                                 Py_ssize_t j, Py_ssize_t west,
+                                 int stencil) noexcept nogil:
+    cdef unsigned char total = (_cell(grid, north, j) +
+                                _cell(grid, south, j) +
+                                _cell(grid, i, east) + _cell(grid, i, west))
+    if stencil == 8:
+        total += (_cell(grid, north, east) + _cell(grid, north, west) +
+                  _cell(grid, south, east) + _cell(grid, south, west))
+    return total
+
+
+cdef void _count_row(const unsigned char[:, ::1] grid,
+                     unsigned char[:, ::1] out, Py_ssize_t i, int stencil,
+                     bint periodic) noexcept nogil:
+    cdef Py_ssize_t n_rows = grid.shape[0]
+    cdef Py_ssize_t n_cols = grid.shape[1]
+    cdef Py_ssize_t j, north = i - 1, south = i + 1
+    cdef Py_ssize_t last = n_cols - 1
+    cdef const unsigned char *above
+    cdef const unsigned char *row = &grid[i, 0]
+    cdef const unsigned char *below
+    cdef unsigned char *counts = &out[i, 0]
+
+    if periodic:
+        north = (north + n_rows) % n_rows
+        south = south % n_rows
+    elif south == n_rows:
+        south = -1
+
+    # the columns away from the edges need no boundary checks
+    for j in range(1, last):
+        counts[j] = row[j - 1] + row[j + 1]
+    if north >= 0:
+        above = &grid[north, 0]
+        for j in range(1, last):
+            counts[j] += above[j]
+        if stencil == 8:
+            for j in range(1, last):
+                counts[j] += above[j - 1] + above[j + 1]
+    if south >= 0:
+        below = &grid[south, 0]
+        for j in range(1, last):
+            counts[j] += below[j]
+        if stencil == 8:
+            for j in range(1, last):
+                counts[j] += below[j - 1] + below[j + 1]
+
+    # the first and last columns
+    if periodic:
+        counts[0] = _count(grid, north, i, south, last, 0, 1 % n_cols,
+                           stencil)
+        if last > 0:
+            counts[last] = _count(grid, north, i, south, last - 1, last, 0,
+                                  stencil)
+    else:
+        counts[0] = _count(grid, north, i, south, -1, 0,
+                           1 if last > 0 else -1, stencil)
+        if last > 0:
+            counts[last] = _count(grid, north, i, south, last - 1, last, -1,
+                                  stencil)
+
+
+def count_neighbours(const unsigned char[:, ::1] grid,
+                     unsigned char[:, ::1] out, int stencil, bint periodic):
+    """ Write the number of set neighbours of every cell of grid into out.
+    """
+    cdef Py_ssize_t i
+    for i in prange(grid.shape[0], nogil=True, schedule='static'):
+        _count_row(grid, out, i, stencil, periodic)
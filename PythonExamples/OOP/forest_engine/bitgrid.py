@@ -0,0 +1,233 @@
+"""
+Bit-packed boolean grids
+------------------------
+
+A BitGrid stores a 2D boolean array with 64 cells to a uint64 word, so a
+10000 x 10000 forest takes 12.5 MB per layer instead of 100 MB.  Cell
+``(i, j)`` lives in word ``(i, j // 64)`` at bit ``j % 64``.  Bits past the
+last column of a row are always kept clear.
+
+The grid supports the handful of operations the Forest models need: ``&``,
+``|`` and ``~`` with other grids or boolean arrays, ``grid[mask] = value``,
+flat cell indexing with ``grid.flat[cells]``, ``sum()``, and conversion back
+to a NumPy array with ``np.asarray(grid)``.  The north/south/east/west
+neighbour test of the fire model is done with word shifts in
+``neighbours()``.
+"""
+
+import numpy as np
+
+WORD_BITS = 64
+
+_ONE = np.uint64(1)
+_TOP_SHIFT = np.uint64(WORD_BITS - 1)
+_WORD = np.dtype('<u8')
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)],
+                           dtype=np.uint8)
+
+
+def popcount(words):
+    """Return the total number of set bits in an array of uint64 words."""
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+    return int(_POPCOUNT_TABLE[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+class BitGrid(object):
+    """A 2D boolean grid packed 64 cells to a word."""
+
+    # make NumPy defer to our reflected operators, so that
+    # ``bool_array & grid`` is computed by BitGrid.__rand__
+    __array_ufunc__ = None
+
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        n_rows, n_cols = self.shape
+        self.n_words = (n_cols + WORD_BITS - 1) // WORD_BITS
+        self.words = np.zeros((n_rows, self.n_words), dtype=_WORD)
+        self._scratch = None
+
+        # mask of the valid bits in the last word of each row
+        tail_bits = n_cols - (self.n_words - 1) * WORD_BITS
+        if tail_bits == WORD_BITS:
+            self.tail_mask = ~np.uint64(0)
+        else:
+            self.tail_mask = np.uint64((1 << tail_bits) - 1)
+
+    @classmethod
+    def from_array(cls, array):
+        """Pack a 2D boolean array into a new BitGrid."""
+        array = np.asarray(array, dtype=bool)
+        grid = cls(array.shape)
+        grid.words[...] = _pack_words(array, grid.n_words)
+        return grid
+
+    def __repr__(self):
+        return "{}(shape={})".format(self.__class__.__name__, self.shape)
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.to_array()
+        if dtype is not None:
+            array = array.astype(dtype)
+        return array
+
+    @property
+    def size(self):
+        return self.shape[0] * self.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.words.nbytes
+
+    @property
+    def flat(self):
+        """Get and set cells by flat index, like ``ndarray.flat``."""
+        return _FlatBits(self)
+
+    def to_array(self):
+        """Unpack the grid into a new 2D boolean array."""
+        as_bytes = self.words.view(np.uint8)
+        return np.unpackbits(as_bytes, axis=1, count=self.shape[1],
+                             bitorder='little').view(bool)
+
+    def copy(self):
+        grid = self.__class__(self.shape)
+        grid.words[...] = self.words
+        return grid
+
+    def sum(self):
+        """Number of cells that are set."""
+        return popcount(self.words)
+
+    def any(self):
+        return bool(self.words.any())
+
+    def fill(self, value):
+        if value:
+            self.words.fill(~np.uint64(0))
+            self.words[:, -1] &= self.tail_mask
+        else:
+            self.words.fill(0)
+
+    def neighbours(self, out=None):
+        """Cells with a set north, south, east or west neighbour.
+
+        Cells beyond the edge of the grid count as unset.  ``out`` may be a
+        BitGrid of the same shape to write the result into; it must not be
+        ``self``.
+        """
+        if out is None:
+            out = self.__class__(self.shape)
+        words = self.words
+        result = out.words
+        tmp = self._scratch_words()
+
+        # north and south are whole-row moves
+        result.fill(0)
+        result[1:] |= words[:-1]
+        result[:-1] |= words[1:]
+
+        # east: cell j picks up cell j - 1, carrying across word boundaries
+        np.left_shift(words, _ONE, out=tmp)
+        result |= tmp
+        np.right_shift(words[:, :-1], _TOP_SHIFT, out=tmp[:, 1:])
+        result[:, 1:] |= tmp[:, 1:]
+
+        # west: cell j picks up cell j + 1
+        np.right_shift(words, _ONE, out=tmp)
+        result |= tmp
+        np.left_shift(words[:, 1:], _TOP_SHIFT, out=tmp[:, :-1])
+        result[:, :-1] |= tmp[:, :-1]
+
+        result[:, -1] &= self.tail_mask
+        return out
+
+    def __setitem__(self, key, value):
+        mask = self._as_words(key)
+        if value:
+            self.words |= mask
+        else:
+            self.words &= ~mask
+
+    def __and__(self, other):
+        result = self.copy()
+        result.words &= self._as_words(other)
+        return result
+
+    __rand__ = __and__
+
+    def __or__(self, other):
+        result = self.copy()
+        result.words |= self._as_words(other)
+        return result
+
+    __ror__ = __or__
+
+    def __iand__(self, other):
+        self.words &= self._as_words(other)
+        return self
+
+    def __ior__(self, other):
+        self.words |= self._as_words(other)
+        return self
+
+    def __invert__(self):
+        result = self.__class__(self.shape)
+        np.invert(self.words, out=result.words)
+        result.words[:, -1] &= self.tail_mask
+        return result
+
+    def _as_words(self, other):
+        if isinstance(other, BitGrid):
+            if other.shape != self.shape:
+                raise ValueError("grid shapes {} and {} differ".format(
+                    self.shape, other.shape))
+            return other.words
+        other = np.asarray(other, dtype=bool)
+        if other.shape != self.shape:
+            raise ValueError("mask shape {} does not match grid shape "
+                             "{}".format(other.shape, self.shape))
+        return _pack_words(other, self.n_words)
+
+    def _scratch_words(self):
+        if self._scratch is None:
+            self._scratch = np.empty_like(self.words)
+        return self._scratch
+
+
+class _FlatBits(object):
+    """Flat cell indexing for a BitGrid."""
+
+    def __init__(self, grid):
+        self.grid = grid
+
+    def __getitem__(self, cells):
+        words, bits = self._locate(cells)
+        return (self.grid.words.reshape(-1)[words] & bits) != 0
+
+    def __setitem__(self, cells, value):
+        words, bits = self._locate(cells)
+        flat_words = self.grid.words.reshape(-1)
+        # .at() so that several cells in the same word all take effect
+        if value:
+            np.bitwise_or.at(flat_words, words, bits)
+        else:
+            np.bitwise_and.at(flat_words, words, ~bits)
+
+    def _locate(self, cells):
+        rows, cols = np.divmod(np.asarray(cells, dtype=np.int64),
+                               self.grid.shape[1])
+        words = rows * self.grid.n_words + cols // WORD_BITS
+        bits = np.left_shift(_ONE, (cols % WORD_BITS).astype(np.uint64))
+        return words, bits
+
+
+def _pack_words(array, n_words):
+    """Pack the rows of a 2D boolean array into little-endian uint64 words."""
+    n_rows, n_cols = array.shape
+    padding = n_words * WORD_BITS - n_cols
+    if padding:
+        array = np.concatenate(
+            [array, np.zeros((n_rows, padding), dtype=bool)], axis=1)
+    packed = np.packbits(array, axis=1, bitorder='little')
+    return packed.view(_WORD)
@@ -0,0 +1,181 @@
+"""
+Checkpoints
+-----------
+
+Long forest runs can be saved part way through and resumed later.  A
+checkpoint is a directory holding
+
+    <grid>.npy      one file per boolean grid (trees, fires, ...), stored
+                    bit-packed in the BitGrid word layout, an eighth of the
+                    size of the boolean array
+    state.json      the grid shapes, the state of the random generator and
+                    any other metadata the model wants to keep (step count,
+                    probabilities, ...)
+
+The grids are plain .npy files, so they are opened memory-mapped on restore
+and unpacked straight from the page cache into the model's arrays.  Because
+the generator state is saved with the grids, a resumed run draws exactly the
+same random numbers as one that never stopped, and continues bit-identically.
+
+A checkpoint is first written to ``<path>.partial`` and only renamed into
+place when it is complete, so a crash while saving never leaves a damaged
+checkpoint behind.
+
+Checkpointer writes a checkpoint every few steps into numbered directories
+and removes the oldest ones.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+from .bitgrid import BitGrid
+
+STATE_FILE = "state.json"
+
+
+def write_checkpoint(path, grids, rng, metadata=None):
+    """Save boolean grids, a numpy Generator's state and metadata to path.
+
+    grids maps names to 2D boolean arrays or BitGrids.
+    """
+    partial = path + ".partial"
+    if os.path.exists(partial):
+        shutil.rmtree(partial)
+    os.makedirs(partial)
+
+    shapes = {}
+    for name, grid in grids.items():
+        if not isinstance(grid, BitGrid):
+            grid = BitGrid.from_array(grid)
+        np.save(os.path.join(partial, name + ".npy"), grid.words)
+        shapes[name] = list(grid.shape)
+
+    state = {
+        "grids": shapes,
+        "bit_generator": rng.bit_generator.__class__.__name__,
+        "rng_state": _to_json(rng.bit_generator.state),
+        "metadata": metadata or {},
+    }
+    with open(os.path.join(partial, STATE_FILE), "w") as state_file:
+        json.dump(state, state_file, indent=1, sort_keys=True)
+
+    # swap the finished checkpoint into place
+    if os.path.exists(path):
+        old = path + ".old"
+        if os.path.exists(old):
+            shutil.rmtree(old)
+        os.rename(path, old)
+        os.rename(partial, path)
+        shutil.rmtree(old)
+    else:
+        os.rename(partial, path)
+
+
+class Checkpoint(object):
+    """A checkpoint on disk, opened for reading."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, STATE_FILE)) as state_file:
+            state = json.load(state_file)
+        self.shapes = dict((name, tuple(shape))
+                           for name, shape in state["grids"].items())
+        self.metadata = state["metadata"]
+        self._bit_generator = state["bit_generator"]
+        self._rng_state = _from_json(state["rng_state"])
+
+    def __repr__(self):
+        return "{}({!r})".format(self.__class__.__name__, self.path)
+
+    def rng(self):
+        """A new numpy Generator in the saved state."""
+        bit_generator = getattr(np.random, self._bit_generator)()
+        bit_generator.state = self._rng_state
+        return np.random.Generator(bit_generator)
+
+    def words(self, name):
+        """The packed words of a grid, memory-mapped read-only."""
+        return np.load(os.path.join(self.path, name + ".npy"), mmap_mode="r")
+
+    def load_grid(self, name, out=None):
+        """Restore a grid into out, or into a new boolean array.
+
+        out may be a boolean array or a BitGrid of the saved shape.
+        """
+        if isinstance(out, BitGrid):
+            grid = out
+        else:
+            grid = BitGrid(self.shapes[name])
+        grid.words[...] = self.words(name)
+        if grid is out:
+            return out
+        if out is None:
+            return grid.to_array()
+        out[...] = grid.to_array()
+        return out
+
+
+class Checkpointer(object):
+    """Checkpoint a model every few steps, keeping the most recent ones.
+
+    The model needs a ``step_count`` attribute and a
+    ``save_checkpoint(path)`` method.  Checkpoints are written to
+    ``directory/step_<step_count>``.
+    """
+
+    def __init__(self, directory, every=500, keep=2):
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+
+    def __call__(self, model):
+        """Save a checkpoint if model has reached a multiple of every steps."""
+        if model.step_count % self.every == 0:
+            self.save(model)
+
+    def save(self, model):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        path = os.path.join(self.directory,
+                            "step_{:012d}".format(model.step_count))
+        model.save_checkpoint(path)
+        for old in self.checkpoints()[:-self.keep]:
+            shutil.rmtree(old)
+        return path
+
+    def checkpoints(self):
+        """Paths of the complete checkpoints, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith("step_") and "." not in name)
+        return [os.path.join(self.directory, name) for name in names]
+
+    def latest(self):
+        """Path of the newest checkpoint, or None if there is none."""
+        checkpoints = self.checkpoints()
+        if checkpoints:
+            return checkpoints[-1]
+        return None
+
+
+def _to_json(value):
+    # bit generator states are dicts of ints, with arrays for some generators
+    if isinstance(value, dict):
+        return dict((key, _to_json(item)) for key, item in value.items())
+    if isinstance(value, np.ndarray):
+        return {"__ndarray__": value.tolist(), "dtype": value.dtype.str}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _from_json(value):
+    if isinstance(value, dict):
+        if "__ndarray__" in value:
+            return np.array(value["__ndarray__"], dtype=value["dtype"])
+        return dict((key, _from_json(item)) for key, item in value.items())
+    return value
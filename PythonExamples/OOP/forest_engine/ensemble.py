@@ -0,0 +1,145 @@
+"""
+Forest ensembles
+----------------
+
+A ForestEnsemble advances many independent forests of the same size at once.
+The trees and fires of all members are stacked into single
+``(n_members, rows, cols)`` arrays, and every member can have its own
+``p_sapling`` and ``p_lightning``, so a whole parameter sweep moves forward
+with one vectorised step instead of a Python loop over Forest objects.
+
+Each member follows exactly the rules of the lecture's Forest model: grow
+trees, start fires from lightning, then burn.  The sapling and lightning
+cells are drawn with random_cells() from one numpy Generator, member by
+member, so a run can be repeated from a seed, and a one-member ensemble
+draws exactly the same cells as a Forest with the same rng.
+"""
+
+import numpy as np
+
+from .sampling import make_rng, random_cells
+
+
+class ForestEnsemble(object):
+    """A stack of independent forest fire simulations.
+
+    Parameters
+    ==========
+
+        size: tuple
+            (rows, cols) of every forest in the ensemble
+
+        p_sapling, p_lightning: float or sequence of float
+            per-member probabilities; scalars are shared by every member and
+            sequences are broadcast against each other
+
+        n_members: int
+            number of members, if it is not implied by the probabilities
+
+        rng: numpy.random.Generator or int
+            the random generator, or a seed to make one from
+
+    """
+    def __init__(self, size=(150, 150), p_sapling=0.0025, p_lightning=5.e-6,
+                 n_members=None, rng=None):
+        p_sapling = np.atleast_1d(np.asarray(p_sapling, dtype=float))
+        p_lightning = np.atleast_1d(np.asarray(p_lightning, dtype=float))
+        if n_members is None:
+            n_members = max(len(p_sapling), len(p_lightning))
+        self.p_sapling = np.broadcast_to(p_sapling, (n_members,)).copy()
+        self.p_lightning = np.broadcast_to(p_lightning, (n_members,)).copy()
+
+        self.size = tuple(size)
+        self.n_members = n_members
+        self.rng = make_rng(rng)
+        shape = (n_members,) + self.size
+        self.trees = np.zeros(shape, dtype=bool)
+        self.forest_fires = np.zeros(shape, dtype=bool)
+
+        # working space reused by every step
+        self._padded_fires = np.zeros(
+            (n_members, self.size[0] + 2, self.size[1] + 2), dtype=bool)
+        self._events = np.empty(shape, dtype=bool)
+
+    @classmethod
+    def sweep(cls, p_saplings, p_lightnings, size=(150, 150), rng=None):
+        """Make one member for every (p_sapling, p_lightning) combination.
+
+        Members are ordered with p_lightning varying fastest.
+        """
+        p_s, p_l = np.meshgrid(p_saplings, p_lightnings, indexing='ij')
+        return cls(size, p_sapling=p_s.ravel(), p_lightning=p_l.ravel(),
+                   rng=rng)
+
+    def __repr__(self):
+        return "{}(size={}, n_members={})".format(
+            self.__class__.__name__, self.size, self.n_members)
+
+    def __len__(self):
+        return self.n_members
+
+    @property
+    def num_cells(self):
+        return self.size[0] * self.size[1]
+
+    @property
+    def tree_fraction(self):
+        """Fraction of each member covered by trees, shape (n_members,)."""
+        return self.trees.sum(axis=(1, 2)) / float(self.num_cells)
+
+    @property
+    def fire_fraction(self):
+        """Fraction of each member on fire, shape (n_members,)."""
+        return self.forest_fires.sum(axis=(1, 2)) / float(self.num_cells)
+
+    def advance_one_step(self):
+        self.grow_trees()
+        self.start_fires()
+        self.burn_trees()
+
+    def grow_trees(self):
+        growth_sites = self._rand_bool(self.p_sapling)
+        self.trees |= growth_sites
+
+    def start_fires(self):
+        lightning_strikes = self._rand_bool(self.p_lightning)
+        lightning_strikes &= self.trees
+        self.forest_fires |= lightning_strikes
+
+    def burn_trees(self):
+        fires = self._padded_fires
+        fires[:, 1:-1, 1:-1] = self.forest_fires
+        new_fires = fires[:, :-2, 1:-1] | fires[:, 2:, 1:-1]
+        new_fires |= fires[:, 1:-1, :-2]
+        new_fires |= fires[:, 1:-1, 2:]
+        new_fires &= self.trees
+        self.trees &= ~self.forest_fires
+        self.forest_fires = new_fires
+
+    def run(self, n_steps):
+        """Advance every member n_steps and return their histories.
+
+        Returns (tree_fractions, fire_fractions), two arrays of shape
+        (n_steps, n_members) holding the fractions after each step.
+        """
+        tree_fractions = np.empty((n_steps, self.n_members))
+        fire_fractions = np.empty((n_steps, self.n_members))
+        for step in range(n_steps):
+            self.advance_one_step()
+            tree_fractions[step] = self.tree_fraction
+            fire_fractions[step] = self.fire_fraction
+        return tree_fractions, fire_fractions
+
+    def member(self, index):
+        """Views of the trees and fires of one member, as (trees, fires)."""
+        return self.trees[index], self.forest_fires[index]
+
+    def _rand_bool(self, p):
+        # the cells each member picks with its own probability, drawn in
+        # member order; the result buffer is reused between calls
+        self._events.fill(False)
+        events = self._events.reshape(self.n_members, self.num_cells)
+        for member in range(self.n_members):
+            events[member, random_cells(self.num_cells, p[member],
+                                        self.rng)] = True
+        return self._events
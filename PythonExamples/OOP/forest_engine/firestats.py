@@ -0,0 +1,212 @@
+"""
+Fire statistics
+---------------
+
+The forest fire model is a classic example of self-organised criticality:
+the sizes of its fires follow a power law.  FireStatistics follows every
+fire from the lightning strike that started it until it burns out, and when
+it does, adds its size (the number of trees it burnt) and its duration (the
+number of steps it burnt for) to a LogHistogram.
+
+Memory does not grow with the number of fires.  The collector keeps
+
+    - one fire label per cell, so every burning cell is attributed to a fire
+    - the size and start of the fires burning now, in slots that are reused
+      when a fire burns out
+    - the histograms, whose logarithmic bins grow one bin per factor of
+      10 ** (1 / bins_per_decade) in the largest value seen
+
+so millions of fires can be tallied in a run.  Each step only looks at the
+burning cells.  When two fires run into each other, a cell they both reach
+goes to one of them and the fires carry on separately.
+
+A burning cell next to another burning cell is still burning in the next
+step, though its tree has gone; it spreads the fire once more but adds
+nothing to the fire's size.  The collector never sees the trees, so if a
+sapling grows on such a cell in that step, the sapling burns without being
+counted: the fire sizes can add up to slightly fewer than the trees burnt.
+
+The model tells the collector about a step in two calls: ignite() with the
+cells struck by lightning that hold a tree, and spread() with the cells
+burning after the step.
+"""
+
+import numpy as np
+
+NO_FIRE = -1
+
+
+class LogHistogram(object):
+    """Counts of positive values in logarithmically spaced bins.
+
+    Bin k holds the values from 10 ** (k / bins_per_decade) up to the start
+    of the next bin; bins are added as larger values arrive.
+    """
+    def __init__(self, bins_per_decade=10):
+        self.bins_per_decade = bins_per_decade
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def __repr__(self):
+        return "{}(bins_per_decade={})".format(self.__class__.__name__,
+                                              self.bins_per_decade)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    @property
+    def edges(self):
+        """The bin edges, one more than there are bins."""
+        k = np.arange(len(self.counts) + 1)
+        return 10.0 ** (k / float(self.bins_per_decade))
+
+    def add(self, values):
+        """Count an array of values, all at least 1."""
+        values = np.asarray(values)
+        if values.size == 0:
+            return
+        # a little slack so that exact powers of ten stay in their own bin
+        bins = np.floor(np.log10(values) * self.bins_per_decade + 1.e-9)
+        counts = np.bincount(bins.astype(np.intp))
+        if len(counts) > len(self.counts):
+            self.counts = np.concatenate(
+                [self.counts, np.zeros(len(counts) - len(self.counts),
+                                       dtype=np.int64)])
+        self.counts[:len(counts)] += counts
+
+    def density(self):
+        """Bin centres and the probability density of the values there.
+
+        The centres are geometric means of the bin edges, ready for a
+        log-log plot; empty bins are left out.
+        """
+        edges = self.edges
+        centres = np.sqrt(edges[:-1] * edges[1:])
+        occupied = self.counts > 0
+        density = self.counts / (float(self.total) * np.diff(edges))
+        return centres[occupied], density[occupied]
+
+
+class FireStatistics(object):
+    """Collect the sizes and durations of the fires in a forest.
+
+    Parameters
+    ==========
+
+        shape: tuple of int
+            shape of the forest
+
+        bins_per_decade: int
+            resolution of the size and duration histograms
+
+    """
+    def __init__(self, shape, bins_per_decade=10):
+        self.shape = tuple(shape)
+        self.sizes = LogHistogram(bins_per_decade)
+        self.durations = LogHistogram(bins_per_decade)
+        self.step = 0
+        self.num_fires = 0
+        self.largest = 0
+        self.longest = 0
+
+        self._cell_fire = np.full(self.shape[0] * self.shape[1], NO_FIRE,
+                                  dtype=np.int32)
+        self._burning = np.empty(0, dtype=np.intp)
+        self._labels = np.empty(0, dtype=np.int32)
+        self._spent = np.empty(0, dtype=bool)
+        self._size = np.zeros(0, dtype=np.int64)
+        self._start = np.zeros(0, dtype=np.int64)
+        self._free = []
+
+    def __repr__(self):
+        return "{}(shape={})".format(self.__class__.__name__, self.shape)
+
+    @property
+    def active_fires(self):
+        """Number of fires burning now."""
+        return len(np.unique(self._labels))
+
+    def ignite(self, cells):
+        """Start a fire in each of cells, flat indices of struck trees.
+
+        Cells that are already burning stay with their fire.
+        """
+        cells = np.asarray(cells, dtype=np.intp)
+        cells = cells[self._cell_fire[cells] == NO_FIRE]
+        self._add_burning(cells, self._new_fires(len(cells)))
+
+    def spread(self, fire_cells):
+        """Finish a step, given the flat indices of the cells now burning.
+
+        Every cell that was burning has burnt its tree, if it still had one.
+        Each new burning cell joins a fire burning next to it.
+        """
+        fire_cells = np.asarray(fire_cells, dtype=np.intp)
+        self._size += np.bincount(self._labels[~self._spent],
+                                  minlength=len(self._size))
+
+        # cells burning on, with their trees gone, stay with their fire
+        own_labels = self._cell_fire[fire_cells]
+        spent = own_labels != NO_FIRE
+        labels = np.where(spent, own_labels, self._neighbour_fire(fire_cells))
+        # fires the collector did not see start, counted from now on
+        unknown = labels == NO_FIRE
+        labels[unknown] = self._new_fires(np.count_nonzero(unknown))
+
+        self._cell_fire[self._burning] = NO_FIRE
+        self._cell_fire[fire_cells] = labels
+        burnt_out = np.setdiff1d(self._labels, labels)
+        self._burning = fire_cells
+        self._labels = labels
+        self._spent = spent
+        self._finish(burnt_out)
+        self.step += 1
+
+    def _new_fires(self, n):
+        # reuse the slots of burnt out fires, making more when they run out
+        if n > len(self._free):
+            old = len(self._size)
+            new = max(n - len(self._free), old)
+            self._size = np.concatenate([self._size,
+                                         np.zeros(new, dtype=np.int64)])
+            self._start = np.concatenate([self._start,
+                                          np.zeros(new, dtype=np.int64)])
+            self._free.extend(range(old + new - 1, old - 1, -1))
+        slots = np.array(self._free[len(self._free) - n:], dtype=np.int32)
+        del self._free[len(self._free) - n:]
+        self._size[slots] = 0
+        self._start[slots] = self.step
+        return slots
+
+    def _add_burning(self, cells, labels):
+        self._cell_fire[cells] = labels
+        self._burning = np.concatenate([self._burning, cells])
+        self._labels = np.concatenate([self._labels, labels])
+        self._spent = np.concatenate([self._spent,
+                                      np.zeros(len(cells), dtype=bool)])
+
+    def _neighbour_fire(self, cells):
+        # the fire of the burning neighbour with the highest label
+        n_rows, n_cols = self.shape
+        rows, cols = np.divmod(cells, n_cols)
+        labels = np.full(len(cells), NO_FIRE, dtype=np.int32)
+        for has_neighbour, offset in ((rows > 0, -n_cols),
+                                      (rows < n_rows - 1, n_cols),
+                                      (cols > 0, -1),
+                                      (cols < n_cols - 1, 1)):
+            neighbours = cells[has_neighbour] + offset
+            labels[has_neighbour] = np.maximum(labels[has_neighbour],
+                                               self._cell_fire[neighbours])
+        return labels
+
+    def _finish(self, slots):
+        if len(slots) == 0:
+            return
+        sizes = self._size[slots]
+        durations = self.step - self._start[slots] + 1
+        self.sizes.add(sizes)
+        self.durations.add(durations)
+        self.num_fires += len(slots)
+        self.largest = max(self.largest, int(sizes.max()))
+        self.longest = max(self.longest, int(durations.max()))
+        self._free.extend(slots.tolist())
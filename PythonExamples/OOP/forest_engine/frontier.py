@@ -0,0 +1,45 @@
+"""
+Sparse fire fronts
+------------------
+
+When only a few cells of a forest are burning, shifting the whole fire grid
+four times to find their neighbours is mostly wasted work.  These functions
+work on the burning cells alone, given as indices into the flattened forest,
+so a step costs time proportional to the length of the fire front.
+
+The rule is the same as the dense Forest.burn_trees(): a tree catches fire
+if its north, south, east or west neighbour is burning, and every cell that
+was burning loses its tree.
+"""
+
+import numpy as np
+
+
+def neighbour_cells(cells, shape):
+    """Flat indices of the north/south/east/west neighbours of cells.
+
+    Neighbours off the edge of the forest are left out; a cell shared by
+    several burning cells appears once for each of them.
+    """
+    n_rows, n_cols = shape
+    rows, cols = np.divmod(cells, n_cols)
+    return np.concatenate([
+        cells[rows > 0] - n_cols,
+        cells[rows < n_rows - 1] + n_cols,
+        cells[cols > 0] - 1,
+        cells[cols < n_cols - 1] + 1,
+    ])
+
+
+def burn_frontier(trees, fire_cells):
+    """Spread fires from fire_cells and burn their trees, in place.
+
+    trees is the 2D boolean tree array and fire_cells a 1D array of flat
+    indices of the burning cells.  Returns the sorted flat indices of the
+    cells burning in the next step.
+    """
+    flat_trees = trees.reshape(-1)
+    candidates = neighbour_cells(fire_cells, trees.shape)
+    new_fire_cells = np.unique(candidates[flat_trees[candidates]])
+    flat_trees[fire_cells] = False
+    return new_fire_cells
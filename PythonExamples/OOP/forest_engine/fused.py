@@ -0,0 +1,23 @@
+"""
+Fused forest steps
+------------------
+
+Stepping the forest with NumPy takes several passes over the grid, each
+making a temporary array: one to find the cells next to a fire, one to mask
+them by the trees, one to burn the old fires.  slow_burn_step() does a whole
+step of the slow-burn model, growth, lightning and burning, in one compiled
+pass, with the rows split over threads.
+
+It is only available once the ``_fused`` extension has been built with
+
+    python setup_kernels.py build_ext --inplace
+
+and is None otherwise; the models then step with NumPy as before.  The
+sapling and lightning cells are drawn by the caller, exactly as for the
+NumPy step, so both give the same forests for the same random generator.
+"""
+
+try:
+    from ._fused import slow_burn_step
+except ImportError:
+    slow_burn_step = None
@@ -0,0 +1,139 @@
+"""
+Grove index
+-----------
+
+A GroveIndex keeps track of the groves (4-connected clusters of trees) of a
+forest as trees grow and burn, so a lightning strike can find its grove
+without relabelling the whole forest.
+
+It is a union-find structure over the cells of the forest.  Every grove is
+also threaded into a circular linked list of its cells, and two lists are
+spliced together in constant time when their groves merge.  That makes
+
+    add_tree(cell)      amortised constant time per new tree
+    burn_grove(cell)    proportional to the size of the grove it burns
+
+Trees in the instant burn models only ever disappear a whole grove at a
+time, so groves never need to be split.
+
+Cells are addressed by their index into the flattened forest array.
+"""
+
+import numpy as np
+from scipy.ndimage import label
+
+NO_TREE = -1
+
+
+class GroveIndex(object):
+    """Union-find index of the groves in a 2D forest."""
+
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        n_cells = self.shape[0] * self.shape[1]
+        dtype = np.int32 if n_cells < 2**31 else np.int64
+        self.parent = np.full(n_cells, NO_TREE, dtype=dtype)
+        self.next_cell = np.full(n_cells, NO_TREE, dtype=dtype)
+        self.grove_size = np.zeros(n_cells, dtype=dtype)
+
+    @classmethod
+    def from_trees(cls, trees):
+        """Build an index for an existing 2D boolean array of trees."""
+        index = cls(trees.shape)
+        groves, num_groves = label(trees)
+        groves = groves.ravel()
+        cells = np.flatnonzero(groves)
+        if len(cells) == 0:
+            return index
+
+        # sort the tree cells by grove; each run of equal labels becomes
+        # one circular list whose first cell is the grove's root
+        order = np.argsort(groves[cells], kind='stable')
+        cells = cells[order]
+        grove_of = groves[cells]
+        starts = np.flatnonzero(np.r_[True, grove_of[1:] != grove_of[:-1]])
+        run_lengths = np.diff(np.r_[starts, len(cells)])
+        roots = np.repeat(cells[starts], run_lengths)
+
+        index.parent[cells] = roots
+        following = np.roll(cells, -1)
+        ends = np.r_[starts[1:], len(cells)] - 1
+        following[ends] = cells[starts]
+        index.next_cell[cells] = following
+        index.grove_size[cells[starts]] = run_lengths
+        return index
+
+    def __repr__(self):
+        return "{}(shape={})".format(self.__class__.__name__, self.shape)
+
+    def has_tree(self, cell):
+        return self.parent[cell] != NO_TREE
+
+    def find(self, cell):
+        """Root cell of the grove containing a tree."""
+        parent = self.parent
+        while parent[cell] != cell:
+            # path halving keeps the trees shallow
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    def add_tree(self, cell):
+        """Record a new tree and join it to any neighbouring groves."""
+        cell = int(cell)
+        if self.parent[cell] != NO_TREE:
+            return
+        self.parent[cell] = cell
+        self.next_cell[cell] = cell
+        self.grove_size[cell] = 1
+        for neighbour in self._neighbours(cell):
+            if self.parent[neighbour] != NO_TREE:
+                self._union(cell, neighbour)
+
+    def add_trees(self, cells):
+        for cell in cells:
+            self.add_tree(cell)
+
+    def grove(self, cell):
+        """Array of the cells in the grove containing a tree."""
+        root = self.find(int(cell))
+        cells = np.empty(self.grove_size[root], dtype=self.parent.dtype)
+        next_cell = self.next_cell
+        current = root
+        for i in range(len(cells)):
+            cells[i] = current
+            current = next_cell[current]
+        return cells
+
+    def burn_grove(self, cell):
+        """Remove the grove containing a tree and return its cells."""
+        cells = self.grove(cell)
+        self.parent[cells] = NO_TREE
+        self.next_cell[cells] = NO_TREE
+        self.grove_size[cells] = 0
+        return cells
+
+    def _neighbours(self, cell):
+        n_rows, n_cols = self.shape
+        row, col = divmod(cell, n_cols)
+        if row > 0:
+            yield cell - n_cols
+        if row < n_rows - 1:
+            yield cell + n_cols
+        if col > 0:
+            yield cell - 1
+        if col < n_cols - 1:
+            yield cell + 1
+
+    def _union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.grove_size[root_a] < self.grove_size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.grove_size[root_a] += self.grove_size[root_b]
+        # splice the two circular lists into one
+        next_cell = self.next_cell
+        next_cell[root_a], next_cell[root_b] = (next_cell[root_b],
+                                                next_cell[root_a])
@@ -0,0 +1,225 @@
+"""
+History recording
+-----------------
+
+HistoryRecorder keeps the most recent values of a few per-step statistics
+(tree fraction, fire fraction, ...) in a ring buffer.  Recording a step is
+constant time, however long the history, and the recent history of a column
+is always available as a contiguous, zero-copy view that can be handed
+straight to a plot.
+
+The ring is stored twice over, each value written at ``i`` and at
+``i + capacity``, so the last ``capacity`` values always form one contiguous
+slice, oldest first.
+
+For runs of millions of steps the recorder can also spill everything it
+records to disk.  The spill directory is a simple append-only columnar
+store: one raw little-endian float64 file per column plus a ``columns.json``
+header, written in blocks of ``capacity`` records.  The last, partial block
+is only written by flush() or close(), or on leaving a ``with`` block, so
+call one of them at the end of a run.  load_history() opens a spill
+directory as memory-mapped arrays.
+
+The recorder can also keep a RunningHistogram of the in-memory history of
+some columns.  Each recorded value is added to it and each value falling out
+of the ring is taken away again, so the histogram is always up to date
+without rebinning the whole history.
+"""
+
+import json
+import os
+
+import numpy as np
+
+HEADER_FILE = "columns.json"
+_VALUE = np.dtype('<f8')
+
+
+class HistoryRecorder(object):
+    """Record per-step statistics in a fixed-size ring buffer.
+
+    Parameters
+    ==========
+
+        columns: sequence of str
+            names of the recorded statistics, in the order record() takes
+            them
+
+        capacity: int
+            number of recent steps kept in memory
+
+        path: str
+            optional directory to append every recorded step to
+
+        histograms: sequence of str
+            columns to keep a running histogram of, see histogram()
+
+    """
+    def __init__(self, columns, capacity=3000, path=None, histograms=()):
+        self.columns = tuple(columns)
+        self.capacity = capacity
+        self.path = path
+        self.count = 0
+        self._index = dict((name, i) for i, name in enumerate(self.columns))
+        self._data = np.zeros((len(self.columns), 2 * capacity))
+        self._spilled = 0
+        self._histograms = dict((name, RunningHistogram())
+                                for name in histograms)
+        if path is not None:
+            _create_spill(path, self.columns)
+
+    def __repr__(self):
+        return "{}(columns={}, capacity={})".format(
+            self.__class__.__name__, self.columns, self.capacity)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        """Number of values in the in-memory history."""
+        return min(self.count, self.capacity)
+
+    def record(self, *values):
+        """Append one value for each column, in column order."""
+        position = self.count % self.capacity
+        for name, histogram in self._histograms.items():
+            column = self._index[name]
+            if self.count >= self.capacity:
+                # the value about to be overwritten leaves the window
+                histogram.remove(self._data[column, position])
+            histogram.add(values[column])
+        self._data[:, position] = values
+        self._data[:, position + self.capacity] = values
+        self.count += 1
+        if self.path is not None and self.count - self._spilled == self.capacity:
+            self.flush()
+
+    def view(self, column):
+        """The recent history of a column, oldest first, without copying.
+
+        The view is only valid until the next call to record().
+        """
+        end = (self.count - 1) % self.capacity + self.capacity + 1
+        return self._data[self._index[column], end - len(self):end]
+
+    def last(self, column):
+        """The most recently recorded value of a column."""
+        return self.view(column)[-1]
+
+    def histogram(self, column):
+        """The RunningHistogram of the in-memory history of a column."""
+        return self._histograms[column]
+
+    def flush(self):
+        """Append the steps not yet written to the spill directory."""
+        unspilled = self.count - self._spilled
+        if self.path is None or unspilled == 0:
+            return
+        end = (self.count - 1) % self.capacity + self.capacity + 1
+        block = self._data[:, end - unspilled:end]
+        for name, values in zip(self.columns, block):
+            with open(_column_file(self.path, name), 'ab') as column_file:
+                column_file.write(values.astype(_VALUE).tobytes())
+        self._spilled = self.count
+
+    def close(self):
+        """Write out the steps still only in memory; see flush()."""
+        self.flush()
+
+    def clear(self):
+        """Forget the in-memory history; spilled steps are kept."""
+        self.flush()
+        self.count = self._spilled = 0
+        for histogram in self._histograms.values():
+            histogram.clear()
+
+
+class RunningHistogram(object):
+    """Counts of non-negative values in equal-width bins starting at zero.
+
+    Values can be added and removed one at a time.  The range starts at
+    [0, upper) and doubles, merging neighbouring bins, whenever a larger
+    value arrives, so the resolution follows the size of the values.
+    """
+    def __init__(self, n_bins=1024, upper=1.e-4):
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+        self.initial_upper = self.upper = upper
+
+    def __repr__(self):
+        return "{}(n_bins={}, upper={})".format(
+            self.__class__.__name__, len(self.counts), self.upper)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def add(self, value):
+        while value >= self.upper:
+            self._double_range()
+        self.counts[self._bin(value)] += 1
+
+    def remove(self, value):
+        self.counts[self._bin(value)] -= 1
+
+    def clear(self):
+        self.counts.fill(0)
+        self.upper = self.initial_upper
+
+    def density(self, n_bins=50):
+        """Bin centres and probabilities over the occupied range.
+
+        The occupied part of the range is split into at most n_bins bins,
+        and the probabilities sum to one.
+        """
+        occupied = np.flatnonzero(self.counts)
+        if len(occupied) == 0:
+            return np.zeros(0), np.zeros(0)
+        first, last = occupied[0], occupied[-1] + 1
+        group = max(1, -(-(last - first) // n_bins))
+        starts = np.arange(first, last, group)
+        counts = np.add.reduceat(self.counts[:last], starts)
+        width = self.upper / len(self.counts)
+        centres = (starts + 0.5 * np.minimum(group, last - starts)) * width
+        return centres, counts / float(counts.sum())
+
+    def _bin(self, value):
+        # doubling the range halves value / width exactly, so a value always
+        # lands in the bin its old bin was merged into
+        n_bins = len(self.counts)
+        return min(int(value / (self.upper / n_bins)), n_bins - 1)
+
+    def _double_range(self):
+        merged = self.counts.reshape(-1, 2).sum(axis=1)
+        self.counts[:len(merged)] = merged
+        self.counts[len(merged):] = 0
+        self.upper *= 2
+
+
+def load_history(path):
+    """Open a spill directory as a dict of memory-mapped column arrays."""
+    with open(os.path.join(path, HEADER_FILE)) as header:
+        columns = json.load(header)["columns"]
+    history = {}
+    for name in columns:
+        filename = _column_file(path, name)
+        if os.path.getsize(filename) == 0:
+            history[name] = np.zeros(0, dtype=_VALUE)
+        else:
+            history[name] = np.memmap(filename, dtype=_VALUE, mode='r')
+    return history
+
+
+def _create_spill(path, columns):
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    with open(os.path.join(path, HEADER_FILE), 'w') as header:
+        json.dump({"columns": list(columns), "dtype": _VALUE.str}, header)
+    for name in columns:
+        open(_column_file(path, name), 'wb').close()
+
+
+def _column_file(path, name):
+    return os.path.join(path, name + ".f8")
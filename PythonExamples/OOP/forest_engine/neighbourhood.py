@@ -0,0 +1,127 @@
+"""
+Neighbourhood counts
+--------------------
+
+The mold and fire models both look at the neighbours of every cell: mold
+grows on trees with at least ``critical_density`` neighbouring trees, and
+fire spreads to trees with a burning neighbour.  NeighbourCounter counts the
+set neighbours of every cell of a boolean grid, with
+
+    stencil     4 (north, south, east, west) or 8 (adding the diagonals)
+    boundary    "closed": cells off the edge of the grid are empty
+                "periodic": the grid wraps around at its edges
+
+All the work is done in buffers made once, with the counter, so counting a
+step allocates nothing.  The grid is copied into a buffer with a one cell
+border (left empty, or filled from the opposite edge), and the counts are
+summed from the shifted views of that buffer.
+
+If the compiled ``_neighbourhood`` extension has been built with
+
+    python setup_kernels.py build_ext --inplace
+
+the counts are computed in one pass over the grid instead.  Both give the
+same counts.
+"""
+
+import numpy as np
+
+try:
+    from . import _neighbourhood
+except ImportError:
+    _neighbourhood = None
+
+STENCILS = {
+    4: ((-1, 0), (1, 0), (0, -1), (0, 1)),
+    8: ((-1, 0), (1, 0), (0, -1), (0, 1),
+        (-1, -1), (-1, 1), (1, -1), (1, 1)),
+}
+BOUNDARIES = ("closed", "periodic")
+
+
+class NeighbourCounter(object):
+    """Count the set neighbours of the cells of boolean grids of one shape.
+
+    Parameters
+    ==========
+
+        shape: tuple of int
+            shape of the grids to count
+
+        stencil: int
+            4 or 8 neighbours
+
+        boundary: str
+            "closed" or "periodic"
+
+        compiled: bool
+            use the compiled kernel; by default it is used if it was built
+
+    """
+    def __init__(self, shape, stencil=4, boundary="closed", compiled=None):
+        if stencil not in STENCILS:
+            raise ValueError("stencil must be 4 or 8, not {!r}".format(stencil))
+        if boundary not in BOUNDARIES:
+            raise ValueError("boundary must be one of {}, not {!r}".format(
+                BOUNDARIES, boundary))
+        if compiled is None:
+            compiled = _neighbourhood is not None
+        elif compiled and _neighbourhood is None:
+            raise ImportError("the _neighbourhood extension is not built")
+        self.shape = tuple(shape)
+        self.stencil = stencil
+        self.boundary = boundary
+        self.compiled = compiled
+
+        n_rows, n_cols = self.shape
+        self.counts = np.zeros(self.shape, dtype=np.uint8)
+        self._mask = np.zeros(self.shape, dtype=bool)
+        self._padded = np.zeros((n_rows + 2, n_cols + 2), dtype=np.uint8)
+        self._interior = self._padded[1:-1, 1:-1]
+        self._shifted = [self._padded[1 + di:n_rows + 1 + di,
+                                      1 + dj:n_cols + 1 + dj]
+                         for di, dj in STENCILS[stencil]]
+
+    def __repr__(self):
+        return "{}(shape={}, stencil={}, boundary={!r})".format(
+            self.__class__.__name__, self.shape, self.stencil, self.boundary)
+
+    def count(self, grid, out=None):
+        """Number of set neighbours of every cell of grid, as uint8.
+
+        The counts are written into out, or into the counter's own buffer,
+        which the next call overwrites.
+        """
+        if out is None:
+            out = self.counts
+        if self.compiled:
+            _neighbourhood.count_neighbours(
+                np.ascontiguousarray(grid).view(np.uint8), out,
+                self.stencil, self.boundary == "periodic")
+            return out
+
+        self._pad(grid)
+        np.copyto(out, self._shifted[0])
+        for shifted in self._shifted[1:]:
+            np.add(out, shifted, out=out)
+        return out
+
+    def at_least(self, grid, n, out=None):
+        """Boolean grid of the cells with at least n set neighbours."""
+        if out is None:
+            out = self._mask
+        return np.greater_equal(self.count(grid), n, out=out)
+
+    def touching(self, grid, out=None):
+        """Boolean grid of the cells with any set neighbour."""
+        return self.at_least(grid, 1, out=out)
+
+    def _pad(self, grid):
+        padded = self._padded
+        self._interior[...] = grid
+        if self.boundary == "periodic":
+            padded[0, 1:-1] = padded[-2, 1:-1]
+            padded[-1, 1:-1] = padded[1, 1:-1]
+            # the columns last, so that they carry the corners
+            padded[:, 0] = padded[:, -2]
+            padded[:, -1] = padded[:, 1]
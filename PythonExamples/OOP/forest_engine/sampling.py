@@ -0,0 +1,55 @@
+"""
+Event sampling
+--------------
+
+The forest models ask, twice per step, "in which cells does an event with
+probability p happen?".  Drawing a uniform number for every cell answers that
+at a cost proportional to the size of the forest, even though with
+``p_sapling=0.0025`` only one cell in 400 is picked.
+
+random_cells() draws the answer directly.  The gaps between successive events
+of a run of independent Bernoulli(p) trials are geometrically distributed, so
+the picked cells are found by summing geometric skips, and the cost is
+proportional to the number of events instead.  For large p, where most cells
+are picked anyway, it falls back to one uniform per cell.
+
+Both methods pick every cell independently with probability p, so the models
+behave the same whichever is used.
+"""
+
+import numpy as np
+
+# above this probability a uniform per cell is cheaper than skipping
+DENSE_PROBABILITY = 0.05
+
+
+def make_rng(rng=None):
+    """Return a numpy Generator from a Generator, a seed or None."""
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng(rng)
+
+
+def random_cells(n_cells, p, rng):
+    """Sorted indices of the cells, out of n_cells, picked with probability p.
+
+    rng is a numpy.random.Generator.
+    """
+    if p <= 0 or n_cells == 0:
+        return np.empty(0, dtype=np.intp)
+    if p >= DENSE_PROBABILITY:
+        return np.flatnonzero(rng.random(n_cells) < p)
+
+    # draw the skips in batches that usually cover the forest in one go
+    expected = n_cells * p
+    batch = int(expected + 4 * np.sqrt(expected)) + 16
+    chunks = []
+    last = -1
+    while True:
+        cells = last + np.cumsum(rng.geometric(p, size=batch))
+        if cells[-1] >= n_cells:
+            chunks.append(cells[cells < n_cells])
+            break
+        chunks.append(cells)
+        last = cells[-1]
+    return np.concatenate(chunks).astype(np.intp, copy=False)
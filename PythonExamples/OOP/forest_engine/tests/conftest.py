@@ -0,0 +1,21 @@
+# the Forest class of the lecture is defined in the notebook, which is not a
+# module; the forest_class fixture runs the notebook's code up to the end of
+# the class, leaving out the IPython magic and the cells using the class
+import os
+
+import pytest
+
+NOTEBOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        os.pardir, os.pardir,
+                        "2_oop-forest-fire-model_1455727098.py")
+
+
+@pytest.fixture(scope="session")
+def forest_class():
+    with open(NOTEBOOK) as notebook:
+        source = notebook.read()
+    source = source.split("# Don't worry about")[0]
+    source = source.replace("get_ipython().magic(u'matplotlib inline')", "")
+    namespace = {"__name__": "forest_notebook"}
+    exec(compile(source, NOTEBOOK, "exec"), namespace)
+    return namespace["Forest"]
@@ -0,0 +1,62 @@
+"""
+FireStatistics follows fires through a small forest whose fires are known
+in advance.  Run with pytest from PythonExamples/OOP.
+"""
+
+import numpy as np
+
+from forest_engine import FireStatistics, LogHistogram, burn_frontier
+
+SHAPE = (5, 6)
+
+
+def burn(trees, strikes_by_step, n_steps):
+    # the slow-burn model without growth: strikes at the start of a step,
+    # then the fires spread and burn their trees
+    stats = FireStatistics(trees.shape)
+    fire_cells = np.empty(0, dtype=np.intp)
+    for step in range(n_steps):
+        strikes = np.array(strikes_by_step.get(step, []), dtype=np.intp)
+        strikes = strikes[trees.flat[strikes]]
+        stats.ignite(strikes)
+        fire_cells = np.union1d(fire_cells, strikes)
+        fire_cells = burn_frontier(trees, fire_cells)
+        stats.spread(fire_cells)
+    return stats
+
+
+def test_fires_in_known_groves():
+    trees = np.zeros(SHAPE, dtype=bool)
+    # a row of three trees, struck at its left end, burns one a step
+    trees[1, 1:4] = True
+    # a lone tree, struck two steps later
+    trees[3, 5] = True
+    stats = burn(trees, {0: [1 * 6 + 1], 2: [3 * 6 + 5, 0]}, 6)
+
+    assert not trees.any()
+    assert stats.num_fires == 2
+    assert stats.active_fires == 0
+    assert stats.largest == 3
+    assert stats.longest == 3
+    # 1 is in bin 0 and 3 in bin floor(10 * log10(3)) = 4
+    np.testing.assert_array_equal(stats.sizes.counts, [1, 0, 0, 0, 1])
+    np.testing.assert_array_equal(stats.durations.counts, [1, 0, 0, 0, 1])
+
+
+def test_grove_burns_for_its_depth():
+    # a 2 x 2 grove struck in a corner burns in three steps
+    trees = np.zeros(SHAPE, dtype=bool)
+    trees[2:4, 2:4] = True
+    stats = burn(trees, {1: [2 * 6 + 2]}, 5)
+    assert (stats.num_fires, stats.largest, stats.longest) == (1, 4, 3)
+
+
+def test_log_histogram_bins():
+    histogram = LogHistogram(bins_per_decade=1)
+    histogram.add([1, 9, 10, 99, 100, 1000])
+    np.testing.assert_array_equal(histogram.counts, [2, 2, 1, 1])
+    np.testing.assert_allclose(histogram.edges, [1, 10, 100, 1000, 10000])
+    assert histogram.total == 6
+    centres, density = histogram.density()
+    np.testing.assert_allclose(density * np.diff(histogram.edges) * 6,
+                               [2, 2, 1, 1])
@@ -0,0 +1,74 @@
+"""
+A GroveIndex grown and burnt tree by tree keeps the same groves as
+scipy.ndimage.label() finds in the forest.  Run with pytest from
+PythonExamples/OOP.
+"""
+
+import numpy as np
+from scipy.ndimage import label
+
+from forest_engine import GroveIndex
+from forest_engine.groves import NO_TREE
+
+SIZE = (30, 40)
+
+
+def assert_groves_match(index, trees):
+    # every labelled grove is one grove of the index, with its cells
+    groves, num_groves = label(trees)
+    groves = groves.ravel()
+    np.testing.assert_array_equal(index.parent != NO_TREE, groves > 0)
+    roots = set()
+    for grove in range(1, num_groves + 1):
+        cells = np.flatnonzero(groves == grove)
+        root = index.find(cells[0])
+        assert all(index.find(cell) == root for cell in cells)
+        assert index.grove_size[root] == len(cells)
+        np.testing.assert_array_equal(np.sort(index.grove(cells[0])), cells)
+        roots.add(root)
+    assert len(roots) == num_groves
+
+
+def grow_and_burn(index, trees, rng, n_steps):
+    # plant a few trees a step and, now and then, burn a struck grove
+    flat_trees = trees.reshape(-1)
+    for step in range(n_steps):
+        new_trees = rng.choice(trees.size, 20, replace=False)
+        index.add_trees(new_trees)
+        flat_trees[new_trees] = True
+        if step % 3 == 2:
+            strike = rng.choice(np.flatnonzero(flat_trees))
+            groves, _ = label(trees)
+            expected = np.flatnonzero(groves.ravel() == groves.flat[strike])
+            burnt = index.burn_grove(strike)
+            np.testing.assert_array_equal(np.sort(burnt), expected)
+            flat_trees[burnt] = False
+        assert_groves_match(index, trees)
+
+
+def test_grown_index_matches_label():
+    rng = np.random.default_rng(3)
+    trees = np.zeros(SIZE, dtype=bool)
+    index = GroveIndex(SIZE)
+    grow_and_burn(index, trees, rng, 60)
+
+
+def test_rebuilt_index_matches_label():
+    # the instant burn forest drops its index and rebuilds it from the
+    # trees when next asked; trees added after that join the right groves
+    rng = np.random.default_rng(4)
+    trees = rng.random(SIZE) < 0.5
+    index = GroveIndex.from_trees(trees)
+    assert_groves_match(index, trees)
+    grow_and_burn(index, trees, rng, 30)
+
+    index = GroveIndex.from_trees(trees)
+    assert_groves_match(index, trees)
+    grow_and_burn(index, trees, rng, 30)
+
+
+def test_empty_forest():
+    index = GroveIndex.from_trees(np.zeros(SIZE, dtype=bool))
+    assert not index.has_tree(0)
+    index.add_trees([0, 1, SIZE[1]])
+    np.testing.assert_array_equal(np.sort(index.grove(1)), [0, 1, SIZE[1]])
@@ -0,0 +1,31 @@
+"""
+Everything a HistoryRecorder records comes back from load_history().  Run
+with pytest from PythonExamples/OOP.
+"""
+
+import numpy as np
+import pytest
+
+from forest_engine import HistoryRecorder, load_history
+
+
+@pytest.mark.parametrize("n_steps", [0, 7, 10, 25])
+def test_recorder_round_trips_through_load_history(tmp_path, n_steps):
+    path = str(tmp_path / "history")
+    values = np.random.default_rng(0).random((n_steps, 2))
+    with HistoryRecorder(("tree_fraction", "fire_fraction"), capacity=10,
+                         path=path) as history:
+        for step in range(n_steps):
+            history.record(*values[step])
+    loaded = load_history(path)
+    np.testing.assert_array_equal(loaded["tree_fraction"], values[:, 0])
+    np.testing.assert_array_equal(loaded["fire_fraction"], values[:, 1])
+
+
+def test_view_holds_the_most_recent_steps():
+    history = HistoryRecorder(("step",), capacity=10)
+    for step in range(25):
+        history.record(step)
+    assert len(history) == 10
+    np.testing.assert_array_equal(history.view("step"), np.arange(15, 25))
+    assert history.last("step") == 24
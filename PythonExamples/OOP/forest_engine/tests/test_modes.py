@@ -0,0 +1,146 @@
+"""
+Every way the Forest model can step its grids gives the same forest for the
+same seed.  Run with pytest from PythonExamples/OOP.
+
+The modes are driven here as the notebook's Forest drives them, and compared
+with a plain NumPy step of the lecture's rules.
+"""
+
+import numpy as np
+import pytest
+
+from forest_engine import (BitGrid, ForestEnsemble, NeighbourCounter,
+                           TiledForestEngine, burn_frontier, make_rng,
+                           random_cells, slow_burn_step)
+
+SIZE = (40, 50)
+P_SAPLING = 0.01
+P_LIGHTNING = 0.001
+N_STEPS = 60
+SEED = 7
+
+
+def initial_forest():
+    rng = make_rng(SEED)
+    trees = rng.random(SIZE) < 0.5
+    fires = np.zeros(SIZE, dtype=bool)
+    return trees, fires, rng
+
+
+def draw_events(rng):
+    n_cells = SIZE[0] * SIZE[1]
+    growth = random_cells(n_cells, P_SAPLING, rng)
+    strikes = random_cells(n_cells, P_LIGHTNING, rng)
+    return growth, strikes
+
+
+def grow_and_strike(trees, fires, rng):
+    growth, strikes = draw_events(rng)
+    trees.flat[growth] = True
+    strikes = strikes[trees.flat[strikes]]
+    fires.flat[strikes] = True
+    return strikes
+
+
+def run_reference(counts=None):
+    # counts, if given, collects the numbers of strikes and burning cells
+    trees, fires, rng = initial_forest()
+    for step in range(N_STEPS):
+        strikes = grow_and_strike(trees, fires, rng)
+        if counts is not None:
+            counts.append((len(strikes), np.count_nonzero(fires)))
+        padded = np.pad(fires, 1)
+        new_fires = (padded[:-2, 1:-1] | padded[2:, 1:-1] |
+                     padded[1:-1, :-2] | padded[1:-1, 2:]) & trees
+        trees[fires] = False
+        fires = new_fires
+    return trees, fires
+
+
+def run_dense():
+    trees, fires, rng = initial_forest()
+    neighbours = NeighbourCounter(SIZE, compiled=False)
+    for step in range(N_STEPS):
+        grow_and_strike(trees, fires, rng)
+        new_fires = neighbours.touching(fires).copy()
+        new_fires &= trees
+        trees[fires] = False
+        fires = new_fires
+    return trees, fires
+
+
+def run_packed():
+    dense_trees, dense_fires, rng = initial_forest()
+    trees = BitGrid.from_array(dense_trees)
+    fires = BitGrid.from_array(dense_fires)
+    for step in range(N_STEPS):
+        grow_and_strike(trees, fires, rng)
+        new_fires = fires.neighbours()
+        new_fires &= trees
+        trees[fires] = False
+        fires = new_fires
+    return np.asarray(trees), np.asarray(fires)
+
+
+def run_tiled():
+    trees, fires, rng = initial_forest()
+    with TiledForestEngine(SIZE, n_workers=2, n_bands=3) as tiles:
+        tiles.load(trees, fires)
+        for step in range(N_STEPS):
+            # the engine finds the struck trees itself
+            tiles.step_slow_burn(*draw_events(rng))
+        return tiles.trees.copy(), tiles.forest_fires.copy()
+
+
+def run_frontier():
+    trees, fires, rng = initial_forest()
+    fire_cells = np.flatnonzero(fires)
+    for step in range(N_STEPS):
+        strikes = grow_and_strike(trees, fires, rng)
+        fire_cells = np.union1d(fire_cells, strikes)
+        fires.flat[fire_cells] = False
+        fire_cells = burn_frontier(trees, fire_cells)
+        fires.flat[fire_cells] = True
+    return trees, fires
+
+
+def run_compiled():
+    if slow_burn_step is None:
+        pytest.skip("the forest_engine._fused extension is not built")
+    trees, fires, rng = initial_forest()
+    new_fires = np.zeros(SIZE, dtype=bool)
+    for step in range(N_STEPS):
+        slow_burn_step(trees.view(np.uint8), fires.view(np.uint8),
+                       new_fires.view(np.uint8), *draw_events(rng))
+        fires, new_fires = new_fires, fires
+    return trees, fires
+
+
+def run_ensemble():
+    # a one-member ensemble draws its events as a Forest does
+    trees, fires, rng = initial_forest()
+    ensemble = ForestEnsemble(SIZE, P_SAPLING, P_LIGHTNING, rng=rng)
+    ensemble.trees[0] = trees
+    for step in range(N_STEPS):
+        ensemble.advance_one_step()
+    return ensemble.member(0)
+
+
+MODES = [run_dense, run_packed, run_tiled, run_frontier, run_compiled,
+         run_ensemble]
+
+
+def test_reference_fires_spread():
+    # or the modes would only be compared on growth
+    counts = []
+    run_reference(counts)
+    n_strikes, n_burning = np.sum(counts, axis=0)
+    assert n_burning > 10 * n_strikes > 0
+
+
+@pytest.mark.parametrize("run", MODES)
+def test_mode_matches_reference(run):
+    expected_trees, expected_fires = run_reference()
+    trees, fires = run()
+    np.testing.assert_array_equal(trees, expected_trees)
+    np.testing.assert_array_equal(fires, expected_fires)
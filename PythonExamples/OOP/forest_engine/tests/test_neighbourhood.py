@@ -0,0 +1,76 @@
+"""
+NeighbourCounter counts, for every stencil and boundary and with or
+without the compiled kernel, match counts made one neighbour at a time.
+Run with pytest from PythonExamples/OOP.
+"""
+
+import numpy as np
+import pytest
+
+from forest_engine import NeighbourCounter
+from forest_engine.neighbourhood import BOUNDARIES, STENCILS, _neighbourhood
+
+SHAPES = [(7, 9), (1, 5), (6, 1), (2, 2)]
+
+compiled_modes = [False, pytest.param(True, marks=pytest.mark.skipif(
+    _neighbourhood is None, reason="the _neighbourhood extension is not built"))]
+
+
+def reference_counts(grid, stencil, boundary):
+    # shift the grid by each offset, wrapping or filling with empty cells
+    n_rows, n_cols = grid.shape
+    counts = np.zeros(grid.shape, dtype=int)
+    for di, dj in STENCILS[stencil]:
+        if boundary == "periodic":
+            counts += np.roll(grid, (-di, -dj), axis=(0, 1))
+            continue
+        padded = np.zeros((n_rows + 2, n_cols + 2), dtype=int)
+        padded[1:-1, 1:-1] = grid
+        counts += padded[1 + di:n_rows + 1 + di, 1 + dj:n_cols + 1 + dj]
+    return counts
+
+
+def grids(shape):
+    rng = np.random.default_rng(shape[0] * 100 + shape[1])
+    yield np.zeros(shape, dtype=bool)
+    yield np.ones(shape, dtype=bool)
+    for p in (0.2, 0.5):
+        yield rng.random(shape) < p
+
+
+@pytest.mark.parametrize("compiled", compiled_modes)
+@pytest.mark.parametrize("boundary", BOUNDARIES)
+@pytest.mark.parametrize("stencil", sorted(STENCILS))
+@pytest.mark.parametrize("shape", SHAPES)
+def test_counts_match_reference(shape, stencil, boundary, compiled):
+    counter = NeighbourCounter(shape, stencil, boundary, compiled)
+    for grid in grids(shape):
+        expected = reference_counts(grid, stencil, boundary)
+        np.testing.assert_array_equal(counter.count(grid), expected)
+        for n in (1, 2, 3):
+            np.testing.assert_array_equal(counter.at_least(grid, n),
+                                          expected >= n)
+        np.testing.assert_array_equal(counter.touching(grid), expected >= 1)
+
+
+@pytest.mark.skipif(_neighbourhood is None,
+                    reason="the _neighbourhood extension is not built")
+@pytest.mark.parametrize("boundary", BOUNDARIES)
+@pytest.mark.parametrize("stencil", sorted(STENCILS))
+def test_compiled_matches_numpy(stencil, boundary):
+    shape = (40, 33)
+    plain = NeighbourCounter(shape, stencil, boundary, compiled=False)
+    compiled = NeighbourCounter(shape, stencil, boundary, compiled=True)
+    for grid in grids(shape):
+        np.testing.assert_array_equal(compiled.count(grid),
+                                      plain.count(grid))
+
+
+def test_out_buffers():
+    counter = NeighbourCounter((4, 5), compiled=False)
+    grid = np.eye(4, 5, dtype=bool)
+    counts = np.empty((4, 5), dtype=np.uint8)
+    assert counter.count(grid, out=counts) is counts
+    mask = np.empty((4, 5), dtype=bool)
+    assert counter.touching(grid, out=mask) is mask
+    np.testing.assert_array_equal(mask, counts >= 1)
@@ -0,0 +1,76 @@
+"""
+Forest.run() gives the statistics an advance_one_step() loop would, in every
+way the Forest can step.  Run with pytest from PythonExamples/OOP.
+"""
+
+import numpy as np
+import pytest
+
+from forest_engine import slow_burn_step
+
+SIZE = (60, 70)
+N_STEPS = 150
+
+needs_compiled = pytest.mark.skipif(
+    slow_burn_step is None,
+    reason="the forest_engine._fused extension is not built")
+
+MODES = {
+    "dense": dict(frontier="dense", compiled=False),
+    "sparse": dict(frontier="sparse", compiled=False),
+    "auto": dict(frontier="auto", compiled=False),
+    "packed": dict(grid="packed", compiled=False),
+    "compiled": dict(compiled=True),
+    "tiled": dict(n_workers=2),
+}
+
+
+def make_forest(forest_class, mode):
+    forest = forest_class(size=SIZE, p_sapling=0.01, p_lightning=1.e-3,
+                          rng=11, **MODES[mode])
+    forest.track_fires()
+    return forest
+
+
+def fire_summary(statistics):
+    return (statistics.num_fires, statistics.largest, statistics.longest,
+            statistics.sizes.counts.tolist(),
+            statistics.durations.counts.tolist())
+
+
+@pytest.mark.parametrize("mode", [
+    mode if mode != "compiled" else pytest.param(mode, marks=needs_compiled)
+    for mode in MODES])
+def test_run_matches_step_loop(forest_class, mode):
+    looped = make_forest(forest_class, mode)
+    tree_fractions = []
+    fire_fractions = []
+    for step in range(N_STEPS):
+        looped.advance_one_step()
+        tree_fractions.append(looped.tree_fraction)
+        fire_fractions.append(looped.fire_fraction)
+    # or the statistics would only be compared on growth
+    assert looped.fire_statistics.num_fires > 10
+
+    looped.close()
+
+    run = make_forest(forest_class, mode)
+    fractions = run.run(N_STEPS)
+    run.close()
+    np.testing.assert_array_equal(fractions[0], tree_fractions)
+    np.testing.assert_array_equal(fractions[1], fire_fractions)
+    fire_fractions, = run.run(0, record=("fire_fraction",))
+    assert len(fire_fractions) == 0
+
+    assert run.step_count == looped.step_count == N_STEPS
+    np.testing.assert_array_equal(np.asarray(run.trees),
+                                  np.asarray(looped.trees))
+    np.testing.assert_array_equal(np.asarray(run.forest_fires),
+                                  np.asarray(looped.forest_fires))
+    assert (fire_summary(run.fire_statistics) ==
+            fire_summary(looped.fire_statistics))
+
+
+def test_run_rejects_unknown_statistics(forest_class):
+    with pytest.raises(ValueError):
+        forest_class(size=SIZE).run(1, record=("mold_fraction",))
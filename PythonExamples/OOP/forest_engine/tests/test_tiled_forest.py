@@ -0,0 +1,38 @@
+"""
+A tiled Forest steps like a single-process one, and once closed carries on
+stepping in this process.  Run with pytest from PythonExamples/OOP.
+"""
+
+import numpy as np
+
+SIZE = (50, 40)
+
+
+def make_forest(forest_class, **kwargs):
+    return forest_class(size=SIZE, p_sapling=0.01, p_lightning=1.e-3, rng=5,
+                        compiled=False, **kwargs)
+
+
+def test_closed_forest_steps_on(forest_class):
+    plain = make_forest(forest_class)
+    with make_forest(forest_class, n_workers=2) as tiled:
+        assert not hasattr(tiled, "_spare_fires")
+        for forest in (plain, tiled):
+            forest.run(40)
+        np.testing.assert_array_equal(tiled.trees, plain.trees)
+    # the grids were copied out of the shared memory the tiles freed
+    np.testing.assert_array_equal(tiled.trees, plain.trees)
+    np.testing.assert_array_equal(tiled.forest_fires, plain.forest_fires)
+
+    for forest in (plain, tiled):
+        forest.run(40)
+    np.testing.assert_array_equal(tiled.trees, plain.trees)
+    np.testing.assert_array_equal(tiled.forest_fires, plain.forest_fires)
+    tiled.close()
+
+
+def test_untiled_forest_closes(forest_class):
+    with make_forest(forest_class) as forest:
+        forest.advance_one_step()
+    forest.advance_one_step()
+    assert forest.step_count == 2
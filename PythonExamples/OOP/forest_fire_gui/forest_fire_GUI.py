@@ -4,23 +4,34 @@
 # http://training.enthought.com 
 # Copyright 2015 Enthought, Inc.
 
+import threading
+import traceback
+
 import numpy as np
-from numpy.random import uniform
 from scipy.ndimage.measurements import label
 
 from chaco.api import ArrayPlotData, Plot, VPlotContainer
 from enable.api import ComponentEditor
+from pyface.api import GUI, error
 from pyface.timer.api import Timer
-from traits.api import (HasTraits, Array, Bool, Button, DelegatesTo, Enum,
-                        Instance, Int, Property, Range,
+from traits.api import (HasTraits, Any, Array, Bool, Button, DelegatesTo,
+                        Enum, Instance, Int, Property, Range,
                         String)
 from traitsui.api import ButtonEditor, HGroup, Item, VGroup, View
 
+# the shared forest code lives one level up, in PythonExamples/OOP, which
+# must be on the path: from this directory, run
+# ``PYTHONPATH=.. python forest_fire_GUI.py``
+from forest_engine import (GroveIndex, HistoryRecorder, TiledForestEngine,
+                           make_rng, random_cells)
+
 history_length = 3000
 
 
-def randbool(nx, ny, p):
-    return uniform(size=(nx, ny)) <= p
+def randcells(nx, ny, p, rng):
+    """ Flat indices of the cells of an nx by ny grid picked with
+    probability p, drawn from the numpy Generator rng. """
+    return random_cells(nx * ny, p, rng)
 
 
 class Forest(HasTraits):
@@ -30,6 +41,11 @@ class Forest(HasTraits):
     forest_fires = Array(dtype=bool)
     size_x = Int(150)
     size_y = Int(150)
+    # number of processes to advance the forest with; 0 runs in this process
+    n_workers = Int(0)
+    # numpy.random.Generator the random events are drawn from, or a seed
+    rng = Any
+    _tiles = Any
 
     def _forest_trees_default(self):
         return np.zeros((self.size_x, self.size_y))
@@ -37,7 +53,17 @@ class Forest(HasTraits):
     def _forest_fires_default(self):
         return np.zeros((self.size_x, self.size_y))
 
+    def _rng_default(self):
+        return make_rng()
+
+    def _rng_changed(self, new):
+        if not isinstance(new, np.random.Generator):
+            self.rng = make_rng(new)
+
     def advance_one_day(self):
+        if self.n_workers > 0:
+            self._advance_tiled()
+            return
         self.grow_trees()
         self.start_fires()
         self.burn_trees()
@@ -54,31 +80,95 @@ class Forest(HasTraits):
         self.forest_fires = new_fires
 
     def grow_trees(self):
-        growth_sites = randbool(self.size_x, self.size_y, self.p_sapling)
-        self.forest_trees[growth_sites] = True
+        growth_sites = randcells(self.size_x, self.size_y, self.p_sapling,
+                                 self.rng)
+        self.forest_trees.flat[growth_sites] = True
 
     def start_fires(self):
-        lightning_strikes = randbool(self.size_x, self.size_y,
-                                     self.p_lightning) & self.forest_trees
-        self.forest_fires[lightning_strikes] = True
+        lightning_strikes = randcells(self.size_x, self.size_y,
+                                      self.p_lightning, self.rng)
+        lightning_strikes = lightning_strikes[
+            self.forest_trees.flat[lightning_strikes]]
+        self.forest_fires.flat[lightning_strikes] = True
+
+    def _advance_tiled(self):
+        # draw the random events here, in the same order as the
+        # single-process model, so both give identical forests
+        if self._tiles is None:
+            self._tiles = TiledForestEngine((self.size_x, self.size_y),
+                                            n_workers=self.n_workers)
+            self._tiles.load(self.forest_trees, self.forest_fires)
+        growth_sites = randcells(self.size_x, self.size_y, self.p_sapling,
+                                 self.rng)
+        lightning_strikes = randcells(self.size_x, self.size_y,
+                                      self.p_lightning, self.rng)
+        self._tiled_step(growth_sites, lightning_strikes)
+        self.forest_trees = self._tiles.trees
+        self.forest_fires = self._tiles.forest_fires
+
+    def _tiled_step(self, growth_sites, lightning_strikes):
+        self._tiles.step_slow_burn(growth_sites, lightning_strikes)
 
 
 class InstantBurnForest(Forest):
+    # keep a union-find index of the groves up to date as trees grow and
+    # burn, instead of relabelling the whole forest every day
+    incremental = Bool(True)
+    _groves = Any
 
     def advance_one_day(self):
+        if self.n_workers > 0:
+            self._advance_tiled()
+            return
         self.grow_trees()
         self.strike_and_burn()
 
+    def grow_trees(self):
+        if not self.incremental:
+            super(InstantBurnForest, self).grow_trees()
+            return
+        growth_sites = randcells(self.size_x, self.size_y, self.p_sapling,
+                                 self.rng)
+        new_trees = growth_sites[~self.forest_trees.flat[growth_sites]]
+        self.forest_trees.flat[new_trees] = True
+        self._get_groves().add_trees(new_trees)
+
     def strike_and_burn(self):
-        strikes = randbool(self.size_x, self.size_y,
-                           self.p_lightning) & self.forest_trees
+        strikes = randcells(self.size_x, self.size_y, self.p_lightning,
+                            self.rng)
+        strikes = strikes[self.forest_trees.flat[strikes]]
+        if self.incremental:
+            self._strike_and_burn_groves(strikes)
+            return
         groves, num_groves = label(self.forest_trees)
-        fires = set(groves[strikes])
+        fires = set(groves.flat[strikes])
         self.forest_fires.fill(False)
         for fire in fires:
             self.forest_fires[groves == fire] = True
         self.forest_trees[self.forest_fires] = False
 
+    def _strike_and_burn_groves(self, strikes):
+        # each struck grove is burned by walking its own cells only
+        groves = self._get_groves()
+        self.forest_fires.fill(False)
+        for strike in strikes:
+            if groves.has_tree(strike):
+                burned = groves.burn_grove(strike)
+                self.forest_fires.flat[burned] = True
+                self.forest_trees.flat[burned] = False
+
+    def _get_groves(self):
+        if self._groves is None:
+            self._groves = GroveIndex.from_trees(self.forest_trees)
+        return self._groves
+
+    def _forest_trees_changed(self):
+        # the trees were replaced wholesale, so index them again on demand
+        self._groves = None
+
+    def _tiled_step(self, growth_sites, lightning_strikes):
+        self._tiles.step_instant_burn(growth_sites, lightning_strikes)
+
 
 class ForestView(HasTraits):
     # UI Elements
@@ -97,15 +187,25 @@ class ForestView(HasTraits):
     # ModelView Elements
     density_function = Property(Array)
     fractions = Property(Array(dtype=float))
-    fire_history = Array(dtype=float)
+    fire_history = Property(Array(dtype=float))
     forest = Instance(Forest)
+    history = Instance(HistoryRecorder)
+    # directory to append the whole history to, for very long runs
+    history_path = String
     p_sapling = DelegatesTo("forest", "p_sapling")
     p_lightning = DelegatesTo("forest", "p_lightning")
     plot_data = Instance(ArrayPlotData)
-    time = Array(dtype=int)
-    tree_history = Array(dtype=float)
+    time = Property(Array)
+    tree_history = Property(Array(dtype=float))
 
     run = Bool
+    # advance the model in a worker thread as fast as it will go, and only
+    # redraw the plots every frame_interval milliseconds
+    decoupled = Bool(False)
+    frame_interval = Int(150)
+    _frame = Any
+    _frame_wanted = Any
+    _worker = Any
 
     traits_view = View(
         HGroup(
@@ -131,38 +231,65 @@ class ForestView(HasTraits):
         resizable=True,
     )
 
-    def update_fire_history(self):
-        self.fire_history[1:] = self.fire_history[:-1]
-        self.fire_history[0] = float(np.sum(self.forest.forest_fires)) / \
-            self.forest.forest_fires.size
+    def frame_data(self, copy=False):
+        """ The plot data for the current state of the model.  With copy
+        the arrays stay valid while the model goes on running. """
+        fractions, density_function = self.trait_to_histogram.density()
+        data = dict(forest_image=self.forest_image,
+                    fire_history=self.fire_history,
+                    tree_history=self.tree_history,
+                    time=self.time,
+                    fractions=fractions,
+                    density_function=density_function)
+        if copy:
+            for name in ("fire_history", "tree_history", "time"):
+                data[name] = data[name].copy()
+        return data
 
-    def update_tree_history(self):
-        self.tree_history[1:] = self.tree_history[:-1]
-        self.tree_history[0] = float(np.sum(self.forest.forest_trees)) / \
-            self.forest.forest_trees.size
+    def update_history(self):
+        day = self.history.last("time") + 1
+        self.history.record(day, *self._current_fractions())
 
-    def update_time(self):
-        self.time[1:] = self.time[:-1]
-        self.time[0] = self.time[1] + 1
+    def _current_fractions(self):
+        trees = self.forest.forest_trees
+        fires = self.forest.forest_fires
+        return (float(np.count_nonzero(trees)) / trees.size,
+                float(np.count_nonzero(fires)) / fires.size)
 
     def _advance(self):
         self.forest.advance_one_day()
-        self.update_fire_history()
-        self.update_tree_history()
-        self.update_time()
-        self.plot_data.set_data("forest_image", self.forest_image)
-        self.plot_data.set_data("fire_history", self.fire_history)
-        self.plot_data.set_data("tree_history", self.tree_history)
-        self.plot_data.set_data("density_function",
-                                self.density_function)
-        self.plot_data.set_data("time", self.time)
-        self.plot_data.set_data("fractions", self.fractions)
+        self.update_history()
+        self.plot_data.update_data(self.frame_data())
 
     def _day_fired(self):
-        self._advance()
+        if self._worker is None:
+            self._advance()
 
-    def _fire_history_default(self):
-        return np.zeros((history_length, ), dtype=float)
+    def _draw_latest_frame(self):
+        # show the last frame the worker published and ask for a new one, so
+        # the GUI thread never waits for the model
+        frame, self._frame = self._frame, None
+        if frame is not None:
+            self.plot_data.update_data(frame)
+        self._frame_wanted.set()
+
+    def _simulate(self):
+        # the worker thread: step until stopped, handing over a copy of the
+        # state whenever the GUI asks for one
+        try:
+            while self.run:
+                self.forest.advance_one_day()
+                self.update_history()
+                if self._frame_wanted.is_set():
+                    self._frame_wanted.clear()
+                    self._frame = self.frame_data(copy=True)
+        except Exception:
+            # stopping joins this thread, so the GUI thread has to do it
+            GUI.invoke_later(self._worker_failed, traceback.format_exc())
+
+    def _worker_failed(self, message):
+        self.run = False
+        error(None, message, title="The forest model failed")
 
     def _fire_time_plot_default(self):
         plot = Plot(self.plot_data, title="Fractional area with fires")
@@ -176,26 +303,16 @@ class ForestView(HasTraits):
         return plot
 
     def _get_fractions(self):
-        data = self.trait_to_histogram
-        return np.linspace(data.min(), data.max(), 50)
+        return self.trait_to_histogram.density()[0]
 
     def _get_fire_density_function(self):
-        hist, bins = np.histogram(self.fire_history, bins=self.fractions,
-                                  normed=True)
-        tot = np.sum(hist)
-        if tot > 0:
-            hist /= tot
-        return hist
+        return self.history.histogram("fire_fraction").density()[1]
 
     def _get_density_function(self):
-        time_since_start = self.time > 0
-        data = self.trait_to_histogram
-        hist, bins = np.histogram(data[time_since_start],
-                                  bins=self.fractions, normed=True)
-        tot = np.sum(hist)
-        if tot > 0:
-            hist /= tot
-        return hist
+        return self.trait_to_histogram.density()[1]
+
+    def _get_fire_history(self):
+        return self.history.view("fire_fraction")
 
     def _get_forest_image(self):
         image = np.zeros((self.forest.size_x, self.forest.size_y, 3),
@@ -211,18 +328,35 @@ class ForestView(HasTraits):
             label = "Run"
         return label
 
+    def _get_time(self):
+        return self.history.view("time")
+
     def _get_trait_to_histogram(self):
+        # running bin counts, kept up to date by the history recorder
         trait_to_histogram = {
-            "trees": self.tree_history,
-            "fire": self.fire_history,
+            "trees": "tree_fraction",
+            "fire": "fire_fraction",
         }
-        return trait_to_histogram[self.which_histogram]
+        return self.history.histogram(trait_to_histogram[self.which_histogram])
+
+    def _get_tree_history(self):
+        return self.history.view("tree_fraction")
 
     def _histograms_default(self):
         plot = Plot(self.plot_data)
         plot.plot(["fractions", "density_function"], color="green")
         return plot
 
+    def _history_default(self):
+        # O(1) per day, and the plots get views rather than copies
+        history = HistoryRecorder(("time", "tree_fraction", "fire_fraction"),
+                                  capacity=history_length,
+                                  path=self.history_path or None,
+                                  histograms=("tree_fraction",
+                                              "fire_fraction"))
+        history.record(0, *self._current_fractions())
+        return history
+
     def _plot_data_default(self):
         data = ArrayPlotData(forest_image=self.forest_image,
                              tree_history=self.tree_history,
@@ -240,14 +374,33 @@ class ForestView(HasTraits):
 
     def _run_changed(self):
         if self.run:
+            if self.decoupled:
+                self._start_worker()
             self.timer.Start()
         else:
             self.timer.Stop()
+            self._stop_worker()
+            # the history file is complete whenever the forest is stopped
+            self.history.flush()
 
     def _run_default(self):
-        self.timer = Timer(150, self._timer_tick)
+        self.timer = Timer(self.frame_interval, self._timer_tick)
         return False
 
+    def _start_worker(self):
+        self._frame = None
+        self._frame_wanted = threading.Event()
+        self._frame_wanted.set()
+        self._worker = threading.Thread(target=self._simulate)
+        self._worker.daemon = True
+        self._worker.start()
+
+    def _stop_worker(self):
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+            self.plot_data.update_data(self.frame_data())
+
     def _time_plots_default(self):
         return VPlotContainer(self.fire_time_plot, self.tree_time_plot,
                               self.histograms, spacing=0.)
@@ -255,25 +408,21 @@ class ForestView(HasTraits):
     def _timer_tick(self):
         if not self.run:
             raise StopIteration
+        elif self._worker is not None:
+            self._draw_latest_frame()
         else:
             self._advance()
 
-    def _tree_history_default(self):
-        return np.zeros((history_length, ), dtype=float)
-
     def _tree_time_plot_default(self):
         plot = Plot(self.plot_data, title="Fractional area covered by trees")
         plot.plot(["time", "tree_history"])
         return plot
 
-    def _time_default(self):
-        time = np.zeros((history_length, ), dtype=int)
-        time[0] = 1
-        return time
-
 
 if __name__ == "__main__":
     f = InstantBurnForest()
     # f = Forest()
+    # f = InstantBurnForest(n_workers=4)
     fv = ForestView(forest=f)
+    # fv = ForestView(forest=f, decoupled=True)
     fv.configure_traits()
\ No newline at end of file
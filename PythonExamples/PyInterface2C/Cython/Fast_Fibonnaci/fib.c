@@ -42,3 +42,25 @@ double _sum2(coord* val, int length)
     }
     return sum;
 } 
+
+// Batch versions of _sum and _sum2: out[i] is the sum of the
+// array at vals[i], which has lengths[i] elements, for each of
+// the count arrays.  One call from python covers them all.
+
+void _sum_many(float** vals, int* lengths, int count, float* out)
+{
+    int i;
+    for (i = 0; i < count; i++)
+    {
+        out[i] = _sum(vals[i], lengths[i]);
+    }
+}
+
+void _sum2_many(coord** vals, int* lengths, int count, double* out)
+{
+    int i;
+    for (i = 0; i < count; i++)
+    {
+        out[i] = _sum2(vals[i], lengths[i]);
+    }
+}
@@ -0,0 +1,188 @@
+"""
+ctypes binding for libfib
+-------------------------
+
+ctypes_fib_solution.py sets up the functions of libfib by hand, and its
+sum() converts its argument on every call.  This module loads libfib once,
+sets the argtypes and restype of each function once, and wraps them:
+
+    fib(n)                     the nth Fibonacci number, for n up to 46
+    sum(ary)                   _sum of a float32 array
+    sum2(ary)                  _sum2 of a coord array
+    sum_many(arrays, out)      _sum of each of many arrays, in one call
+    sum2_many(arrays, out)     _sum2 of each of many arrays, in one call
+
+Arrays that already have the right dtype and are C contiguous and aligned
+are passed as they are; anything else is converted first.  The array arguments are
+declared as plain pointers, and passed as their addresses, which is much
+quicker than letting an ndpointer check them on every call.
+
+The batch functions pay the cost of a ctypes call once for all the arrays,
+and write their sums into out, which may be given to reuse a buffer.
+
+Functions loaded with ctypes.CDLL release the GIL while they run, so calls
+from several threads do run at the same time.
+
+Build the library first with the build script for your platform.
+"""
+
+import ctypes
+from os import path
+
+import numpy as np
+
+coord_dtype = np.dtype([('x', np.float64), ('y', np.float64)])
+
+_INT_MAX = 2 ** 31 - 1
+# the largest n whose Fibonacci number fits in a C int
+FIB_MAX = 46
+
+_libfib = None
+
+
+def load_fib():
+    """ The libfib library, with its functions set up; loaded only once.
+
+    Raises a RuntimeError if the library cannot be found.
+    """
+    global _libfib
+    if _libfib is not None:
+        return _libfib
+
+    here = path.dirname(path.abspath(__file__))
+    for libname in ('libfib.dll', 'libfib.so'):
+        try:
+            lib = ctypes.CDLL(path.join(here, libname))
+        except OSError:
+            pass
+        else:
+            break
+    else:
+        raise RuntimeError("Can't find the libfib library, "
+                           "did you run the build script for your platform?")
+
+    lib.fib.restype = ctypes.c_int
+    lib.fib.argtypes = [ctypes.c_int]
+    lib._sum.restype = ctypes.c_float
+    lib._sum.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    lib._sum2.restype = ctypes.c_double
+    lib._sum2.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    for function in (lib._sum_many, lib._sum2_many):
+        function.restype = None
+        # (vals, lengths, count, out)
+        function.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int,
+                             ctypes.c_void_p]
+    _libfib = lib
+    return lib
+
+
+def fib(n):
+    """ The nth number of the Fibonacci sequence [0, 1, 1, 2, ...].
+
+    libfib works it out in a C int, with the exponential time recursion, so
+    n must be at most FIB_MAX; past it the int would overflow.
+    """
+    if n > FIB_MAX:
+        raise ValueError("fib(n) overflows a C int for n > {}, got {}".format(
+            FIB_MAX, n))
+    return load_fib().fib(n)
+
+
+def sum(ary):
+    """ The sum of an array of numbers, in float32. """
+    ary = _as_array(ary, np.float32)
+    return load_fib()._sum(ary.ctypes.data, len(ary))
+
+
+def sum2(ary):
+    """ The sum of the x and y fields of an array of coords. """
+    ary = _as_array(ary, coord_dtype)
+    return load_fib()._sum2(ary.ctypes.data, len(ary))
+
+
+def sum_many(arrays, out=None):
+    """ The float32 sum of each of a sequence of arrays.
+
+    Returns out, a float32 array with an element for each array.
+    """
+    return _batch(load_fib()._sum_many, arrays, np.float32, out, np.float32)
+
+
+def sum2_many(arrays, out=None):
+    """ The sum of the x and y fields of each of a sequence of coord arrays.
+
+    Returns out, a float64 array with an element for each array.
+    """
+    return _batch(load_fib()._sum2_many, arrays, coord_dtype, out,
+                  np.float64)
+
+
+def _as_array(ary, dtype):
+    # ary itself if it is an aligned, contiguous 1-d array of dtype, else a
+    # copy; the check is much quicker than np.require, which does it anyway
+    if not (isinstance(ary, np.ndarray) and ary.dtype == dtype
+            and ary.flags.c_contiguous and ary.flags.aligned):
+        ary = np.require(ary, dtype=dtype,
+                         requirements=['C_CONTIGUOUS', 'ALIGNED'])
+    if ary.ndim != 1:
+        raise ValueError("expected a 1-d array, got {} dimensions".format(
+            ary.ndim))
+    if len(ary) > _INT_MAX:
+        raise ValueError("libfib takes arrays of at most {} elements".format(
+            _INT_MAX))
+    return ary
+
+
+def _batch(function, arrays, dtype, out, out_dtype):
+    # the converted arrays must outlive the call, so keep them in a list
+    arrays = [_as_array(ary, dtype) for ary in arrays]
+    count = len(arrays)
+    if out is None:
+        out = np.empty(count, dtype=out_dtype)
+    elif (out.dtype != out_dtype or out.shape != (count,)
+          or not out.flags.c_contiguous or not out.flags.writeable):
+        raise ValueError("out must be a writeable, contiguous {} array of "
+                         "shape ({},)".format(np.dtype(out_dtype), count))
+    pointers = np.array([ary.ctypes.data for ary in arrays], dtype=np.uintp)
+    lengths = np.array([len(ary) for ary in arrays], dtype=np.intc)
+    function(pointers.ctypes.data, lengths.ctypes.data, count, out.ctypes.data)
+    return out
+
+
+if __name__ == "__main__":
+    import threading
+    import time
+
+    print("The tenth Fibonacci number is", fib(10))
+
+    arrays = [np.arange(n, dtype=np.float32) for n in range(1, 1001)]
+    out = np.empty(len(arrays), dtype=np.float32)
+    t1 = time.time()
+    sums = [sum(ary) for ary in arrays]
+    t2 = time.time()
+    sum_many(arrays, out)
+    t3 = time.time()
+    assert np.array_equal(sums, out)
+    print("sum of 1000 arrays, one call each: {:.6f} sec".format(t2 - t1))
+    print("sum_many of 1000 arrays:           {:.6f} sec".format(t3 - t2))
+
+    coords = [np.ones(n, dtype=coord_dtype) for n in range(1, 11)]
+    print("sum2_many:", sum2_many(coords))
+
+    # the sums of one big array, over a thread per chunk
+    big = np.ones(10 ** 7, dtype=np.float32)
+    chunks = np.array_split(big, 4)
+    partial = np.empty(len(chunks), dtype=np.float32)
+
+    def sum_chunk(i):
+        partial[i] = sum(chunks[i])
+
+    threads = [threading.Thread(target=sum_chunk, args=(i,))
+               for i in range(len(chunks))]
+    t1 = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print("sum of {} floats over {} threads: {} ({:.4f} sec)".format(
+        len(big), len(chunks), partial.sum(), time.time() - t1))
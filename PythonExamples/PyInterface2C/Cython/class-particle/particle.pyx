@@ -1,65 +1,229 @@
 cimport cython
+from cython.view cimport array as cvarray
 from libc.math cimport sqrt
+from libc.string cimport memset
 
 DEF _LEN = 3
 
-@cython.boundscheck(False)
-@cython.wraparound(False)
-cdef float magnitude(float[::1] vec):
-    cdef float mag = 0.0
-    for v in vec:
-        mag += v*v
-    return sqrt(mag)
+
+cdef inline float magnitude(float x, float y, float z) noexcept nogil:
+    return sqrt(x*x + y*y + z*z)
+
+
+cdef _floats(shape):
+    # a zeroed float32 buffer; cython arrays cannot have an empty axis, so
+    # an empty buffer is an empty slice of a buffer with one element there
+    cdef tuple full = tuple([max(length, 1) for length in shape])
+    cdef cvarray buf = cvarray(shape=full, itemsize=sizeof(float), format="f")
+    cdef Py_ssize_t size = sizeof(float)
+    for length in full:
+        size *= length
+    memset(buf.data, 0, size)
+    if full == tuple(shape):
+        return buf
+    return buf[tuple([slice(0, length) for length in shape])]
+
+
+cdef _check_out(float[:, ::1] out, Py_ssize_t n):
+    # the loops writing into out do not check its bounds
+    if out.shape[0] != _LEN or out.shape[1] != n:
+        raise ValueError("out must have shape ({}, {}), not ({}, {})".format(
+            _LEN, n, out.shape[0], out.shape[1]))
+
+
+# rows of a ParticleArray's buffer, and fields of a Particle
+DEF _VEL = 3
+DEF _MASS = 6
+DEF _CHARGE = 7
+DEF _FIELDS = 8
+
+
+cdef class ParticleArray:
+    """Many particles, stored as a structure of float32 arrays.
+
+    positions and velocities have shape (3, n), one contiguous row per
+    axis; masses and charges have shape (n,).  They are all rows of one
+    (8, n) buffer and support the buffer protocol, so numpy.asarray() views
+    them without copying.  Indexing gives a Particle viewing one particle.
+    """
+
+    cdef:
+        readonly object positions, velocities, masses, charges
+        float[:, ::1] data, psn, vel
+        float[::1] mass, charge
+
+    def __init__(self, Py_ssize_t n, float mass=0.0, float charge=0.0):
+        if n < 0:
+            raise ValueError("cannot make {} particles".format(n))
+        buf = _floats((_FIELDS, n))
+        self.data = buf
+        self.positions = buf[:_VEL]
+        self.velocities = buf[_VEL:_MASS]
+        self.masses = buf[_MASS]
+        self.charges = buf[_CHARGE]
+        self.psn = self.data[:_VEL]
+        self.vel = self.data[_VEL:_MASS]
+        self.mass = self.data[_MASS]
+        self.charge = self.data[_CHARGE]
+        self.mass[:] = mass
+        self.charge[:] = charge
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    def __getitem__(self, Py_ssize_t index):
+        cdef Py_ssize_t n = self.data.shape[1]
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("particle {} of {}".format(index, n))
+        cdef Particle particle = Particle.__new__(Particle)
+        particle.array = self
+        particle.index = index
+        particle.base = &self.data[0, index]
+        particle.stride = n
+        return particle
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def speed(self, out=None):
+        """The speed of every particle, in out if given."""
+        cdef Py_ssize_t i, n = self.data.shape[1]
+        if out is None:
+            out = _floats((n,))
+        cdef float[::1] result = out
+        if result.shape[0] != n:
+            raise ValueError("out must have shape ({},), not ({},)".format(
+                n, result.shape[0]))
+        with nogil:
+            for i in range(n):
+                result[i] = magnitude(self.vel[0, i], self.vel[1, i],
+                                      self.vel[2, i])
+        return out
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def momentum(self, out=None):
+        """The momentum of every particle, shape (3, n), in out if given."""
+        cdef Py_ssize_t i, k, n = self.data.shape[1]
+        if out is None:
+            out = _floats((_LEN, n))
+        cdef float[:, ::1] result = out
+        _check_out(result, n)
+        with nogil:
+            for k in range(_LEN):
+                for i in range(n):
+                    result[k, i] = self.vel[k, i] * self.mass[i]
+        return out
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.cdivision(True)
+    def direction(self, out=None):
+        """The unit velocity of every particle, shape (3, n), in out if
+        given; zero for particles at rest."""
+        cdef Py_ssize_t i, k, n = self.data.shape[1]
+        cdef float spd
+        if out is None:
+            out = _floats((_LEN, n))
+        cdef float[:, ::1] result = out
+        _check_out(result, n)
+        with nogil:
+            for i in range(n):
+                spd = magnitude(self.vel[0, i], self.vel[1, i],
+                                self.vel[2, i])
+                if spd == 0.0:
+                    spd = 1.0
+                for k in range(_LEN):
+                    result[k, i] = self.vel[k, i] / spd
+        return out
+
 
 cdef class Particle:
+    """One particle.
+
+    Particle() makes a particle that holds its own values, without
+    allocating anything; indexing a ParticleArray gives a particle that
+    views a column of the array, which it keeps alive, as array.
+    """
 
     cdef:
-        float psn[_LEN]
-        float vel[_LEN]
-        public float mass, charge
+        readonly ParticleArray array
+        readonly Py_ssize_t index
+        # field k of the particle is base[k * stride]
+        float *base
+        Py_ssize_t stride
+        float own[_FIELDS]
+
+    def __cinit__(self):
+        self.base = self.own
+        self.stride = 1
 
     def __init__(self, psn=None, vel=None, mass=0.0, charge=0.0):
         zeros = (0.0,)*_LEN
-        psn = psn or zeros
-        vel = vel or zeros
-        for i in range(_LEN):
-            self.psn[i] = psn[i]
-            self.vel[i] = vel[i]
+        self.position = psn or zeros
+        self.velocity = vel or zeros
         self.mass = mass
         self.charge = charge
 
+    cdef inline float get(self, int field):
+        return self.base[field * self.stride]
+
+    cdef inline void set(self, int field, float value):
+        self.base[field * self.stride] = value
+
     property position:
 
         def __get__(self):
-            return tuple(self.psn[i] for i in range(_LEN))
+            return (self.get(0), self.get(1), self.get(2))
 
         def __set__(self, it):
-            for i in range(_LEN):
-                self.psn[i] = it[i]
+            for k in range(_LEN):
+                self.set(k, it[k])
 
     property velocity:
 
         def __get__(self):
-            return tuple(self.vel[i] for i in range(_LEN))
+            return (self.get(_VEL), self.get(_VEL + 1), self.get(_VEL + 2))
 
         def __set__(self, it):
-            for i in range(_LEN):
-                self.vel[i] = it[i]
+            for k in range(_LEN):
+                self.set(_VEL + k, it[k])
+
+    property mass:
+
+        def __get__(self):
+            return self.get(_MASS)
+
+        def __set__(self, float value):
+            self.set(_MASS, value)
+
+    property charge:
+
+        def __get__(self):
+            return self.get(_CHARGE)
+
+        def __set__(self, float value):
+            self.set(_CHARGE, value)
 
     property momentum:
 
         "Particle object's momentum."
 
         def __get__(self):
-            return tuple(self.vel[i] * self.mass for i in range(_LEN))
+            cdef float mass = self.get(_MASS)
+            return (self.get(_VEL) * mass, self.get(_VEL + 1) * mass,
+                    self.get(_VEL + 2) * mass)
 
     property speed:
 
         def __get__(self):
-            return magnitude(self.vel)
+            return magnitude(self.get(_VEL), self.get(_VEL + 1),
+                             self.get(_VEL + 2))
 
     property direction:
 
         def __get__(self):
             cdef float spd = self.speed
-            return tuple(self.vel[i] / spd for i in range(_LEN))
+            return (self.get(_VEL) / spd, self.get(_VEL + 1) / spd,
+                    self.get(_VEL + 2) / spd)
@@ -11,3 +11,43 @@ assert(p.speed == 5)
 
 p.mass = 2.0
 assert(p.momentum == (6,8,0))
+
+from particle import ParticleArray
+
+particles = ParticleArray(4, mass=2.0)
+assert(len(particles) == 4)
+p = particles[1]
+p.velocity = [3,4,0]
+assert(p.speed == 5)
+assert(p.momentum == (6,8,0))
+
+speeds = memoryview(particles.speed())
+assert(speeds.tolist() == [0, 5, 0, 0])
+assert(memoryview(particles.momentum()).tolist()[1] == [0, 8, 0, 0])
+directions = memoryview(particles.direction()).tolist()
+assert(abs(directions[0][1] - 0.6) < 1e-6 and directions[1][0] == 0)
+assert(memoryview(particles.velocities).tolist()[0] == [0, 3, 0, 0])
+
+p = Particle(vel=[0,3,4], mass=2.0)
+assert(p.array is None)
+assert(p.momentum == (0,6,8))
+
+empty = ParticleArray(0)
+assert(len(empty) == 0)
+assert(memoryview(empty.positions).shape == (3, 0))
+assert(memoryview(empty.speed()).tolist() == [])
+assert(memoryview(empty.direction()).tolist() == [[], [], []])
+
+import numpy as np
+for method, shape in [(particles.speed, (3,)),
+                      (particles.momentum, (3, 3)),
+                      (particles.direction, (4, 3))]:
+    try:
+        method(out=np.empty(shape, np.float32))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("{} accepted out of shape {}".format(
+            method.__name__, shape))
+out = np.empty((3, 4), np.float32)
+assert(particles.momentum(out=out) is out and out[0, 1] == 6)
@@ -4,9 +4,11 @@ from Cython.Distutils import build_ext
 
 import numpy
 
+# the reductions split their work over threads with OpenMP
 ext = Extension("sum", ["sum.pyx"],
-                include_dirs = [numpy.get_include()])
+                include_dirs = [numpy.get_include()],
+                extra_compile_args = ["-O3", "-fopenmp"],
+                extra_link_args = ["-fopenmp"])
                 
 setup(ext_modules=[ext],
       cmdclass = {'build_ext': build_ext})
-
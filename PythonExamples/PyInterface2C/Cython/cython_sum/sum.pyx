@@ -1,19 +1,379 @@
-#cython: boundscheck=False
-# Cython sources to compute the sum of a sequence
+#cython: boundscheck=False, wraparound=False, cdivision=True
+# Cython sources to compute the sum, and other reductions, of a sequence
+"""
+Reductions of arrays: sum, mean, min, max and dot.
 
-cimport numpy as np
+They take float32, float64 and int64 arrays of any shape, contiguous or not;
+other types are converted first.  An N-D array is reduced as the rows of a
+2-D view of it, which only needs a copy if no such view exists.
 
-def sum(np.ndarray[np.float64_t] ary):
+The rows are cut into chunks of CHUNK values, which are reduced in parallel
+over ``threads`` threads (by default, all of them), and the results of the
+chunks are then combined in order, so the answer does not depend on the
+number of threads.
+
+Sums are pairwise, by default: runs of up to 128 values are added with eight
+separate accumulators, which the compiler can keep in SIMD registers, and
+longer runs are split in half and the halves added.  The rounding error grows
+like log(n) rather than n.  method="kahan" uses compensated (Kahan-Babuska)
+summation instead, which is slower but has an error that does not grow with
+n.  Floats are summed in double precision; int64 values wrap around on
+overflow, as in NumPy.
+"""
+
+from cython.parallel cimport prange
+from libc.stdint cimport int64_t
+cimport openmp
+
+import numpy as np
+
+ctypedef fused number:
+    float
+    double
+    int64_t
+
+ctypedef fused real:
+    float
+    double
+
+# values a chunk, reduced by one thread
+DEF CHUNK = 16384
+# values summed directly by the pairwise sum
+DEF RUN = 128
+
+METHODS = ("pairwise", "kahan")
+
+
+# ---------------------------------------------------------------------------
+# kernels: a run of n values, stride elements apart
+# ---------------------------------------------------------------------------
+
+cdef double _pairwise(const real *p, Py_ssize_t n,
+                      Py_ssize_t stride) noexcept nogil:
+    cdef Py_ssize_t i, half
+    cdef double s0 = 0, s1 = 0, s2 = 0, s3 = 0, s4 = 0, s5 = 0, s6 = 0, s7 = 0
+    if n > RUN:
+        half = (n // 2) - (n // 2) % 8
+        return (_pairwise(p, half, stride) +
+                _pairwise(p + half * stride, n - half, stride))
+    for i in range(0, n - n % 8, 8):
+        s0 += p[i * stride]
+        s1 += p[(i + 1) * stride]
+        s2 += p[(i + 2) * stride]
+        s3 += p[(i + 3) * stride]
+        s4 += p[(i + 4) * stride]
+        s5 += p[(i + 5) * stride]
+        s6 += p[(i + 6) * stride]
+        s7 += p[(i + 7) * stride]
+    for i in range(n - n % 8, n):
+        s0 += p[i * stride]
+    return ((s0 + s1) + (s2 + s3)) + ((s4 + s5) + (s6 + s7))
+
+
+cdef double _pairwise_dot(const real *a, Py_ssize_t a_stride, const real *b,
+                          Py_ssize_t b_stride, Py_ssize_t n) noexcept nogil:
+    cdef Py_ssize_t i, half
+    cdef double s0 = 0, s1 = 0, s2 = 0, s3 = 0
+    if n > RUN:
+        half = (n // 2) - (n // 2) % 4
+        return (_pairwise_dot(a, a_stride, b, b_stride, half) +
+                _pairwise_dot(a + half * a_stride, a_stride,
+                              b + half * b_stride, b_stride, n - half))
+    for i in range(0, n - n % 4, 4):
+        s0 += <double> a[i * a_stride] * b[i * b_stride]
+        s1 += <double> a[(i + 1) * a_stride] * b[(i + 1) * b_stride]
+        s2 += <double> a[(i + 2) * a_stride] * b[(i + 2) * b_stride]
+        s3 += <double> a[(i + 3) * a_stride] * b[(i + 3) * b_stride]
+    for i in range(n - n % 4, n):
+        s0 += <double> a[i * a_stride] * b[i * b_stride]
+    return (s0 + s1) + (s2 + s3)
+
+
+cdef inline void _kahan_add(double *total, double *compensation,
+                            double value) noexcept nogil:
+    # Kahan-Babuska: keep the low order bits lost by each addition
+    cdef double t = total[0] + value
+    if abs(total[0]) >= abs(value):
+        compensation[0] += (total[0] - t) + value
+    else:
+        compensation[0] += (value - t) + total[0]
+    total[0] = t
+
+
+cdef double _kahan(const real *p, Py_ssize_t n,
+                   Py_ssize_t stride) noexcept nogil:
+    cdef Py_ssize_t i
+    cdef double total = 0, compensation = 0
+    for i in range(n):
+        _kahan_add(&total, &compensation, p[i * stride])
+    return total + compensation
+
+
+cdef double _kahan_dot(const real *a, Py_ssize_t a_stride, const real *b,
+                       Py_ssize_t b_stride, Py_ssize_t n) noexcept nogil:
+    cdef Py_ssize_t i
+    cdef double total = 0, compensation = 0
+    for i in range(n):
+        _kahan_add(&total, &compensation,
+                   <double> a[i * a_stride] * b[i * b_stride])
+    return total + compensation
+
+
+cdef int64_t _int_sum(const int64_t *p, Py_ssize_t n,
+                      Py_ssize_t stride) noexcept nogil:
+    cdef Py_ssize_t i
+    cdef int64_t total = 0
+    for i in range(n):
+        total += p[i * stride]
+    return total
+
+
+cdef int64_t _int_dot(const int64_t *a, Py_ssize_t a_stride,
+                      const int64_t *b, Py_ssize_t b_stride,
+                      Py_ssize_t n) noexcept nogil:
+    cdef Py_ssize_t i
+    cdef int64_t total = 0
+    for i in range(n):
+        total += a[i * a_stride] * b[i * b_stride]
+    return total
+
+
+cdef number _extreme(const number *p, Py_ssize_t n, Py_ssize_t stride,
+                     bint largest) noexcept nogil:
+    # NaN wins, as in NumPy: once found it is never replaced
+    cdef Py_ssize_t i
+    cdef number value, best = p[0]
+    for i in range(1, n):
+        value = p[i * stride]
+        if (value > best if largest else value < best) or value != value:
+            if best == best:
+                best = value
+    return best
+
+
+# ---------------------------------------------------------------------------
+# the chunks of 2-D views, reduced in parallel
+# ---------------------------------------------------------------------------
+
+def _sum_rows(const number[:, :] a, bint kahan, int threads):
+    """ The sum of a 2-D view. """
+    cdef Py_ssize_t cols = a.shape[1]
+    cdef Py_ssize_t per_row = (cols + CHUNK - 1) // CHUNK
+    cdef Py_ssize_t n_chunks = a.shape[0] * per_row
+    cdef Py_ssize_t k, start, n, stride = a.strides[1] // sizeof(number)
+    cdef double[::1] partials
+    cdef int64_t[::1] int_partials
+    if n_chunks == 0:
+        return <number>0
+    if number is int64_t:
+        int_partials = np.empty(n_chunks, dtype=np.int64)
+        for k in prange(n_chunks, nogil=True, num_threads=threads,
+                        schedule='static'):
+            start = (k % per_row) * CHUNK
+            n = cols - start
+            if n > CHUNK:
+                n = CHUNK
+            int_partials[k] = _int_sum(&a[k // per_row, start], n, stride)
+        return _int_sum(&int_partials[0], n_chunks, 1)
+    else:
+        partials = np.empty(n_chunks)
+        for k in prange(n_chunks, nogil=True, num_threads=threads,
+                        schedule='static'):
+            start = (k % per_row) * CHUNK
+            n = cols - start
+            if n > CHUNK:
+                n = CHUNK
+            if kahan:
+                partials[k] = _kahan(&a[k // per_row, start], n, stride)
+            else:
+                partials[k] = _pairwise(&a[k // per_row, start], n, stride)
+        if kahan:
+            return _kahan(&partials[0], n_chunks, 1)
+        return _pairwise(&partials[0], n_chunks, 1)
+
+
+def _dot_rows(const number[:, :] a, const number[:, :] b, bint kahan,
+              int threads):
+    """ The dot product of two 2-D views of the same shape. """
+    cdef Py_ssize_t cols = a.shape[1]
+    cdef Py_ssize_t per_row = (cols + CHUNK - 1) // CHUNK
+    cdef Py_ssize_t n_chunks = a.shape[0] * per_row
+    cdef Py_ssize_t k, start, n
+    cdef Py_ssize_t a_stride = a.strides[1] // sizeof(number)
+    cdef Py_ssize_t b_stride = b.strides[1] // sizeof(number)
+    cdef double[::1] partials
+    cdef int64_t[::1] int_partials
+    if n_chunks == 0:
+        return <number>0
+    if number is int64_t:
+        int_partials = np.empty(n_chunks, dtype=np.int64)
+        for k in prange(n_chunks, nogil=True, num_threads=threads,
+                        schedule='static'):
+            start = (k % per_row) * CHUNK
+            n = cols - start
+            if n > CHUNK:
+                n = CHUNK
+            int_partials[k] = _int_dot(&a[k // per_row, start], a_stride,
+                                       &b[k // per_row, start], b_stride, n)
+        return _int_sum(&int_partials[0], n_chunks, 1)
+    else:
+        partials = np.empty(n_chunks)
+        for k in prange(n_chunks, nogil=True, num_threads=threads,
+                        schedule='static'):
+            start = (k % per_row) * CHUNK
+            n = cols - start
+            if n > CHUNK:
+                n = CHUNK
+            if kahan:
+                partials[k] = _kahan_dot(&a[k // per_row, start], a_stride,
+                                         &b[k // per_row, start], b_stride, n)
+            else:
+                partials[k] = _pairwise_dot(&a[k // per_row, start], a_stride,
+                                            &b[k // per_row, start], b_stride,
+                                            n)
+        if kahan:
+            return _kahan(&partials[0], n_chunks, 1)
+        return _pairwise(&partials[0], n_chunks, 1)
+
+
+def _extreme_rows(const number[:, :] a, bint largest, int threads):
+    """ The largest or smallest value of a non-empty 2-D view. """
+    cdef Py_ssize_t cols = a.shape[1]
+    cdef Py_ssize_t per_row = (cols + CHUNK - 1) // CHUNK
+    cdef Py_ssize_t n_chunks = a.shape[0] * per_row
+    cdef Py_ssize_t k, start, n, stride = a.strides[1] // sizeof(number)
+    cdef number[::1] partials
+    if number is float:
+        partials = np.empty(n_chunks, dtype=np.float32)
+    elif number is double:
+        partials = np.empty(n_chunks, dtype=np.float64)
+    else:
+        partials = np.empty(n_chunks, dtype=np.int64)
+    for k in prange(n_chunks, nogil=True, num_threads=threads,
+                    schedule='static'):
+        start = (k % per_row) * CHUNK
+        n = cols - start
+        if n > CHUNK:
+            n = CHUNK
+        partials[k] = _extreme(&a[k // per_row, start], n, stride, largest)
+    return _extreme(&partials[0], n_chunks, 1, largest)
+
+
+# ---------------------------------------------------------------------------
+# the reductions
+# ---------------------------------------------------------------------------
+
+_TYPES = (np.dtype(np.float32), np.dtype(np.float64), np.dtype(np.int64))
+
+
+def _prepare(arrays):
+    # the arrays as arrays of one of the supported types
+    arrays = [np.asarray(a) for a in arrays]
+    dtype = np.result_type(*arrays)
+    if dtype.kind == 'c':
+        raise TypeError("complex arrays are not supported")
+    if dtype not in _TYPES:
+        dtype = np.dtype(np.int64 if dtype.kind in 'biu' else np.float64)
+    arrays = [np.asarray(a, dtype=dtype) for a in arrays]
+    if any(a.shape != arrays[0].shape for a in arrays):
+        raise ValueError("the arrays have different shapes: {}".format(
+            [a.shape for a in arrays]))
+    return arrays
+
+
+def _row_views(arrays):
+    # 2-D views of same-shape arrays, matching each other, that together
+    # hold all their values; they are only copied if their values are not
+    # a whole number of items apart
+    arrays = [a if a.ndim > 0 else a.reshape(1) for a in arrays]
+    arrays = [np.ascontiguousarray(a) if a.strides[a.ndim - 1] % a.itemsize else a
+              for a in arrays]
+    if arrays[0].ndim == 1:
+        return [[a[np.newaxis] for a in arrays]]
+    views = []
+    for a in arrays:
+        view = a.view()
+        try:
+            view.shape = (-1, a.shape[a.ndim - 1])
+        except AttributeError:
+            # not possible without a copy, so take the first axis apart
+            return [rows for parts in zip(*arrays)
+                    for rows in _row_views(parts)]
+        views.append(view)
+    return [views]
+
+
+def _threads(threads):
+    if threads is None:
+        return openmp.omp_get_max_threads()
+    if threads < 1:
+        raise ValueError("threads must be at least 1, not {}".format(threads))
+    return threads
+
+
+def _kahan_method(method):
+    if method not in METHODS:
+        raise ValueError("method must be one of {}, not {!r}".format(
+            METHODS, method))
+    return method == "kahan"
+
+
+def _add(values, dtype):
+    # the total of the results for several views
+    if len(values) == 1:
+        return values[0]
+    if dtype.kind == 'i':
+        return int(np.array(values, dtype=np.int64).sum())
+    return float(np.sum(values))
+
+
+def sum(ary, method="pairwise", threads=None):
     """ Sum up the values in a sequence.
-    """        
-    # How long is the array in the first dimension?
-    cdef int n = ary.shape[0]
-
-    cdef unsigned int i
-    cdef double sum
-    
-    sum = 0.0
-    for i in range(0, n):
-        sum = sum + ary[i]
-        
-    return sum    
\ No newline at end of file
+
+    method is "pairwise" or "kahan", see the module docstring; threads is
+    the number of threads to use, by default all of them.
+    """
+    kahan = _kahan_method(method)
+    threads = _threads(threads)
+    ary, = _prepare([ary])
+    return _add([_sum_rows(rows, kahan, threads)
+                 for rows, in _row_views([ary])], ary.dtype)
+
+
+def mean(ary, method="pairwise", threads=None):
+    """ The mean of the values in a sequence, as a float; NaN if empty. """
+    ary, = _prepare([ary])
+    if ary.size == 0:
+        return float('nan')
+    return sum(ary, method, threads) / float(ary.size)
+
+
+def _extreme_of(ary, largest, threads):
+    threads = _threads(threads)
+    ary, = _prepare([ary])
+    if ary.size == 0:
+        raise ValueError("the {} of an empty sequence is undefined".format(
+            "max" if largest else "min"))
+    values = np.array([_extreme_rows(rows, largest, threads)
+                       for rows, in _row_views([ary])], dtype=ary.dtype)
+    return (values.max() if largest else values.min()).item()
+
+
+def min(ary, threads=None):
+    """ The smallest value in a non-empty sequence; NaN if there is one. """
+    return _extreme_of(ary, False, threads)
+
+
+def max(ary, threads=None):
+    """ The largest value in a non-empty sequence; NaN if there is one. """
+    return _extreme_of(ary, True, threads)
+
+
+def dot(a, b, method="pairwise", threads=None):
+    """ The sum of the products of the values of two sequences of the same
+    shape. """
+    kahan = _kahan_method(method)
+    threads = _threads(threads)
+    a, b = _prepare([a, b])
+    return _add([_dot_rows(a_rows, b_rows, kahan, threads)
+                 for a_rows, b_rows in _row_views([a, b])], a.dtype)
@@ -1,25 +1,215 @@
+"""
+Benchmark the cython reductions against numpy.
+
+For every array size, the time of numpy.sum and of the cython sum with
+each number of threads is the best of a few repeats; the cython results are
+checked against math.fsum, which is exactly rounded, and numpy's error is
+shown alongside.  The python built-in sum is timed once, on the smallest
+array, for comparison.
+
+Before timing anything, check() makes sure every method gives the right
+sum, dot product and mean, and min and max the right values, NaN included,
+for every type, on contiguous, strided, transposed, N-D and empty arrays,
+and that the answers are the same on one thread and on several.
+
+Build the extension first:
+
+    python setup_sum.py build_ext --inplace
+
+then run, for example:
+
+    python test_sum.py --sizes 1e4 1e6 1e8 --threads 1 2 4 --dtype float32
+"""
+
+from __future__ import print_function
+
+import argparse
+import math
+import multiprocessing
 import time
-from numpy import arange
-
-# Use larger array for numpy/cython than for python
-# because the pytohn version is so slow...
-a= arange(1.e6)
-
-print 'elements:', len(a)
-
-t1 = time.time()
-res = sum(a)
-t2 = time.time()
-print 'python sum(approx sec, result):', (t2-t1)*10, res
-
-a= arange(1.e7)
-t1 = time.time()
-res = a.sum()
-t2 = time.time()
-print 'numpy sum(sec, result):', t2-t1, res
-
-from sum import sum
-t1 = time.time()
-res = sum(a)
-t2 = time.time()
-print 'cython sum(sec, result):', t2-t1, res
+
+import numpy
+
+import sum as cython_sum
+
+
+def best_time(function, repeat):
+    """ The shortest of ``repeat`` runs of function(), and its result. """
+    best = float('inf')
+    for i in range(repeat):
+        t1 = time.time()
+        result = function()
+        best = min(best, time.time() - t1)
+    return best, result
+
+
+# the thread counts every check is run with; the results must not differ
+CHECK_THREADS = (1, 3)
+
+
+def layouts(a):
+    """ Views of the 1-D array a, of several shapes and memory layouts. """
+    yield 'contiguous', a
+    yield 'strided', a[::3]
+    yield 'reversed', a[::-1]
+    yield '2-D', a[:600].reshape(20, 30)
+    yield 'wide 2-D', a[:100000].reshape(4, 25000)
+    yield 'transposed', a[:600].reshape(20, 30).T
+    yield 'N-D strided', a[:960].reshape(4, 6, 8, 5)[:, ::2, 1:, ::-2]
+    yield 'scalar', a[0]
+    yield 'empty', a[:0]
+
+
+def same(results):
+    """ Whether results are all equal, NaN being equal to NaN. """
+    return all(r == results[0] or (r != r and results[0] != results[0])
+               for r in results)
+
+
+def each_thread_count(function, where):
+    """ function(threads) for each of CHECK_THREADS, which must agree. """
+    results = [function(threads) for threads in CHECK_THREADS]
+    assert same(results), '{}: {} with threads {}'.format(where, results,
+                                                         CHECK_THREADS)
+    return results[0]
+
+
+def check_sums(view, other, where):
+    """ sum, dot and mean against math.fsum and numpy. """
+    values = numpy.asarray(view, dtype=numpy.float64).ravel()
+    products = values * numpy.asarray(other, numpy.float64).ravel()
+    for method in cython_sum.METHODS:
+        checks = [
+            ('sum', values, numpy.sum(view),
+             lambda threads: cython_sum.sum(view, method, threads)),
+            ('dot', products, numpy.sum(numpy.multiply(view, other)),
+             lambda threads: cython_sum.dot(view, other, method, threads)),
+        ]
+        for name, terms, numpy_result, function in checks:
+            message = '{} of {} ({})'.format(name, where, method)
+            result = each_thread_count(function, message)
+            # the same python type as numpy gives, so float32 sums are
+            # floats even when empty
+            assert type(result) is type(numpy_result.item()), message
+            if view.dtype.kind == 'i':
+                assert result == numpy_result, message
+            else:
+                error = abs(result - math.fsum(terms))
+                assert error <= 1e-13 * numpy.abs(terms).sum(), message
+
+        message = 'mean of {} ({})'.format(where, method)
+        mean = each_thread_count(
+            lambda threads: cython_sum.mean(view, method, threads), message)
+        assert type(mean) is float, message
+        if values.size == 0:
+            assert mean != mean, message
+        else:
+            error = abs(mean - math.fsum(values) / values.size)
+            assert error <= 1e-13 * numpy.abs(values).mean(), message
+
+
+def check_extremes(view, where):
+    """ min and max against numpy; NaN wins, and empty views raise. """
+    for name, function, numpy_function in [('min', cython_sum.min, numpy.min),
+                                           ('max', cython_sum.max, numpy.max)]:
+        message = '{} of {}'.format(name, where)
+        if numpy.size(view) == 0:
+            try:
+                function(view)
+            except ValueError:
+                continue
+            raise AssertionError(message + ' did not raise')
+        result = each_thread_count(lambda threads: function(view, threads),
+                                   message)
+        expected = numpy_function(view).item()
+        assert type(result) is type(expected), message
+        assert same([result, expected]), '{}: {} not {}'.format(
+            message, result, expected)
+
+
+def check():
+    """ Compare every reduction, method, type, layout and thread count with
+    math.fsum and numpy. """
+    for dtype in ['float32', 'float64', 'int64']:
+        a = numpy.random.uniform(-100, 100, 100000).astype(dtype)
+        b = numpy.random.uniform(-100, 100, 100000).astype(dtype)
+        for (layout, view), (_, other) in zip(layouts(a), layouts(b)):
+            where = '{} {}'.format(layout, dtype)
+            check_sums(view, other, where)
+            check_extremes(view, where)
+        if dtype == 'int64':
+            continue
+        # a NaN anywhere, in the first, a middle or the last chunk, makes
+        # the min and max NaN wherever it is in the view
+        for position in (0, 50001, len(a) - 1):
+            a_nan = a.copy()
+            a_nan[position] = numpy.nan
+            for layout, view in layouts(a_nan):
+                where = '{} {} with NaN at {}'.format(layout, dtype, position)
+                check_extremes(view, where)
+                if numpy.isnan(view).any():
+                    assert math.isnan(cython_sum.sum(view)), where
+    print('sum, dot, mean, min and max agree with math.fsum and numpy, '
+          'on {} threads'.format(' and '.join(map(str, CHECK_THREADS))))
+    print()
+
+
+def thread_counts():
+    counts = [1]
+    while counts[-1] * 2 <= multiprocessing.cpu_count():
+        counts.append(counts[-1] * 2)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=float, nargs='+',
+                        default=[1e3, 1e5, 1e7],
+                        help="array sizes to time")
+    parser.add_argument('--threads', type=int, nargs='+',
+                        default=thread_counts(),
+                        help="thread counts to time")
+    parser.add_argument('--dtype', default='float64',
+                        choices=['float32', 'float64', 'int64'],
+                        help="type of the arrays")
+    parser.add_argument('--method', default='pairwise',
+                        choices=cython_sum.METHODS,
+                        help="summation method of the cython sum")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="runs of each timing, the best is reported")
+    args = parser.parse_args()
+
+    check()
+
+    sizes = [int(size) for size in args.sizes]
+    a = numpy.random.uniform(0, 1, sizes[0]).astype(args.dtype)
+    t, res = best_time(lambda: sum(a), 1)
+    print('python sum of', len(a), 'elements (sec, result):', t, res)
+    print()
+
+    header = '{:>12} {:>12} {:>12}'.format('elements', 'numpy sec',
+                                             'numpy error')
+    for threads in args.threads:
+        header += ' {:>12}'.format('{} thread{}'.format(
+            threads, 's' if threads > 1 else ''))
+    print(header + ' {:>12}'.format('cython error'))
+
+    for size in sizes:
+        a = numpy.random.uniform(0, 1, size).astype(args.dtype)
+        exact = math.fsum(a.astype(numpy.float64))
+        t, res = best_time(a.sum, args.repeat)
+        line = '{:>12} {:>12.6f} {:>12.3g}'.format(size, t,
+                                                 abs(float(res) - exact))
+        errors = []
+        for threads in args.threads:
+            t, res = best_time(
+                lambda: cython_sum.sum(a, args.method, threads), args.repeat)
+            line += ' {:>12.6f}'.format(t)
+            errors.append(abs(float(res) - exact))
+        # the result does not depend on the number of threads
+        assert len(set(errors)) == 1
+        print(line + ' {:>12.3g}'.format(errors[0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Fibonacci numbers, fast
+=======================
+
+The fib exercises compute Fibonacci numbers with a loop (O(n) additions) or
+by plain recursion (O(phi ** n) calls), in C ints that overflow past n = 46.
+This package computes them by fast doubling,
+
+    F(2k)     = F(k) * (2 F(k + 1) - F(k))
+    F(2k + 1) = F(k) ** 2 + F(k + 1) ** 2
+
+which takes O(log n) steps, and to any size: terms up to F(93), the largest
+that fits in 64 bits, are computed in compiled code with unsigned 64-bit
+integers, and larger ones with Python ints.
+
+    fib(n)          the nth term, a Python int
+    fib_many(ns)    many terms in one call, as a NumPy array: uint64 if they
+                    all fit in 64 bits, otherwise object, of Python ints
+
+The sequence begins F(0) = 0, F(1) = 1, as in Fast_Fibonnaci/fib.c; the loops
+in the fib exercises start from 1, 1 and so give F(n + 2).
+
+The compiled path is the ``_fib64`` extension, built with
+
+    python setup.py build_ext --inplace
+
+Without it the 64-bit terms are looked up in a table made with NumPy.
+"""
+
+import numpy as np
+
+try:
+    from ._fib64 import fib64, fib64_many
+except ImportError:
+    fib64 = fib64_many = None
+
+# F(93) is the last term below 2 ** 64
+MAX_N_64 = 93
+
+
+def _table():
+    table = np.zeros(MAX_N_64 + 1, dtype=np.uint64)
+    table[1] = 1
+    for n in range(2, MAX_N_64 + 1):
+        table[n] = table[n - 1] + table[n - 2]
+    return table
+
+_TABLE = _table()
+
+
+def _fib_pair(n):
+    """ (F(n), F(n + 1)) by fast doubling, in Python ints. """
+    a, b = 0, 1
+    for bit in bin(n)[2:]:
+        # (a, b) = (F(k), F(k + 1)) becomes (F(2k), F(2k + 1))
+        a, b = a * (2 * b - a), a * a + b * b
+        if bit == '1':
+            a, b = b, a + b
+    return a, b
+
+
+def fib(n):
+    """ The nth Fibonacci number, F(0) = 0, F(1) = 1. """
+    n = _index(n)
+    if n <= MAX_N_64:
+        if fib64 is not None:
+            return fib64(n)
+        return int(_TABLE[n])
+    return _fib_pair(n)[0]
+
+
+def fib_many(ns):
+    """ The Fibonacci numbers of every n in ns, an array of the same shape.
+
+    The array is uint64 if every term fits in 64 bits and object, holding
+    Python ints, otherwise.
+    """
+    ns = np.asarray(ns)
+    if ns.size and ns.dtype.kind not in 'iu':
+        raise TypeError("ns must be integers, not {}".format(ns.dtype))
+    # uint64 values past the int64 range would wrap round to negative n;
+    # their terms have far too many digits to compute anyway
+    if (ns.size and ns.dtype.kind == 'u'
+            and ns.max() > np.iinfo(np.int64).max):
+        raise OverflowError("n must be less than 2 ** 63, not {}".format(
+            ns.max()))
+    ns = ns.astype(np.int64, copy=False)
+    if ns.size and ns.min() < 0:
+        raise ValueError("Fibonacci numbers of negative n are not defined")
+    if ns.size == 0 or ns.max() <= MAX_N_64:
+        if fib64_many is not None:
+            out = np.empty(ns.shape, dtype=np.uint64)
+            fib64_many(np.ascontiguousarray(ns).ravel(), out.reshape(-1))
+            return out
+        return _TABLE[ns]
+    # each distinct large term once; the small ones from the table
+    out = np.empty(ns.shape, dtype=object)
+    small = ns <= MAX_N_64
+    out[small] = [int(term) for term in _TABLE[ns[small]]]
+    large, where = np.unique(ns[~small], return_inverse=True)
+    terms = [_fib_pair(int(n))[0] for n in large]
+    out[~small] = [terms[i] for i in where.ravel()]
+    return out
+
+
+def _index(n):
+    try:
+        index = n.__index__()
+    except AttributeError:
+        raise TypeError("n must be an integer, not {!r}".format(n))
+    if index < 0:
+        raise ValueError("Fibonacci numbers of negative n are not defined")
+    return index
@@ -0,0 +1,42 @@
+#cython: boundscheck=False, wraparound=False
+# 64-bit Fibonacci numbers by fast doubling, for the fib package
+
+from libc.stdint cimport int64_t, uint64_t
+
+
+cdef uint64_t _fib64(int64_t n) noexcept nogil:
+    # F(n) for 0 <= n <= 93; the F(n + 1) carried along may wrap around at
+    # the last step, harmlessly, as unsigned arithmetic is modulo 2 ** 64
+    cdef uint64_t a = 0, b = 1, c, d
+    cdef int bit = 63
+    while bit >= 0 and not (n >> bit) & 1:
+        bit -= 1
+    while bit >= 0:
+        c = a * (2 * b - a)
+        d = a * a + b * b
+        if (n >> bit) & 1:
+            a, b = d, c + d
+        else:
+            a, b = c, d
+        bit -= 1
+    return a
+
+
+def fib64(int64_t n):
+    """ F(n) for 0 <= n <= 93. """
+    if not 0 <= n <= 93:
+        raise ValueError("F({}) does not fit in 64 bits".format(n))
+    return _fib64(n)
+
+
+def fib64_many(const int64_t[::1] ns, uint64_t[::1] out):
+    """ F(ns[i]) into out[i], for every 0 <= ns[i] <= 93. """
+    cdef Py_ssize_t i, n = ns.shape[0]
+    if out.shape[0] != n:
+        raise ValueError("out must have the length of ns")
+    for i in range(n):
+        if not 0 <= ns[i] <= 93:
+            raise ValueError("F({}) does not fit in 64 bits".format(ns[i]))
+    with nogil:
+        for i in range(n):
+            out[i] = _fib64(ns[i])
@@ -0,0 +1,16 @@
+# Build the compiled 64-bit path of the fib package in place:
+#
+#     python setup.py build_ext --inplace
+#
+# fib works without it, using a NumPy table instead.
+
+from distutils.core import setup
+from distutils.extension import Extension
+from Cython.Distutils import build_ext
+
+exts = [Extension("fib._fib64", ["fib/_fib64.pyx"])]
+
+setup(
+    cmdclass = {'build_ext': build_ext},
+    ext_modules = exts,
+)
@@ -0,0 +1,30 @@
+import numpy as np
+
+from fib import MAX_N_64, fib, fib_many
+
+def pyfib(n):
+    a, b = 0, 1
+    for i in range(n):
+        a, b = b, a+b
+    return a
+
+assert([fib(n) for n in range(10)] == [0, 1, 1, 2, 3, 5, 8, 13, 21, 34])
+assert(all(fib(n) == pyfib(n) for n in range(300)))
+assert(fib(MAX_N_64) == 12200160415121876738)
+assert(fib(1000) == pyfib(1000))
+
+terms = fib_many(range(MAX_N_64 + 1))
+assert(terms.dtype == 'uint64')
+assert(terms.tolist() == [pyfib(n) for n in range(MAX_N_64 + 1)])
+
+terms = fib_many([[10, 200], [94, 10]])
+assert(terms.dtype == object)
+assert(terms.tolist() == [[55, pyfib(200)], [pyfib(94), 55]])
+
+assert(fib_many(np.array([0, 10], dtype=np.uint64)).tolist() == [0, 55])
+try:
+    fib_many(np.array([10, 2 ** 63], dtype=np.uint64))
+except OverflowError:
+    pass
+else:
+    raise AssertionError("fib_many wrapped n = 2 ** 63 round")
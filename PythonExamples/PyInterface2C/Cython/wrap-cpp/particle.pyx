@@ -1,15 +1,19 @@
+from cpython.buffer cimport PyBUF_WRITABLE
+from libcpp.vector cimport vector
+
 import numpy as np
 
 cdef extern from "particle_extern.h":
 
     cppclass _Particle "Particle":
+        _Particle()
         _Particle(float m, float c, float *p, float *v)
         float getMass()
         void setMass(float m)
         float getCharge()
-        const float *getVel()
-        const float *getPos()
-        void applyImpulse(float *f, float t)
+        const float *getVel() nogil
+        const float *getPos() nogil
+        void applyImpulse(float *f, float t) nogil
 
 
 cdef class Particle:
@@ -60,3 +64,110 @@ cdef class Particle:
             for i in range(3):
                 arr[i] = _pos[i]
             return np.asarray(arr)
+
+
+def apply_impulses(particles, const float[:, ::1] forces, float t):
+    """ Apply forces[i] for time t to particles[i], for a sequence of
+    Particles, in one call that releases the GIL. """
+    cdef Py_ssize_t i, n = len(particles)
+    if forces.shape[0] != n or forces.shape[1] != 3:
+        raise ValueError("forces must have shape ({}, 3)".format(n))
+    cdef vector[_Particle *] ptrs
+    ptrs.reserve(n)
+    cdef Particle particle
+    for item in particles:
+        # a typed variable would take None, and its NULL particle
+        if not isinstance(item, Particle):
+            raise TypeError("expected a Particle, not {!r}".format(item))
+        particle = item
+        ptrs.push_back(particle.thisptr)
+    with nogil:
+        for i in range(n):
+            ptrs[i].applyImpulse(<float *> &forces[i, 0], t)
+
+
+cdef class ParticleVector:
+    """ Many C++ particles, stored in one std::vector.
+
+    positions and velocities are read-only (n, 3) views of the particles,
+    not copies: they see every impulse applied.  The container itself
+    supports the buffer protocol, read-only, as an (n, k) float32 array
+    with a row of k floats for each particle.
+    """
+    cdef vector[_Particle] particles
+    cdef Py_ssize_t shape[2]
+    cdef Py_ssize_t strides[2]
+
+    def __cinit__(self, const float[::1] masses, const float[::1] charges,
+                  const float[:, ::1] positions, const float[:, ::1] velocities):
+        cdef Py_ssize_t i, n = masses.shape[0]
+        if (charges.shape[0] != n or positions.shape[0] != n or
+                velocities.shape[0] != n):
+            raise ValueError("masses, charges, positions and velocities "
+                             "must have the same length")
+        if positions.shape[1] != 3 or velocities.shape[1] != 3:
+            raise ValueError("positions and velocities must have shape (n, 3)")
+        # the vector is never resized afterwards, so views stay valid
+        self.particles.reserve(n)
+        for i in range(n):
+            self.particles.push_back(_Particle(masses[i], charges[i],
+                                              <float *> &positions[i, 0],
+                                              <float *> &velocities[i, 0]))
+        self.shape[0] = n
+        self.shape[1] = sizeof(_Particle) // sizeof(float)
+        self.strides[0] = sizeof(_Particle)
+        self.strides[1] = sizeof(float)
+
+    def __len__(self):
+        return self.particles.size()
+
+    def __getbuffer__(self, Py_buffer *buffer, int flags):
+        if flags & PyBUF_WRITABLE:
+            raise BufferError("ParticleVector is read-only")
+        buffer.buf = <char *> self.particles.data()
+        buffer.format = 'f'
+        buffer.internal = NULL
+        buffer.itemsize = sizeof(float)
+        buffer.len = self.shape[0] * sizeof(_Particle)
+        buffer.ndim = 2
+        buffer.obj = self
+        buffer.readonly = 1
+        buffer.shape = self.shape
+        buffer.strides = self.strides
+        buffer.suboffsets = NULL
+
+    def __releasebuffer__(self, Py_buffer *buffer):
+        pass
+
+    def apply_impulses(self, const float[:, ::1] forces, float t):
+        """ Apply forces[i] for time t to particle i, releasing the GIL. """
+        cdef Py_ssize_t i, n = self.particles.size()
+        if forces.shape[0] != n or forces.shape[1] != 3:
+            raise ValueError("forces must have shape ({}, 3)".format(n))
+        with nogil:
+            for i in range(n):
+                self.particles[i].applyImpulse(<float *> &forces[i, 0], t)
+
+    property positions:
+
+        def __get__(self):
+            return self._view(False)
+
+    property velocities:
+
+        def __get__(self):
+            return self._view(True)
+
+    cdef _view(self, bint velocities):
+        # a read-only view of the 3 floats of the positions or velocities
+        # in the row of every particle
+        if self.particles.size() == 0:
+            return np.empty((0, 3), dtype=np.float32)
+        cdef const float *first = <const float *> &self.particles[0]
+        cdef const float *member = self.particles[0].getPos()
+        if velocities:
+            member = self.particles[0].getVel()
+        cdef Py_ssize_t offset = member - first
+        view = np.asarray(self)[:, offset:offset + 3]
+        view.flags.writeable = False
+        return view
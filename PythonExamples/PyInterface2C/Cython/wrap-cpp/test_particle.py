@@ -1,3 +1,5 @@
+from __future__ import print_function
+
 import particle
 import numpy as np
 
@@ -11,6 +13,31 @@ force = np.empty_like(vel)
 force.fill(10.0)
 time = 1.0
 
-print "p before impulse: ", p
+print("p before impulse: ", p)
 p.apply_impulse(force, time)
-print "p after impulse : ", p
+print("p after impulse : ", p)
+
+# many particles at once: one call, without the GIL
+masses = np.ones(4, dtype=np.float32)
+charges = np.zeros(4, dtype=np.float32)
+positions = np.zeros((4, 3), dtype=np.float32)
+velocities = np.zeros((4, 3), dtype=np.float32)
+forces = np.ones((4, 3), dtype=np.float32)
+
+particles = particle.ParticleVector(masses, charges, positions, velocities)
+velocity_view = particles.velocities
+particles.apply_impulses(forces, time)
+assert (velocity_view == forces).all()
+
+singles = [particle.Particle(1.0, 0.0, positions[i], velocities[i])
+           for i in range(4)]
+particle.apply_impulses(singles, forces, time)
+assert all((p.vel == forces[0]).all() for p in singles)
+
+for bad in [None, "particle"]:
+    try:
+        particle.apply_impulses([singles[0], bad], forces[:2], time)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("apply_impulses took {!r}".format(bad))